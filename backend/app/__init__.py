@@ -1,3 +1,4 @@
+from concurrent.futures import ThreadPoolExecutor
 from flask import Flask, request
 from flask_sqlalchemy import SQLAlchemy
 from flask_marshmallow import Marshmallow
@@ -47,5 +48,51 @@ def create_app(config_name='default'):
     
     app.register_blueprint(auth_bp, url_prefix='/auth')
     app.register_blueprint(api_bp)
+
+    from app.utils.analytics import AnalyticsCache
+    from app.utils.food_index import FoodNameIndex
+    from app.utils.usda import UsdaClient
+    from app.utils.usda_cache import UsdaSearchCache
+
+    app.extensions['usda_client'] = UsdaClient(
+        api_key=app.config['USDA_API_KEY'],
+        base_url=app.config['USDA_API_URL'],
+        timeout=app.config['USDA_TIMEOUT'],
+        retries=app.config['USDA_RETRIES'],
+        pool_size=app.config['USDA_POOL_SIZE'],
+        failure_threshold=app.config['USDA_BREAKER_THRESHOLD'],
+        reset_timeout=app.config['USDA_BREAKER_RESET'],
+        hourly_quota=app.config['USDA_HOURLY_QUOTA']
+    )
+
+    app.extensions['search_executor'] = ThreadPoolExecutor(
+        max_workers=app.config['SEARCH_WORKERS'],
+        thread_name_prefix='usda-search'
+    )
+    app.extensions['usda_cache'] = UsdaSearchCache(
+        ttl=app.config['USDA_CACHE_TTL'],
+        max_entries=app.config['USDA_CACHE_SIZE']
+    )
+    app.extensions['usda_barcode_cache'] = UsdaSearchCache(
+        ttl=app.config['USDA_CACHE_TTL'],
+        max_entries=app.config['USDA_CACHE_SIZE'],
+        namespace='barcode'
+    )
+
+    app.extensions['analytics_cache'] = AnalyticsCache(max_entries=app.config['ANALYTICS_CACHE_SIZE'])
+
+    food_index = FoodNameIndex(
+        user_ttl=app.config['FOOD_INDEX_USER_TTL'],
+        catalog_ttl=app.config['FOOD_INDEX_CATALOG_TTL'],
+        max_users=app.config['FOOD_INDEX_MAX_USERS'],
+        key_length=app.config['FOOD_INDEX_MAX_PREFIX']
+    )
+    app.extensions['food_index'] = food_index
+
+    if app.config['FOOD_INDEX_WARM_ON_STARTUP']:
+        # Warm on the first request, so CLI commands (db upgrade, import-fdc) never build it
+        @app.before_request
+        def warm_food_index():
+            food_index.warm(app)
     
     return app
\ No newline at end of file
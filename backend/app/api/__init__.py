@@ -2,4 +2,4 @@ from flask import Blueprint
 
 api_bp = Blueprint('api', __name__)
 
-from app.api import foods, entries, users, meals, community
\ No newline at end of file
+from app.api import foods, entries, users, meals, community, export
\ No newline at end of file
@@ -9,6 +9,7 @@ from app import db
 from app.api import api_bp
 from app.models import CommunityRecipe, SavedMeal
 from app.schemas import CommunityRecipeSchema
+from app.utils.meals import build_items, refresh_meal_totals
 
 UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'uploads', 'recipes')
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
@@ -168,13 +169,9 @@ def import_recipe_to_saved_meals(recipe_id):
         user_id=user_id,
         name=recipe.title,
         description=f"Imported from community recipe by {recipe.user.name}",
-        foods=recipe.foods,  
-        total_calories=recipe.total_calories,
-        total_protein=recipe.total_protein,
-        total_carbs=recipe.total_carbs,
-        total_fat=recipe.total_fat,
-        total_fiber=recipe.total_fiber
+        items=build_items(user_id, json.loads(recipe.foods))
     )
+    refresh_meal_totals(saved_meal)
     
     db.session.add(saved_meal)
     db.session.commit()
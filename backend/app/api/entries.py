@@ -1,11 +1,33 @@
-from flask import request, jsonify
+from flask import current_app, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from marshmallow import ValidationError
-from datetime import datetime
+from datetime import date, datetime, timedelta
+from sqlalchemy import insert, select
 from app import db
 from app.api import api_bp
-from app.models import FoodEntry, Food, CustomFood, User
-from app.schemas import FoodEntrySchema
+from app.models import FoodEntry, Food, CustomFood
+from app.schemas import CopyEntriesSchema, EntryHistorySchema, FoodEntrySchema, DateRangeSchema
+from app.utils.analytics import compute_analytics
+from app.utils.diary import (copy_entries, daily_summary, day_view, decode_cursor, diary_etag,
+                             encode_cursor, entry_history, range_summary, refresh_daily_totals)
+from app.utils.usage import record_usage
+
+BATCH_LIMIT = 100
+ANALYTICS_MAX_DAYS = 366
+
+def _cached(response, tag):
+    if tag:
+        response.set_etag(tag)
+    # Browsers keep the body but revalidate with If-None-Match every time
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def _check_etag(user_id, start, end=None):
+    """Return (etag, 304 response or None) for a read of the diary from start to end"""
+    tag = diary_etag(user_id, start, end)
+    if tag and request.if_none_match.contains(tag):
+        return tag, _cached(current_app.response_class(status=304), tag)
+    return tag, None
 
 @api_bp.route('/entries', methods=['POST'])
 @jwt_required()
@@ -30,6 +52,7 @@ def create_entry():
         if not food:
             return jsonify({'message': 'Food not found'}), 404
         
+        name, brand = food.name, food.brand
         multiplier = data['quantity'] / 100
         calories = food.calories * multiplier
         protein = food.protein * multiplier
@@ -45,6 +68,7 @@ def create_entry():
         if not custom_food:
             return jsonify({'message': 'Custom food not found'}), 404
         
+        name, brand = custom_food.name, custom_food.brand
         multiplier = data['quantity'] / custom_food.serving_size
         calories = custom_food.calories * multiplier
         protein = custom_food.protein * multiplier
@@ -56,6 +80,8 @@ def create_entry():
         user_id=user_id,
         food_id=data.get('food_id'),
         custom_food_id=data.get('custom_food_id'),
+        food_name=name,
+        food_brand=brand,
         date=data['date'],
         meal_type=data['meal_type'],
         quantity=data['quantity'],
@@ -67,6 +93,8 @@ def create_entry():
     )
     
     db.session.add(entry)
+    record_usage(user_id, [(entry.food_id, entry.custom_food_id)])
+    refresh_daily_totals(user_id, [(entry.date, entry.meal_type)])
     db.session.commit()
     
     return jsonify({
@@ -74,6 +102,128 @@ def create_entry():
         'entry': entry.to_dict()
     }), 201
 
+@api_bp.route('/entries/batch', methods=['POST'])
+@jwt_required()
+def create_entries():
+    user_id = int(get_jwt_identity())
+    items = (request.json or {}).get('entries')
+    
+    if not isinstance(items, list) or not items:
+        return jsonify({'message': 'entries must be a non-empty list'}), 400
+    if len(items) > BATCH_LIMIT:
+        return jsonify({'message': f'At most {BATCH_LIMIT} entries per batch'}), 400
+    
+    schema = FoodEntrySchema(many=True)
+    errors = schema.validate(items)
+    results = [
+        {'index': i, 'status': 400, 'errors': errors[i]} if i in errors else None
+        for i in range(len(items))
+    ]
+    valid = [i for i in range(len(items)) if i not in errors]
+    loaded = dict(zip(valid, schema.load([items[i] for i in valid]))) if valid else {}
+    
+    food_ids = {data['food_id'] for data in loaded.values() if data.get('food_id')}
+    custom_ids = {data['custom_food_id'] for data in loaded.values()
+                  if data.get('custom_food_id') and not data.get('food_id')}
+    foods = {food.id: food for food in db.session.scalars(
+        select(Food).where(Food.id.in_(food_ids)))} if food_ids else {}
+    custom_foods = {food.id: food for food in db.session.scalars(
+        select(CustomFood).where(CustomFood.id.in_(custom_ids), CustomFood.user_id == user_id))} if custom_ids else {}
+    
+    rows, indexes = [], []
+    for i, data in loaded.items():
+        if data.get('food_id'):
+            source = foods.get(data['food_id'])
+            if not source:
+                results[i] = {'index': i, 'status': 404, 'message': 'Food not found'}
+                continue
+            multiplier = data['quantity'] / 100
+        else:
+            source = custom_foods.get(data['custom_food_id'])
+            if not source:
+                results[i] = {'index': i, 'status': 404, 'message': 'Custom food not found'}
+                continue
+            multiplier = data['quantity'] / source.serving_size
+        
+        rows.append({
+            'user_id': user_id,
+            'food_id': data.get('food_id'),
+            'custom_food_id': None if data.get('food_id') else data['custom_food_id'],
+            'food_name': source.name,
+            'food_brand': source.brand,
+            'date': data['date'],
+            'meal_type': data['meal_type'],
+            'quantity': data['quantity'],
+            'calories': source.calories * multiplier,
+            'protein': source.protein * multiplier,
+            'carbs': source.carbs * multiplier,
+            'fat': source.fat * multiplier,
+            'fiber': (source.fiber or 0) * multiplier
+        })
+        indexes.append(i)
+    
+    if rows:
+        # One multi-row INSERT ... RETURNING; render_nulls keeps rows with and
+        # without a custom food in the same statement
+        entries = db.session.scalars(
+            insert(FoodEntry).returning(FoodEntry).execution_options(render_nulls=True), rows
+        ).all()
+        record_usage(user_id, [(row['food_id'], row['custom_food_id']) for row in rows])
+        refresh_daily_totals(user_id, [(row['date'], row['meal_type']) for row in rows])
+        
+        # RETURNING order isn't guaranteed, so pair rows back up by content;
+        # rows that match exactly are interchangeable
+        returned = {}
+        for entry in entries:
+            key = (entry.food_id, entry.custom_food_id, entry.date, entry.meal_type, entry.quantity)
+            returned.setdefault(key, []).append(entry)
+        for i, row in zip(indexes, rows):
+            key = (row['food_id'], row['custom_food_id'], row['date'], row['meal_type'], row['quantity'])
+            results[i] = {'index': i, 'status': 201, 'entry': returned[key].pop().to_dict()}
+        db.session.commit()
+    
+    created = len(rows)
+    failed = len(items) - created
+    status = 201 if not failed else 207 if created else 400
+    
+    return jsonify({
+        'message': f'{created} entries created, {failed} failed',
+        'created': created,
+        'failed': failed,
+        'results': results
+    }), status
+
+@api_bp.route('/entries/copy', methods=['POST'])
+@jwt_required()
+def copy_entries_to_dates():
+    user_id = int(get_jwt_identity())
+
+    try:
+        data = CopyEntriesSchema().load(request.json or {})
+    except ValidationError as err:
+        return jsonify({'errors': err.messages}), 400
+
+    start = data['source_date']
+    span = ((data.get('source_end_date') or start) - start).days
+    dates = [
+        (start + timedelta(days=offset), target + timedelta(days=offset))
+        for target in data['target_dates'] for offset in range(span + 1)
+    ]
+
+    rows = copy_entries(user_id, dates, data.get('meal_type'), data.get('target_meal_type'))
+    if not rows:
+        return jsonify({'message': 'No entries to copy'}), 404
+
+    record_usage(user_id, [(row.food_id, row.custom_food_id) for row in rows])
+    refresh_daily_totals(user_id, [(row.date, row.meal_type) for row in rows])
+    db.session.commit()
+
+    return jsonify({
+        'message': f'{len(rows)} entries copied',
+        'count': len(rows),
+        'dates': sorted({row.date.isoformat() for row in rows})
+    }), 201
+
 @api_bp.route('/entries', methods=['GET'])
 @jwt_required()
 def get_entries():
@@ -89,6 +239,10 @@ def get_entries():
     except ValueError:
         return jsonify({'message': 'Invalid date format. Use YYYY-MM-DD'}), 400
     
+    tag, not_modified = _check_etag(user_id, query_date)
+    if not_modified:
+        return not_modified
+    
     entries = FoodEntry.query.filter_by(
         user_id=user_id,
         date=query_date
@@ -104,7 +258,39 @@ def get_entries():
     for entry in entries:
         meals[entry.meal_type].append(entry.to_dict())
     
-    return jsonify(meals), 200
+    return _cached(jsonify(meals), tag), 200
+
+@api_bp.route('/entries/history', methods=['GET'])
+@jwt_required()
+def get_entry_history():
+    user_id = int(get_jwt_identity())
+    
+    try:
+        args = EntryHistorySchema().load(request.args)
+    except ValidationError as err:
+        return jsonify({'errors': err.messages}), 400
+    
+    after = None
+    if args.get('cursor'):
+        try:
+            after = decode_cursor(args['cursor'])
+        except ValueError:
+            return jsonify({'message': 'Invalid cursor'}), 400
+    
+    entries, has_more = entry_history(
+        user_id, args['per_page'], after=after,
+        meal_type=args.get('meal_type'),
+        food_id=args.get('food_id'),
+        custom_food_id=args.get('custom_food_id'),
+        start=args.get('start_date'),
+        end=args.get('end_date')
+    )
+    
+    return jsonify({
+        'entries': [entry.to_dict() for entry in entries],
+        'next_cursor': encode_cursor(entries[-1]) if has_more else None,
+        'has_more': has_more
+    }), 200
 
 @api_bp.route('/entries/<int:entry_id>', methods=['DELETE'])
 @jwt_required()
@@ -117,6 +303,7 @@ def delete_entry(entry_id):
         return jsonify({'message': 'Entry not found'}), 404
     
     db.session.delete(entry)
+    refresh_daily_totals(user_id, [(entry.date, entry.meal_type)])
     db.session.commit()
     
     return jsonify({'message': 'Entry deleted'}), 200
@@ -166,6 +353,7 @@ def update_entry(entry_id):
         entry.fat = custom_food.fat * multiplier
         entry.fiber = custom_food.fiber * multiplier
     
+    refresh_daily_totals(user_id, [(entry.date, entry.meal_type)])
     db.session.commit()
     
     return jsonify({
@@ -197,6 +385,7 @@ def clear_meal_entries():
         date=query_date,
         meal_type=meal_type
     ).delete()
+    refresh_daily_totals(user_id, [(query_date, meal_type)])
     
     db.session.commit()
     
@@ -208,39 +397,107 @@ def clear_meal_entries():
 @api_bp.route('/summary/<string:date_str>', methods=['GET'])
 @jwt_required()
 def get_daily_summary(date_str):
-    user_id = get_jwt_identity()
-    user_id = int(user_id)
-    user = User.query.get(user_id)
+    user_id = int(get_jwt_identity())
     
     try:
         query_date = datetime.strptime(date_str, '%Y-%m-%d').date()
     except ValueError:
         return jsonify({'message': 'Invalid date format'}), 400
     
-    entries = FoodEntry.query.filter_by(
-        user_id=user_id,
-        date=query_date
-    ).all()
-    
-    totals = {
-        'calories': sum(e.calories for e in entries),
-        'protein': sum(e.protein for e in entries),
-        'carbs': sum(e.carbs for e in entries),
-        'fat': sum(e.fat for e in entries),
-        'fiber': sum(e.fiber for e in entries)
-    }
+    tag, not_modified = _check_etag(user_id, query_date)
+    if not_modified:
+        return not_modified
     
-    nutrients = {}
-    for nutrient in totals:
-        goal_attr = f'daily_{nutrient}'
-        goal = getattr(user, goal_attr, 1)
-        nutrients[nutrient] = {
-            'consumed': round(totals[nutrient], 1),
-            'goal': goal,
-            'percentage': round((totals[nutrient] / goal * 100) if goal > 0 else 0, 1)
-        }
+    nutrients = daily_summary(user_id, query_date)
+    if nutrients is None:
+        return jsonify({'message': 'User not found'}), 404
     
-    return jsonify({
+    return _cached(jsonify({
         'date': date_str,
         'nutrients': nutrients
-    }), 200
+    }), tag), 200
+
+@api_bp.route('/dashboard/<string:date_str>', methods=['GET'])
+@jwt_required()
+def get_dashboard(date_str):
+    user_id = int(get_jwt_identity())
+    
+    try:
+        query_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({'message': 'Invalid date format'}), 400
+    
+    tag, not_modified = _check_etag(user_id, query_date)
+    if not_modified:
+        return not_modified
+    
+    view = day_view(user_id, query_date)
+    if view is None:
+        return jsonify({'message': 'User not found'}), 404
+    
+    return _cached(jsonify({'date': date_str, **view}), tag), 200
+
+def _range_summary(args):
+    try:
+        dates = DateRangeSchema().load(args)
+    except ValidationError as err:
+        return jsonify({'errors': err.messages}), 400
+    
+    user_id = int(get_jwt_identity())
+    tag, not_modified = _check_etag(user_id, dates['start_date'], dates['end_date'])
+    if not_modified:
+        return not_modified
+    
+    summary = range_summary(user_id, dates['start_date'], dates['end_date'])
+    if summary is None:
+        return jsonify({'message': 'User not found'}), 404
+    
+    return _cached(jsonify(summary), tag), 200
+
+@api_bp.route('/summary/week/<string:start_str>', methods=['GET'])
+@jwt_required()
+def get_weekly_summary(start_str):
+    try:
+        start = datetime.strptime(start_str, '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({'message': 'Invalid date format'}), 400
+    
+    return _range_summary({
+        'start_date': start.isoformat(),
+        'end_date': (start + timedelta(days=6)).isoformat()
+    })
+
+@api_bp.route('/summary/range', methods=['GET'])
+@jwt_required()
+def get_range_summary():
+    return _range_summary(request.args)
+
+@api_bp.route('/analytics', methods=['GET'])
+@jwt_required()
+def get_analytics():
+    user_id = int(get_jwt_identity())
+    days = request.args.get('days', 90, type=int)
+    end_str = request.args.get('end_date')
+    
+    if not 7 <= days <= ANALYTICS_MAX_DAYS:
+        return jsonify({'message': f'days must be between 7 and {ANALYTICS_MAX_DAYS}'}), 400
+    
+    try:
+        end = datetime.strptime(end_str, '%Y-%m-%d').date() if end_str else date.today()
+    except ValueError:
+        return jsonify({'message': 'Invalid date format. Use YYYY-MM-DD'}), 400
+    start = end - timedelta(days=days - 1)
+    
+    tag, not_modified = _check_etag(user_id, start, end)
+    if not_modified:
+        return not_modified
+    
+    cache = current_app.extensions['analytics_cache']
+    result = cache.get((user_id, start, end), tag) if tag else None
+    if result is None:
+        result = compute_analytics(user_id, start, end)
+        if result is None:
+            return jsonify({'message': 'User not found'}), 404
+        cache.put((user_id, start, end), tag, result)
+    
+    return _cached(jsonify(result), tag), 200
@@ -0,0 +1,60 @@
+from datetime import datetime
+from flask import Response, request, jsonify, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.api import api_bp
+from app.api.community import UPLOAD_FOLDER
+from app.utils.export import EXPORT_TABLES, FORMATS, export_archive, export_table
+
+def _export_options():
+    """Parse format and date range arguments, returning (options, error response)"""
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in FORMATS:
+        return None, (jsonify({'message': f"format must be one of: {', '.join(FORMATS)}"}), 400)
+    
+    options = {'fmt': fmt}
+    for arg, key in (('start_date', 'start'), ('end_date', 'end')):
+        value = request.args.get(arg)
+        try:
+            options[key] = datetime.strptime(value, '%Y-%m-%d').date() if value else None
+        except ValueError:
+            return None, (jsonify({'message': 'Invalid date format. Use YYYY-MM-DD'}), 400)
+    
+    if options['start'] and options['end'] and options['start'] > options['end']:
+        return None, (jsonify({'message': 'Start date must be before end date'}), 400)
+    return options, None
+
+@api_bp.route('/export/<string:table>', methods=['GET'])
+@jwt_required()
+def export_user_table(table):
+    """Stream one table of the user's data as NDJSON or CSV"""
+    if table not in EXPORT_TABLES:
+        return jsonify({'message': f"Unknown table. Use one of: {', '.join(EXPORT_TABLES)}"}), 404
+    
+    options, error = _export_options()
+    if error:
+        return error
+    
+    after_id = request.args.get('after_id', type=int)
+    chunks = export_table(int(get_jwt_identity()), table, after_id=after_id, **options)
+    
+    return Response(
+        stream_with_context(chunks),
+        mimetype=FORMATS[options['fmt']],
+        headers={'Content-Disposition': f"attachment; filename={table}.{options['fmt']}"}
+    )
+
+@api_bp.route('/export', methods=['GET'])
+@jwt_required()
+def export_user_archive():
+    """Stream a zip of every table plus the user's recipe images"""
+    options, error = _export_options()
+    if error:
+        return error
+    
+    chunks = export_archive(int(get_jwt_identity()), UPLOAD_FOLDER, **options)
+    
+    return Response(
+        stream_with_context(chunks),
+        mimetype='application/zip',
+        headers={'Content-Disposition': 'attachment; filename=nourish-export.zip'}
+    )
@@ -1,137 +1,266 @@
-from flask import request, jsonify
+from flask import request, jsonify, current_app, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from marshmallow import ValidationError
+from sqlalchemy.orm import load_only
 from app import db
 from app.api import api_bp
 from app.models import Food, CustomFood
-from app.schemas import CustomFoodSchema
-import requests
-import os
+from app.schemas import CustomFoodSchema, CustomValidators, ListingSchema
+from app.utils.fdc_import import food_row, insert_ignore
+from app.utils.pagination import page_info, paginate_listing
+from app.utils.nutrients import normalize_usda_food, normalize_usda_foods
+from app.utils.search import (
+    find_foods, find_custom_foods, find_similar_foods, find_similar_custom_foods, search_backend
+)
+from app.utils.usage import rank_results, recent_foods
+from app.utils.usda import UsdaUnavailableError
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from functools import partial
+import json
+import time
 
-usda_key = os.getenv('USDA_API_KEY')
-API_URL = 'https://api.nal.usda.gov/fdc/v1/food'
+# Local matches considered per search before ranking by usage
+RANK_CANDIDATES = 30
+
+def _fetch_usda_results(client, query):
+    return [
+        {
+            'id': f"usda_{food['fdc_id']}",
+            'name': (food['name'] or '').title(),
+            'calories': food['calories'] or 0,
+            'protein': food['protein'] or 0,
+            'carbs': food['carbs'] or 0,
+            'fat': food['fat'] or 0,
+            'fiber': food['fiber'] or 0,
+            'type': 'usda'
+        }
+        for food in normalize_usda_foods(client.search(query, page_size=5))
+    ]
+
+def _fetch_usda_barcode(client, barcode, query):
+    """Branded USDA foods whose GTIN matches barcode (an empty list caches the miss too)"""
+    gtin = CustomValidators.normalize_barcode(barcode)
+    return [
+        food for food in normalize_usda_foods(client.search(barcode, page_size=5, data_types=['Branded']))
+        if CustomValidators.normalize_barcode(food['barcode']) == gtin
+    ]
+
+def _store_usda_food(food):
+    """Upsert a normalized USDA food, returning (Food, created), or (None, False) if it has no name"""
+    row = food_row(dict(food, name=(food['name'] or '').title()), require_energy=False)
+    if row is None:
+        return None, False
+    
+    # A concurrent save of the same item may land first; keep whichever row won
+    inserted = insert_ignore(db.session.connection(), [row])
+    db.session.commit()
+    
+    stored = Food.query.filter_by(fdc_id=food['fdc_id']).first()
+    if stored is None:
+        # Same product already stored under another FDC id
+        stored = Food.query.filter_by(barcode=CustomValidators.normalize_barcode(food['barcode'])).first()
+    
+    if inserted:
+        current_app.extensions['food_index'].add_food(stored)
+    
+    return stored, bool(inserted)
+
+def _similar_foods(query, user_id):
+    """Typo-tolerant local matches: pg_trgm on Postgres, the in-process index elsewhere"""
+    if search_backend() == 'postgres':
+        foods = [food.to_dict() for food in find_similar_foods(query, limit=RANK_CANDIDATES)]
+        custom = [dict(food.to_dict(), type='custom')
+                  for food in find_similar_custom_foods(user_id, query, limit=RANK_CANDIDATES)]
+        return foods + custom
+
+    foods, custom = current_app.extensions['food_index'].fuzzy_lookup(
+        query, user_id, limit=RANK_CANDIDATES, custom_limit=RANK_CANDIDATES
+    )
+    return foods + custom
+
+def _start_usda(client, query):
+    return current_app.extensions['usda_cache'].fetch_async(
+        query, partial(_fetch_usda_results, client), current_app.extensions['search_executor']
+    )
+
+def _await_usda(query, future, deadline, skipped='omitted'):
+    """Wait for an in-flight USDA search until deadline, returning (status, results)"""
+    if future is None:
+        return skipped, []
+
+    try:
+        results = future.result(timeout=max(deadline - time.monotonic(), 0))
+    except FutureTimeoutError:
+        # Keeps running in the background and lands in the cache for the next keystroke
+        return 'pending', []
+    except Exception as e:
+        print(f"USDA API error: {e}")
+        return 'failed', []
+
+    current_app.extensions['usda_cache'].put(query, results)
+    return 'complete', results
 
 @api_bp.route('/foods/search', methods=['GET'])
 @jwt_required()
 def search_foods():
+    started = time.monotonic()
     query = request.args.get('q', '').strip()
     
     if len(query) < 2:
         return jsonify({'results': []}), 200
     
-    foods = Food.query.filter(Food.name.contains(query)).limit(10).all()
-    results = [food.to_dict() for food in foods]
-    
     user_id = int(get_jwt_identity())
-    custom_foods = CustomFood.query.filter_by(user_id=user_id).filter(
-        CustomFood.name.contains(query)
-    ).limit(5).all()
-    
-    for food in custom_foods:
-        food_dict = food.to_dict()
-        food_dict['type'] = 'custom'
-        results.append(food_dict)
-
-    if usda_key and len(results) < 10:
-        try:
-            search_response = requests.post(
-                f'{API_URL}s/search',
-                params={'api_key': usda_key},
-                json={
-                    'query': query,
-                    'pageSize': 5,
-                    'dataType': ['Branded', 'SR Legacy', 'Foundation']
-                },
-                timeout=5
-            )
-            
-            if search_response.status_code == 200:
-                usda_results = search_response.json().get('foods', [])
-                
-                for item in usda_results:
-                    food_nutrients = item.get('foodNutrients', [])
-                    
-                    def get_nutrient(nutrient_name):
-                        for nutrient in food_nutrients:
-                            name = nutrient.get('nutrientName', '')
-                            if nutrient_name.lower() in name.lower():
-                                return nutrient.get('value', 0)
-                        return 0
-                    
-                    label_nutrients = item.get('labelNutrients', {})
-                    
-                    results.append({
-                        'id': f"usda_{item['fdcId']}",
-                        'name': item.get('description', '').title(),
-                        'calories': label_nutrients.get('calories', {}).get('value') or get_nutrient('Energy'),
-                        'protein': label_nutrients.get('protein', {}).get('value') or get_nutrient('Protein'),
-                        'carbs': label_nutrients.get('carbohydrates', {}).get('value') or get_nutrient('Carbohydrate'),
-                        'fat': label_nutrients.get('fat', {}).get('value') or get_nutrient('Total lipid'),
-                        'fiber': label_nutrients.get('fiber', {}).get('value') or get_nutrient('Fiber'),
-                        'type': 'usda'
-                    })
-                    
-        except Exception as e:
-            print(f"USDA API error: {e}")
-            pass
-
-    return jsonify({'results': results}), 200
+    client = current_app.extensions['usda_client']
+    usda = None
+    usda_skipped = 'omitted' if client.available else 'unavailable'
+    # Over-fetch so foods the user logs often can be ranked into the page
+    if len(query) <= current_app.config['FOOD_INDEX_MAX_PREFIX']:
+        indexed_foods, indexed_custom = current_app.extensions['food_index'].lookup(
+            query, user_id, limit=RANK_CANDIDATES, custom_limit=RANK_CANDIDATES
+        )
+        results = indexed_foods + indexed_custom
+        # The index answers from memory, so USDA is only asked when it leaves the page short
+        if client.available and len(results) < 10:
+            usda = _start_usda(client, query)
+    else:
+        # Start USDA first so the call overlaps with the database lookups
+        if client.available:
+            usda = _start_usda(client, query)
+
+        foods = find_foods(query, limit=RANK_CANDIDATES)
+        results = [food.to_dict() for food in foods]
+
+        custom_foods = find_custom_foods(user_id, query, limit=RANK_CANDIDATES)
+
+        for food in custom_foods:
+            food_dict = food.to_dict()
+            food_dict['type'] = 'custom'
+            results.append(food_dict)
+
+    # A misspelling matches nothing; resolve it locally rather than from USDA
+    similar = False
+    if not results:
+        results = _similar_foods(query, user_id)
+        similar = bool(results)
+
+    # A full local page drops the USDA answer; it still lands in the cache.
+    # While the circuit is open the search stays local-only.
+    if len(results) >= 10 or similar:
+        usda = None
+
+    results = rank_results(user_id, results)
+
+    if request.args.get('stream') in ('1', 'true'):
+        deadline = started + current_app.config['SEARCH_STREAM_BUDGET']
+
+        def generate():
+            yield json.dumps({'source': 'local', 'results': results}) + '\n'
+            status, usda_results = _await_usda(query, usda, deadline, usda_skipped)
+            yield json.dumps({'source': 'usda', 'status': status, 'results': usda_results}) + '\n'
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    deadline = started + current_app.config['SEARCH_LATENCY_BUDGET']
+    status, usda_results = _await_usda(query, usda, deadline, usda_skipped)
+    results.extend(usda_results)
+
+    return jsonify({'results': results, 'usda': status}), 200
+
+@api_bp.route('/foods/recent', methods=['GET'])
+@jwt_required()
+def get_recent_foods():
+    user_id = int(get_jwt_identity())
+    limit = min(request.args.get('limit', 20, type=int), 100)
+    
+    return jsonify({'results': recent_foods(user_id, limit=limit)}), 200
+
+@api_bp.route('/foods/search/stats', methods=['GET'])
+@jwt_required()
+def get_search_stats():
+    # Internal sizes and the USDA key's quota; not for every signed-in user in production
+    if not current_app.config['SEARCH_STATS_ENABLED']:
+        return jsonify({'message': 'Not found'}), 404
+    
+    return jsonify({
+        'food_index': current_app.extensions['food_index'].stats(),
+        'usda_cache': current_app.extensions['usda_cache'].stats(),
+        'usda_barcode_cache': current_app.extensions['usda_barcode_cache'].stats(),
+        'usda_client': current_app.extensions['usda_client'].stats()
+    }), 200
 
 @api_bp.route('/foods/usda/<string:usda_id>', methods=['POST'])
 @jwt_required()
 def save_usda_food(usda_id):    
-    if usda_id.startswith('usda_'):
-        fdc_id = usda_id.replace('usda_', '')
-    else:
-        fdc_id = usda_id
+    fdc_id = usda_id[len('usda_'):] if usda_id.startswith('usda_') else usda_id
+    if not fdc_id.isdigit():
+        return jsonify({'message': 'Invalid USDA food id'}), 400
+    fdc_id = int(fdc_id)
     
-    existing = Food.query.filter_by(name=f"usda_{fdc_id}").first()
+    existing = Food.query.filter_by(fdc_id=fdc_id).first()
     if existing:
         return jsonify({'food': existing.to_dict()}), 200
     
-    usda_key = os.getenv('USDA_API_KEY')
-    if not usda_key:
+    client = current_app.extensions['usda_client']
+    if not client.api_key:
         return jsonify({'message': 'USDA API not configured'}), 500
     
     try:
-        response = requests.get(
-            f'{API_URL}/{fdc_id}',
-            params={'api_key': usda_key},
-            timeout=5
-        )
+        data = client.food(fdc_id)
         
-        if response.status_code != 200:
+        if data is None:
             return jsonify({'message': 'Failed to fetch food data'}), 500
         
-        data = response.json()
-        food_nutrients = data.get('foodNutrients', [])
-        
-        def get_nutrient(nutrient_name):
-            for nutrient in food_nutrients:
-                name = nutrient.get('nutrient', {}).get('name', '')
-                if nutrient_name.lower() in name.lower():
-                    return nutrient.get('amount', 0)
-            return 0
-        
-        label_nutrients = data.get('labelNutrients', {})
-        
-        food = Food(
-            name=data.get('description', 'Unknown').title(),
-            calories=label_nutrients.get('calories', {}).get('value') or get_nutrient('Energy'),
-            protein=label_nutrients.get('protein', {}).get('value') or get_nutrient('Protein'),
-            carbs=label_nutrients.get('carbohydrates', {}).get('value') or get_nutrient('Carbohydrate'),
-            fat=label_nutrients.get('fat', {}).get('value') or get_nutrient('Total lipid'),
-            fiber=label_nutrients.get('fiber', {}).get('value') or get_nutrient('Fiber')
-        )
-        
-        db.session.add(food)
-        db.session.commit()
+        food = normalize_usda_food(data)
+        food['fdc_id'] = fdc_id
+        food, created = _store_usda_food(food)
+        if food is None:
+            return jsonify({'message': 'USDA food has no description'}), 502
         
-        return jsonify({'food': food.to_dict()}), 201
+        return jsonify({'food': food.to_dict()}), 201 if created else 200
         
+    except UsdaUnavailableError as e:
+        return jsonify({'message': f'USDA API temporarily unavailable: {str(e)}'}), 503
     except Exception as e:
         return jsonify({'message': f'Error: {str(e)}'}), 500
 
+@api_bp.route('/foods/barcode/<string:code>', methods=['GET'])
+@jwt_required()
+def lookup_barcode(code):
+    if not CustomValidators.validate_barcode(code):
+        return jsonify({'message': 'Invalid barcode'}), 400
+    
+    gtin = CustomValidators.normalize_barcode(code)
+    food = Food.query.filter_by(barcode=gtin).first()
+    if food:
+        return jsonify({'food': food.to_dict(), 'source': 'local'}), 200
+    
+    client = current_app.extensions['usda_client']
+    if not client.available:
+        return jsonify({'message': 'Food not found'}), 404
+    
+    # Scans of unknown products are cached like searches, so they cost one USDA call per TTL
+    cache = current_app.extensions['usda_barcode_cache']
+    future = cache.fetch_async(
+        gtin, partial(_fetch_usda_barcode, client, code), current_app.extensions['search_executor']
+    )
+    
+    try:
+        matches = future.result(timeout=current_app.config['BARCODE_LOOKUP_BUDGET'])
+    except FutureTimeoutError:
+        return jsonify({'message': 'USDA lookup timed out'}), 504
+    except Exception as e:
+        print(f"USDA API error: {e}")
+        return jsonify({'message': 'USDA lookup failed'}), 503
+    
+    cache.put(gtin, matches)
+    if not matches:
+        return jsonify({'message': 'Food not found'}), 404
+    
+    food, _ = _store_usda_food(dict(matches[0], barcode=gtin))
+    if food is None:
+        return jsonify({'message': 'USDA food has no description'}), 502
+    return jsonify({'food': food.to_dict(), 'source': 'usda'}), 200
+
 @api_bp.route('/foods/custom', methods=['POST'])
 @jwt_required()
 def create_custom_food():
@@ -150,6 +279,7 @@ def create_custom_food():
     
     db.session.add(custom_food)
     db.session.commit()
+    current_app.extensions['food_index'].add_custom_food(custom_food)
     
     return jsonify({
         'message': 'Custom food created',
@@ -160,8 +290,24 @@ def create_custom_food():
 @jwt_required()
 def get_custom_foods():
     user_id = get_jwt_identity()
-    foods = CustomFood.query.filter_by(user_id=user_id).all()
+    
+    try:
+        args = ListingSchema().load(request.args)
+    except ValidationError as err:
+        return jsonify({'errors': err.messages}), 400
+    
+    # Only what to_dict returns; sugar, sodium and timestamps stay unread
+    query = CustomFood.query.filter_by(user_id=user_id).options(load_only(
+        CustomFood.id, CustomFood.name, CustomFood.brand, CustomFood.serving_size, CustomFood.calories,
+        CustomFood.protein, CustomFood.carbs, CustomFood.fat, CustomFood.fiber
+    ))
+    pagination = paginate_listing(query, CustomFood, args, {
+        'created_at': CustomFood.created_at,
+        'name': CustomFood.name,
+        'calories': CustomFood.calories
+    }, [CustomFood.name, CustomFood.brand])
     
     return jsonify({
-        'foods': [food.to_dict() for food in foods]
+        'foods': [food.to_dict() for food in pagination.items],
+        **page_info(pagination)
     }), 200
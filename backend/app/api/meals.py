@@ -1,12 +1,21 @@
 from flask import request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from marshmallow import ValidationError
-import json
 from datetime import datetime
+from sqlalchemy import insert
+from sqlalchemy.orm import joinedload, load_only, selectinload, undefer
 from app import db
 from app.api import api_bp
-from app.models import FoodEntry, SavedMeal
-from app.schemas import SavedMealSchema
+from app.models import FoodEntry, SavedMeal, SavedMealItem
+from app.schemas import SavedMealItemSchema, SavedMealListSchema, SavedMealSchema
+from app.utils.diary import NUTRIENTS, entry_labels, refresh_daily_totals
+from app.utils.meals import build_items, refresh_meal_totals
+from app.utils.pagination import page_info, paginate_listing
+from app.utils.usage import record_usage
+
+# What a meal listing reads; the foods come from GET /meals/<id>
+LISTING_COLUMNS = (SavedMeal.id, SavedMeal.name, SavedMeal.description, SavedMeal.total_calories,
+                   SavedMeal.total_protein, SavedMeal.total_carbs, SavedMeal.total_fat, SavedMeal.total_fiber)
 
 @api_bp.route('/meals', methods=['POST'])
 # Creates a new saved meal
@@ -20,23 +29,13 @@ def create_saved_meal():
     except ValidationError as err:
         return jsonify({'errors': err.messages}), 400
     
-    total_calories = sum(f.get('calories', 0) for f in data['foods'])
-    total_protein = sum(f.get('protein', 0) for f in data['foods'])
-    total_carbs = sum(f.get('carbs', 0) for f in data['foods'])
-    total_fat = sum(f.get('fat', 0) for f in data['foods'])
-    total_fiber = sum(f.get('fiber', 0) for f in data['foods'])
-    
     saved_meal = SavedMeal(
         user_id=user_id,
         name=data['name'],
         description=data.get('description'),
-        foods=json.dumps(data['foods']),
-        total_calories=total_calories,
-        total_protein=total_protein,
-        total_carbs=total_carbs,
-        total_fat=total_fat,
-        total_fiber=total_fiber
+        items=build_items(user_id, data['foods'])
     )
+    refresh_meal_totals(saved_meal)
     
     db.session.add(saved_meal)
     db.session.commit()
@@ -52,7 +51,7 @@ def create_saved_meal():
 @jwt_required()
 def add_saved_meal_to_day(meal_id):
     user_id = get_jwt_identity()
-    meal = SavedMeal.query.filter_by(id=meal_id, user_id=user_id).first()
+    meal = SavedMeal.query.options(joinedload(SavedMeal.items)).filter_by(id=meal_id, user_id=user_id).first()
     
     if not meal:
         return jsonify({'message': 'Meal not found'}), 404
@@ -73,43 +72,103 @@ def add_saved_meal_to_day(meal_id):
     except ValueError:
         return jsonify({'message': 'Invalid date format. Use YYYY-MM-DD'}), 400
     
-    foods = json.loads(meal.foods)
-    
-    created_entries = []
-    for food in foods:
-        entry = FoodEntry(
-            user_id=user_id,
-            food_id=food.get('food_id'),
-            custom_food_id=food.get('custom_food_id'),
-            date=date_obj,
-            meal_type=meal_type,
-            quantity=int(food['quantity']),
-            calories=int(food['calories']),
-            protein=int(food['protein']),
-            carbs=int(food['carbs']),
-            fat=int(food['fat']),
-            fiber=int(food.get('fiber', 0))
-        )
-        db.session.add(entry)
-        created_entries.append(entry)
+    labels = entry_labels(int(user_id), [(item.food_id, item.custom_food_id) for item in meal.items])
     
-    db.session.commit()
+    rows = []
+    for item in meal.items:
+        name, brand = labels[(item.food_id, item.custom_food_id)]
+        rows.append({
+            'user_id': int(user_id),
+            'food_id': item.food_id,
+            'custom_food_id': item.custom_food_id,
+            'food_name': name if name is not None else item.name,
+            'food_brand': brand,
+            'date': date_obj,
+            'meal_type': meal_type,
+            'quantity': int(item.quantity),
+            **{n: int(getattr(item, n)) for n in NUTRIENTS}
+        })
+    
+    # One multi-row INSERT ... RETURNING id. Row order isn't guaranteed to
+    # follow RETURNING, so ids are paired back up by content; rows that match
+    # exactly are interchangeable
+    # An empty row list would run a bare single-row INSERT, so a meal
+    # without items writes nothing
+    if rows:
+        entries = FoodEntry.__table__
+        key = ['food_id', 'custom_food_id', 'food_name', 'quantity', *NUTRIENTS]
+        ids = {}
+        for returned in db.session.execute(
+            insert(entries).returning(entries.c.id, *(entries.c[k] for k in key)), rows
+        ):
+            ids.setdefault(tuple(returned[1:]), []).append(returned.id)
+        for row in rows:
+            row['id'] = ids[tuple(row[k] for k in key)].pop()
+        
+        record_usage(int(user_id), [(row['food_id'], row['custom_food_id']) for row in rows])
+        refresh_daily_totals(user_id, [(date_obj, meal_type)])
+        db.session.commit()
     
     return jsonify({
         'message': 'Meal added to your day',
-        'entries': [entry.to_dict() for entry in created_entries]
+        'entries': [{
+            'id': row['id'],
+            'food_id': row['food_id'],
+            'custom_food_id': row['custom_food_id'],
+            'name': row['food_name'],
+            'brand': row['food_brand'],
+            'date': date_obj.isoformat(),
+            'meal_type': meal_type,
+            'quantity': row['quantity'],
+            **{n: row[n] for n in NUTRIENTS}
+        } for row in rows]
     }), 201
 
 @api_bp.route('/meals', methods=['GET'])
 @jwt_required()
 def get_saved_meals():
     user_id = get_jwt_identity()
-    meals = SavedMeal.query.filter_by(user_id=user_id).all()
+    
+    try:
+        args = SavedMealListSchema().load(request.args)
+    except ValidationError as err:
+        return jsonify({'errors': err.messages}), 400
+    
+    query = SavedMeal.query.filter_by(user_id=user_id)
+    
+    # Meals containing a given food, found through the item indexes
+    if args.get('food_id'):
+        query = query.filter(SavedMeal.items.any(SavedMealItem.food_id == args['food_id']))
+    if args.get('custom_food_id'):
+        query = query.filter(SavedMeal.items.any(SavedMealItem.custom_food_id == args['custom_food_id']))
+    
+    if args['items']:
+        query = query.options(selectinload(SavedMeal.items))
+    else:
+        query = query.options(load_only(*LISTING_COLUMNS), undefer(SavedMeal.item_count))
+    
+    pagination = paginate_listing(query, SavedMeal, args, {
+        'created_at': SavedMeal.created_at,
+        'name': SavedMeal.name,
+        'calories': SavedMeal.total_calories
+    }, [SavedMeal.name, SavedMeal.description])
     
     return jsonify({
-        'meals': [meal.to_dict() for meal in meals]
+        'meals': [meal.to_dict(items=args['items']) for meal in pagination.items],
+        **page_info(pagination)
     }), 200
 
+@api_bp.route('/meals/<int:meal_id>', methods=['GET'])
+@jwt_required()
+def get_saved_meal(meal_id):
+    user_id = get_jwt_identity()
+    meal = SavedMeal.query.options(selectinload(SavedMeal.items)).filter_by(id=meal_id, user_id=user_id).first()
+    
+    if not meal:
+        return jsonify({'message': 'Meal not found'}), 404
+    
+    return jsonify({'meal': meal.to_dict()}), 200
+
 @api_bp.route('/meals/<int:meal_id>', methods=['PUT'])
 @jwt_required()
 def update_saved_meal(meal_id):
@@ -126,20 +185,10 @@ def update_saved_meal(meal_id):
     except ValidationError as err:
         return jsonify({'errors': err.messages}), 400
     
-    total_calories = sum(f.get('calories', 0) for f in data['foods'])
-    total_protein = sum(f.get('protein', 0) for f in data['foods'])
-    total_carbs = sum(f.get('carbs', 0) for f in data['foods'])
-    total_fat = sum(f.get('fat', 0) for f in data['foods'])
-    total_fiber = sum(f.get('fiber', 0) for f in data['foods'])
-    
     meal.name = data['name']
     meal.description = data.get('description')
-    meal.foods = json.dumps(data['foods'])
-    meal.total_calories = total_calories
-    meal.total_protein = total_protein
-    meal.total_carbs = total_carbs
-    meal.total_fat = total_fat
-    meal.total_fiber = total_fiber
+    meal.items = build_items(user_id, data['foods'])
+    refresh_meal_totals(meal)
     
     db.session.commit()
     
@@ -160,4 +209,91 @@ def delete_saved_meal(meal_id):
     db.session.delete(meal)
     db.session.commit()
     
-    return jsonify({'message': 'Meal deleted'}), 200
\ No newline at end of file
+    return jsonify({'message': 'Meal deleted'}), 200
+
+def _meal_item(meal_id, item_id):
+    """Return (meal, item, error response) for one of the current user's meal items"""
+    meal = SavedMeal.query.filter_by(id=meal_id, user_id=get_jwt_identity()).first()
+    if not meal:
+        return None, None, (jsonify({'message': 'Meal not found'}), 404)
+    
+    item = SavedMealItem.query.filter_by(id=item_id, meal_id=meal.id).first()
+    if not item:
+        return meal, None, (jsonify({'message': 'Meal item not found'}), 404)
+    
+    return meal, item, None
+
+@api_bp.route('/meals/<int:meal_id>/items', methods=['POST'])
+@jwt_required()
+def add_saved_meal_item(meal_id):
+    user_id = get_jwt_identity()
+    meal = SavedMeal.query.filter_by(id=meal_id, user_id=user_id).first()
+    
+    if not meal:
+        return jsonify({'message': 'Meal not found'}), 404
+    
+    try:
+        data = SavedMealItemSchema().load(request.json or {})
+    except ValidationError as err:
+        return jsonify({'errors': err.messages}), 400
+    
+    position = max((item.position for item in meal.items), default=-1) + 1
+    item = build_items(user_id, [data], start=position)[0]
+    meal.items.append(item)
+    refresh_meal_totals(meal)
+    db.session.commit()
+    
+    return jsonify({
+        'message': 'Food added to meal',
+        'item': item.to_dict(),
+        'meal': meal.to_dict(items=False)
+    }), 201
+
+@api_bp.route('/meals/<int:meal_id>/items/<int:item_id>', methods=['PUT'])
+@jwt_required()
+def update_saved_meal_item(meal_id, item_id):
+    meal, item, error = _meal_item(meal_id, item_id)
+    if error:
+        return error
+    
+    try:
+        data = SavedMealItemSchema(partial=True).load(request.json or {})
+    except ValidationError as err:
+        return jsonify({'errors': err.messages}), 400
+    
+    # A new quantity alone scales the nutrients it was saved with
+    if 'quantity' in data and item.quantity and not any(n in data for n in NUTRIENTS):
+        ratio = data['quantity'] / item.quantity
+        for nutrient in NUTRIENTS:
+            data[nutrient] = getattr(item, nutrient) * ratio
+    
+    for field in ('name', 'quantity', *NUTRIENTS):
+        if field in data:
+            setattr(item, field, data[field])
+    refresh_meal_totals(meal)
+    db.session.commit()
+    
+    return jsonify({
+        'message': 'Meal item updated',
+        'item': item.to_dict(),
+        'meal': meal.to_dict(items=False)
+    }), 200
+
+@api_bp.route('/meals/<int:meal_id>/items/<int:item_id>', methods=['DELETE'])
+@jwt_required()
+def delete_saved_meal_item(meal_id, item_id):
+    meal, item, error = _meal_item(meal_id, item_id)
+    if error:
+        return error
+    
+    if len(meal.items) == 1:
+        return jsonify({'message': 'Cannot remove the last food item. Delete the meal instead.'}), 400
+    
+    meal.items.remove(item)
+    refresh_meal_totals(meal)
+    db.session.commit()
+    
+    return jsonify({
+        'message': 'Meal item removed',
+        'meal': meal.to_dict(items=False)
+    }), 200
@@ -22,6 +22,8 @@ class User(db.Model):
     food_entries = db.relationship('FoodEntry', backref='user', lazy='dynamic', cascade='all, delete-orphan')
     custom_foods = db.relationship('CustomFood', backref='user', lazy='dynamic', cascade='all, delete-orphan')
     saved_meals = db.relationship('SavedMeal', backref='user', lazy='dynamic', cascade='all, delete-orphan')
+    daily_totals = db.relationship('DailyTotal', lazy='dynamic', cascade='all, delete-orphan')
+    diary_versions = db.relationship('DiaryVersion', lazy='dynamic', cascade='all, delete-orphan')
     
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
@@ -47,7 +49,10 @@ class Food(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False, index=True)
     brand = db.Column(db.String(50))
-    barcode = db.Column(db.String(20))
+    barcode = db.Column(db.String(20), unique=True, index=True)  # GTIN-14, zero-padded
+    # Where the row came from ('usda' for FoodData Central) and its id there
+    source = db.Column(db.String(20))
+    fdc_id = db.Column(db.Integer, unique=True, index=True)
     
     # Nutrition per 100g
     calories = db.Column(db.Integer, nullable=False)
@@ -58,6 +63,10 @@ class Food(db.Model):
     sugar = db.Column(db.Integer)
     sodium = db.Column(db.Integer)
     
+    # Global popularity, maintained by app.utils.usage; usage_score is a log2 like FoodUsage.score
+    use_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    usage_score = db.Column(db.Float, default=0, server_default='0', nullable=False)
+    
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def to_dict(self):
@@ -107,11 +116,22 @@ class CustomFood(db.Model):
 
 class FoodEntry(db.Model):
     __tablename__ = 'food_entries'
+    __table_args__ = (
+        # Day and meal lookups for one user; on PostgreSQL the macros ride along
+        # in the leaf pages so daily totals are an index-only scan
+        db.Index('ix_food_entries_user_date_meal', 'user_id', 'date', 'meal_type',
+                 postgresql_include=['calories', 'protein', 'carbs', 'fat', 'fiber']),
+        # History pages walk (date, id) backwards from a cursor
+        db.Index('ix_food_entries_user_date_id', 'user_id', 'date', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     food_id = db.Column(db.Integer, db.ForeignKey('foods.id'))
     custom_food_id = db.Column(db.Integer, db.ForeignKey('custom_foods.id'))
+    # Snapshot of the food at write time so listings don't load the food
+    food_name = db.Column(db.String(100))
+    food_brand = db.Column(db.String(50))
     
     date = db.Column(db.Date, nullable=False, index=True)
     meal_type = db.Column(db.String(20), nullable=False)
@@ -133,7 +153,8 @@ class FoodEntry(db.Model):
             'id': self.id,
             'food_id': self.food_id,
             'custom_food_id': self.custom_food_id,
-            'name': self.food.name if self.food else self.custom_food.name,
+            'name': self.food_name if self.food_name is not None else self._live_name(),
+            'brand': self.food_brand,
             'date': self.date.isoformat(),
             'meal_type': self.meal_type,
             'quantity': self.quantity,
@@ -143,6 +164,62 @@ class FoodEntry(db.Model):
             'fat': self.fat,
             'fiber': self.fiber
         }
+    
+    def _live_name(self):
+        # Rows written before names were snapshotted (see `flask backfill-entry-names`)
+        if self.food:
+            return self.food.name
+        return self.custom_food.name if self.custom_food else None
+
+class DailyTotal(db.Model):
+    """Sums of a user's entries for one day and meal, maintained by app.utils.diary"""
+    __tablename__ = 'daily_totals'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+    meal_type = db.Column(db.String(20), primary_key=True)
+    
+    entry_count = db.Column(db.Integer, default=0, nullable=False)
+    # Floats: entry values are scaled by quantity and not always whole
+    calories = db.Column(db.Float, default=0, nullable=False)
+    protein = db.Column(db.Float, default=0, nullable=False)
+    carbs = db.Column(db.Float, default=0, nullable=False)
+    fat = db.Column(db.Float, default=0, nullable=False)
+    fiber = db.Column(db.Float, default=0, nullable=False)
+
+class DiaryVersion(db.Model):
+    """Bumped on every write to a user's day; summaries and listings derive ETags from it"""
+    __tablename__ = 'diary_versions'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+    version = db.Column(db.Integer, default=0, nullable=False)
+
+class FoodUsage(db.Model):
+    """How often and how recently a user logged a food, maintained by app.utils.usage"""
+    __tablename__ = 'food_usage'
+    __table_args__ = (
+        db.Index('ix_food_usage_user_score', 'user_id', 'score'),
+        db.Index('ux_food_usage_user_food', 'user_id', 'food_id', unique=True,
+                 sqlite_where=db.text('food_id IS NOT NULL'),
+                 postgresql_where=db.text('food_id IS NOT NULL')),
+        db.Index('ux_food_usage_user_custom_food', 'user_id', 'custom_food_id', unique=True,
+                 sqlite_where=db.text('custom_food_id IS NOT NULL'),
+                 postgresql_where=db.text('custom_food_id IS NOT NULL')),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    food_id = db.Column(db.Integer, db.ForeignKey('foods.id', ondelete='CASCADE'))
+    custom_food_id = db.Column(db.Integer, db.ForeignKey('custom_foods.id', ondelete='CASCADE'))
+    
+    use_count = db.Column(db.Integer, default=0, nullable=False)
+    # log2 of the sum of 2^(age of each use / half-life) measured from a fixed epoch
+    score = db.Column(db.Float, default=0, nullable=False)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    food = db.relationship('Food')
+    custom_food = db.relationship('CustomFood')
 
 class SavedMeal(db.Model):
     __tablename__ = 'saved_meals'
@@ -151,7 +228,6 @@ class SavedMeal(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.String(500))
-    foods = db.Column(db.Text, nullable=False)  
     
     total_calories = db.Column(db.Integer, nullable=False)
     total_protein = db.Column(db.Integer, nullable=False)
@@ -161,20 +237,79 @@ class SavedMeal(db.Model):
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    def to_dict(self):
-        import json
-        return {
+    items = db.relationship('SavedMealItem', backref='meal', order_by='SavedMealItem.position',
+                            cascade='all, delete-orphan')
+    
+    def to_dict(self, items=True):
+        data = {
             'id': self.id,
             'name': self.name,
             'description': self.description,
-            'foods': json.loads(self.foods),
             'total_calories': self.total_calories,
             'total_protein': self.total_protein,
             'total_carbs': self.total_carbs,
             'total_fat': self.total_fat,
             'total_fiber': self.total_fiber
         }
+        if items:
+            data['foods'] = [item.to_dict() for item in self.items]
+        else:
+            data['item_count'] = self.item_count
+        return data
+    
+
+class SavedMealItem(db.Model):
+    __tablename__ = 'saved_meal_items'
+    __table_args__ = (
+        db.Index('ix_saved_meal_items_meal_position', 'meal_id', 'position'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    meal_id = db.Column(db.Integer, db.ForeignKey('saved_meals.id', ondelete='CASCADE'), nullable=False)
+    position = db.Column(db.Integer, nullable=False, default=0)
+    # Meals outlive the foods they were saved from, keeping the name
+    food_id = db.Column(db.Integer, db.ForeignKey('foods.id', ondelete='SET NULL'), index=True)
+    custom_food_id = db.Column(db.Integer, db.ForeignKey('custom_foods.id', ondelete='SET NULL'), index=True)
+    name = db.Column(db.String(100))
+    
+    quantity = db.Column(db.Float, nullable=False)
+    calories = db.Column(db.Float, nullable=False, default=0)
+    protein = db.Column(db.Float, nullable=False, default=0)
+    carbs = db.Column(db.Float, nullable=False, default=0)
+    fat = db.Column(db.Float, nullable=False, default=0)
+    fiber = db.Column(db.Float, nullable=False, default=0)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'food_id': self.food_id,
+            'custom_food_id': self.custom_food_id,
+            'name': self.name,
+            'quantity': self.quantity,
+            'calories': self.calories,
+            'protein': self.protein,
+            'carbs': self.carbs,
+            'fat': self.fat,
+            'fiber': self.fiber
+        }
+    
+# Listings show how many foods a meal has without loading them
+SavedMeal.item_count = db.column_property(
+    db.select(db.func.count(SavedMealItem.id))
+    .where(SavedMealItem.meal_id == SavedMeal.id)
+    .correlate_except(SavedMealItem)
+    .scalar_subquery(),
+    deferred=True
+)
     
+class UsdaSearchResult(db.Model):
+    __tablename__ = 'usda_search_results'
+
+    # Normalized search query
+    query_key = db.Column(db.String(100), primary_key=True)
+    results = db.Column(db.Text, nullable=False)
+    fetched_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
 class CommunityRecipe(db.Model):
     __tablename__ = 'community_recipes'
     
@@ -419,6 +419,54 @@ class FoodEntrySchema(ma.Schema):
         return value
 
 
+class CopyEntriesSchema(ma.Schema):
+    source_date = fields.Date(required=True, format='%Y-%m-%d')
+
+    # Copy a whole range; each day keeps its offset from source_date
+    source_end_date = fields.Date(format='%Y-%m-%d')
+
+    meal_type = fields.Str(
+        validate=validate.OneOf(['breakfast', 'lunch', 'dinner', 'snacks'], error="Invalid meal type")
+    )
+
+    target_meal_type = fields.Str(
+        validate=validate.OneOf(['breakfast', 'lunch', 'dinner', 'snacks'], error="Invalid meal type")
+    )
+
+    target_dates = fields.List(
+        fields.Date(format='%Y-%m-%d'),
+        required=True,
+        validate=validate.Length(min=1, max=31, error="Between 1 and 31 target dates are required")
+    )
+
+    @validates_schema
+    def validate_copy(self, data, **kwargs):
+        start = data.get('source_date')
+        end = data.get('source_end_date') or start
+        targets = data.get('target_dates') or []
+        if not start:
+            return
+
+        if start > end:
+            raise ValidationError("Source start date must be before end date")
+
+        span = (end - start).days
+        if span > 30:
+            raise ValidationError("Source range cannot exceed 31 days")
+
+        if data.get('target_meal_type') and not data.get('meal_type'):
+            raise ValidationError("target_meal_type requires meal_type")
+
+        today = date.today()
+        for target in targets:
+            if target < today - timedelta(days=30):
+                raise ValidationError("Cannot add entries more than 30 days in the past")
+            if target + timedelta(days=span) > today + timedelta(days=7):
+                raise ValidationError("Cannot add entries more than 7 days in the future")
+            if target == start and data.get('target_meal_type', data.get('meal_type')) == data.get('meal_type'):
+                raise ValidationError("Target dates must differ from the source")
+
+
 class FoodEntryUpdateSchema(ma.Schema):    
     quantity = fields.Integer(
         validate=validate.Range(min=0.1, max=5000)
@@ -497,6 +545,34 @@ class SavedMealSchema(ma.Schema):
 
 
 
+class SavedMealItemSchema(ma.Schema):
+    food_id = fields.Int(allow_none=True)
+    custom_food_id = fields.Int(allow_none=True)
+    name = fields.Str(validate=validate.Length(max=100))
+    
+    quantity = fields.Float(
+        required=True,
+        validate=validate.Range(
+            min=0,
+            max=5000,
+            min_inclusive=False,
+            error="Quantity must be a positive number up to 5000g"
+        )
+    )
+    
+    calories = fields.Float(validate=validate.Range(min=0))
+    protein = fields.Float(validate=validate.Range(min=0))
+    carbs = fields.Float(validate=validate.Range(min=0))
+    fat = fields.Float(validate=validate.Range(min=0))
+    fiber = fields.Float(validate=validate.Range(min=0))
+    
+    @validates_schema
+    def validate_food_reference(self, data, **kwargs):
+        # Edits may leave the food alone; new items must name one
+        if not self.partial and not data.get('food_id') and not data.get('custom_food_id'):
+            raise ValidationError("Must have food_id or custom_food_id")
+
+
 class RecipeImportSchema(ma.Schema):
     url = fields.Url(
         required=True,
@@ -653,6 +729,43 @@ class PaginationSchema(ma.Schema):
         validate=validate.OneOf(['asc', 'desc'])
     )
 
+class ListingSchema(PaginationSchema):
+    search = fields.Str(validate=validate.Length(max=100))
+
+
+class SavedMealListSchema(ListingSchema):
+    # Listings leave out each meal's foods unless asked for them
+    items = fields.Bool(missing=False)
+    food_id = fields.Int()
+    custom_food_id = fields.Int()
+
+
+class EntryHistorySchema(PaginationSchema):
+    cursor = fields.Str()
+
+    meal_type = fields.Str(
+        validate=validate.OneOf(['breakfast', 'lunch', 'dinner', 'snacks'], error="Invalid meal type")
+    )
+
+    food_id = fields.Int()
+    custom_food_id = fields.Int()
+
+    start_date = fields.Date(format='%Y-%m-%d')
+    end_date = fields.Date(format='%Y-%m-%d')
+
+    class Meta:
+        # Pages are reached by cursor and always run newest first
+        exclude = ('page', 'sort_by', 'sort_order')
+
+    @validates_schema
+    def validate_history(self, data, **kwargs):
+        if data.get('food_id') and data.get('custom_food_id'):
+            raise ValidationError("Only one of food_id or custom_food_id should be provided")
+
+        start, end = data.get('start_date'), data.get('end_date')
+        if start and end and start > end:
+            raise ValidationError("Start date must be before end date")
+
 class CustomValidators:
     @staticmethod
     def validate_barcode(barcode):
@@ -664,17 +777,23 @@ class CustomValidators:
         if not barcode.isdigit():
             return False
         
-        if len(barcode) not in [8, 12, 13]:
+        if len(barcode) not in [8, 12, 13, 14]:
             return False
         
-        if len(barcode) == 13:
-            checksum = sum(
-                int(digit) * (3 if i % 2 else 1) 
-                for i, digit in enumerate(barcode[:-1])
-            )
-            return (10 - (checksum % 10)) % 10 == int(barcode[-1])
-        
-        return True
+        # EAN-8, UPC-A, EAN-13 and GTIN-14 share one check digit rule:
+        # weights 3, 1, 3, ... starting from the rightmost data digit
+        checksum = sum(
+            int(digit) * (1 if i % 2 else 3)
+            for i, digit in enumerate(reversed(barcode[:-1]))
+        )
+        return (10 - (checksum % 10)) % 10 == int(barcode[-1])
+    
+    @staticmethod
+    def normalize_barcode(barcode):
+        """Return a valid EAN/UPC code as zero-padded GTIN-14, or None"""
+        if not barcode or not CustomValidators.validate_barcode(barcode):
+            return None
+        return re.sub(r'[\s-]', '', barcode).zfill(14)
     
     @staticmethod
     def sanitize_html(text):
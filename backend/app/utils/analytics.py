@@ -0,0 +1,186 @@
+"""Trends over a user's daily nutrient totals.
+
+A range is read from `daily_totals` in one grouped query into a dense
+(nutrient x day) NumPy array plus a mask of the days anything was logged;
+every metric is then computed on whole arrays. Averages only count logged
+days, so a forgotten day doesn't read as a day of fasting.
+
+Results are cached per user and range under the range's diary ETag, which
+changes whenever an entry in the range is written or a goal changes, so a
+cached result is never served stale and workers never need telling.
+"""
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+import numpy as np
+from sqlalchemy import func, select
+from app import db
+from app.models import DailyTotal, User
+from app.utils.diary import NUTRIENTS
+
+# A day meets the calorie goal within this fraction either side of it
+GOAL_TOLERANCE = 0.1
+
+ROLLING_WINDOWS = (7, 30)
+
+WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+# kcal per gram
+MACRO_CALORIES = {'protein': 4, 'carbs': 4, 'fat': 9}
+
+
+def load_series(user_id, start, end):
+    """Return (values, logged): per-nutrient daily totals for start..end and which days have entries"""
+    days = (end - start).days + 1
+    values = np.zeros((len(NUTRIENTS), days))
+    logged = np.zeros(days, dtype=bool)
+
+    rows = db.session.execute(
+        select(DailyTotal.date, *(func.sum(getattr(DailyTotal, n)) for n in NUTRIENTS))
+        .where(DailyTotal.user_id == user_id, DailyTotal.date >= start, DailyTotal.date <= end,
+               DailyTotal.entry_count > 0)
+        .group_by(DailyTotal.date)
+    ).all()
+    if rows:
+        offsets = np.array([(row[0] - start).days for row in rows])
+        values[:, offsets] = np.array([row[1:] for row in rows], dtype=float).T
+        logged[offsets] = True
+    return values, logged
+
+
+def rolling_mean(values, logged, window):
+    """Mean of the logged days among the last `window` days up to each day (NaN if none)"""
+    weights = logged.astype(float)
+    sums = np.concatenate((np.zeros(values.shape[:-1] + (1,)), np.cumsum(values * weights, axis=-1)), axis=-1)
+    counts = np.concatenate(([0.0], np.cumsum(weights)))
+
+    upper = np.arange(1, logged.size + 1)
+    lower = np.maximum(upper - window, 0)
+    total = sums[..., upper] - sums[..., lower]
+    count = counts[upper] - counts[lower]
+    return np.divide(total, count, out=np.full_like(total, np.nan), where=count > 0)
+
+
+def streaks(met, logged):
+    """Current and longest runs of consecutive days in met.
+
+    The current run may end yesterday: today still counts as in progress
+    until something is logged for it.
+    """
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], met.astype(np.int8), [0]))))
+    starts, ends = edges[::2], edges[1::2]
+    lengths = ends - starts
+
+    current = 0
+    open_until = met.size if logged[-1] else met.size - 1
+    if lengths.size and ends[-1] >= open_until:
+        current = int(lengths[-1])
+    return {
+        'current': current,
+        'longest': int(lengths.max()) if lengths.size else 0,
+        'days_met': int(met.sum()),
+    }
+
+
+def macro_ratios(values, logged):
+    """Share of macro calories from each macro per day, its average and its weekly trend"""
+    calories = np.array([values[NUTRIENTS.index(m)] * kcal for m, kcal in MACRO_CALORIES.items()])
+    total = calories.sum(axis=0)
+    valid = logged & (total > 0)
+    ratios = np.divide(calories, total, out=np.full_like(calories, np.nan), where=valid)
+
+    days = np.flatnonzero(valid)
+    result = {}
+    for macro, series in zip(MACRO_CALORIES, ratios):
+        # Least-squares slope, in percentage points per week
+        trend = np.polyfit(days, series[valid], 1)[0] * 7 * 100 if days.size >= 2 else 0.0
+        result[macro] = {
+            'average': round(float(series[valid].mean() * 100), 1) if days.size else None,
+            'trend': round(float(trend), 2),
+            'daily': _plain(series * 100),
+        }
+    return result
+
+
+def weekday_averages(values, logged, start):
+    """Mean of each nutrient per weekday over logged days"""
+    weekday = (start.weekday() + np.arange(logged.size)) % 7
+    onehot = np.eye(7)[weekday] * logged[:, None]
+    counts = onehot.sum(axis=0)
+    means = np.divide(values @ onehot, counts, out=np.full((len(NUTRIENTS), 7), np.nan), where=counts > 0)
+    return {
+        name: {'days': int(counts[i]), **dict(zip(NUTRIENTS, _plain(means[:, i])))}
+        for i, name in enumerate(WEEKDAYS)
+    }
+
+
+def _plain(array):
+    """Round to one decimal for JSON, with None for NaN"""
+    return [None if np.isnan(value) else round(float(value), 1) for value in array]
+
+
+def compute_analytics(user_id, start, end):
+    """All trend metrics for user_id from start to end (inclusive), or None if the user is gone"""
+    user = db.session.get(User, user_id)
+    if user is None:
+        return None
+
+    goals = {n: getattr(user, f'daily_{n}') for n in NUTRIENTS}
+    values, logged = load_series(user_id, start, end)
+
+    calories = values[NUTRIENTS.index('calories')]
+    target = goals['calories'] or 0
+    met = logged & (np.abs(calories - target) <= GOAL_TOLERANCE * target)
+
+    tracked = logged.sum()
+    averages = values[:, logged].mean(axis=1) if tracked else np.full(len(NUTRIENTS), np.nan)
+
+    return {
+        'start_date': start.isoformat(),
+        'end_date': end.isoformat(),
+        'days': int(logged.size),
+        'days_tracked': int(tracked),
+        'goals': goals,
+        'averages': dict(zip(NUTRIENTS, _plain(averages))),
+        'dates': [(start + timedelta(days=i)).isoformat() for i in range(logged.size)],
+        'daily': {n: _plain(np.where(logged, values[i], np.nan)) for i, n in enumerate(NUTRIENTS)},
+        'rolling': {
+            str(window): dict(zip(NUTRIENTS, map(_plain, rolling_mean(values, logged, window))))
+            for window in ROLLING_WINDOWS
+        },
+        'streaks': streaks(met, logged),
+        'macro_ratios': macro_ratios(values, logged),
+        'weekdays': weekday_averages(values, logged, start),
+    }
+
+
+class AnalyticsCache:
+    """LRU of computed analytics, each kept with the ETag it was computed under"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, tag):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == tag:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, key, tag, result):
+        with self._lock:
+            self._entries[key] = (tag, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,396 @@
+"""Helpers shared by the endpoints that read and write diary entries.
+
+Entries carry a snapshot of their food's name and brand, taken when they are
+written, so listing a day never has to load the foods themselves.
+
+Summaries read `daily_totals`, one row per user, day and meal type, rather
+than the entries. Every endpoint that writes entries calls
+`refresh_daily_totals` for the (date, meal_type) slots it touched, in the
+same transaction, which recomputes just those rows from the stored entries
+so rollups carry exactly what the database kept (PostgreSQL rounds entry
+values into integer columns; SQLite does not). The same call bumps the
+day's `diary_versions` counter, from which reads derive ETags without
+touching entries or totals; `rebuild_daily_totals` bumps every day.
+"""
+import base64
+import hashlib
+from datetime import date, timedelta
+from sqlalchemy import Date, String, and_, delete, func, insert, literal, or_, select, tuple_, union_all, update
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+from app.models import Food, CustomFood, DailyTotal, DiaryVersion, FoodEntry, User
+
+NUTRIENTS = ('calories', 'protein', 'carbs', 'fat', 'fiber')
+
+
+def entry_labels(user_id, pairs):
+    """Map (food_id, custom_food_id) pairs to (name, brand) with one query per food table"""
+    food_ids = {food_id for food_id, _ in pairs if food_id}
+    custom_ids = {custom_id for food_id, custom_id in pairs if custom_id and not food_id}
+
+    labels = {}
+    if food_ids:
+        for food_id, name, brand in db.session.execute(
+            select(Food.id, Food.name, Food.brand).where(Food.id.in_(food_ids))
+        ):
+            labels[(food_id, None)] = (name, brand)
+    if custom_ids:
+        for custom_id, name, brand in db.session.execute(
+            select(CustomFood.id, CustomFood.name, CustomFood.brand)
+            .where(CustomFood.id.in_(custom_ids), CustomFood.user_id == user_id)
+        ):
+            labels[(None, custom_id)] = (name, brand)
+
+    return {
+        (food_id, custom_id): labels.get((food_id, None) if food_id else (None, custom_id), (None, None))
+        for food_id, custom_id in pairs
+    }
+
+
+def backfill_entry_labels():
+    """Copy food names/brands onto entries written before they were snapshotted"""
+    entries = FoodEntry.__table__
+    updated = 0
+
+    for model, column in ((Food, entries.c.food_id), (CustomFood, entries.c.custom_food_id)):
+        source = model.__table__
+        result = db.session.execute(
+            update(entries)
+            .where(entries.c.food_name.is_(None), column.isnot(None))
+            .values(
+                food_name=select(source.c.name).where(source.c.id == column).scalar_subquery(),
+                food_brand=select(source.c.brand).where(source.c.id == column).scalar_subquery()
+            )
+        )
+        updated += result.rowcount
+
+    db.session.commit()
+    return updated
+
+
+def _nutrients(goals, totals):
+    return {
+        nutrient: {
+            'consumed': round(total, 1),
+            'goal': goal,
+            'percentage': round((total / goal * 100) if goal > 0 else 0, 1)
+        }
+        for nutrient, goal, total in zip(NUTRIENTS, goals, totals)
+    }
+
+
+def _goal_columns():
+    return [getattr(User, f'daily_{n}') for n in NUTRIENTS]
+
+
+def _total_columns():
+    return [func.coalesce(func.sum(getattr(DailyTotal, n)), 0) for n in NUTRIENTS]
+
+
+def daily_summary(user_id, day):
+    """Consumed vs goal per nutrient for one day in a single query, or None if the user is gone"""
+    row = db.session.execute(
+        select(*_goal_columns(), *_total_columns())
+        .select_from(User)
+        .outerjoin(DailyTotal, and_(DailyTotal.user_id == User.id, DailyTotal.date == day))
+        .where(User.id == user_id)
+        .group_by(User.id)
+    ).first()
+    if row is None:
+        return None
+
+    return _nutrients(row[:len(NUTRIENTS)], row[len(NUTRIENTS):])
+
+
+def day_view(user_id, day):
+    """The day's entries grouped by meal with consumed vs goal totals, from one query.
+
+    Goals and entries come back together (user outer-joined to the day's
+    entries) and totals are summed over the loaded entries, so the dashboard
+    touches neither the rollup nor the entries a second time. Returns None if
+    the user is gone.
+    """
+    rows = db.session.execute(
+        select(*_goal_columns(), FoodEntry)
+        .select_from(User)
+        .outerjoin(FoodEntry, and_(FoodEntry.user_id == User.id, FoodEntry.date == day))
+        .where(User.id == user_id)
+        .order_by(FoodEntry.id)
+    ).all()
+    if not rows:
+        return None
+
+    goals = rows[0][:len(NUTRIENTS)]
+    entries = [row[-1] for row in rows if row[-1] is not None]
+
+    meals = {'breakfast': [], 'lunch': [], 'dinner': [], 'snacks': []}
+    for entry in entries:
+        meals[entry.meal_type].append(entry.to_dict())
+    totals = [sum(getattr(entry, n) for entry in entries) for n in NUTRIENTS]
+
+    return {'meals': meals, 'nutrients': _nutrients(goals, totals)}
+
+
+def range_summary(user_id, start, end):
+    """Per-day totals and compliance for start..end (inclusive) from one GROUP BY date query.
+
+    Days with nothing logged are listed with `nutrients` set to None.
+    `compliance` is the share of days with entries; averages and goal
+    percentages are over those days only. Returns None if the user is gone.
+    """
+    rows = db.session.execute(
+        select(DailyTotal.date, func.coalesce(func.sum(DailyTotal.entry_count), 0),
+               *_goal_columns(), *_total_columns())
+        .select_from(User)
+        .outerjoin(DailyTotal, and_(DailyTotal.user_id == User.id,
+                                    DailyTotal.date >= start, DailyTotal.date <= end))
+        .where(User.id == user_id)
+        .group_by(User.id, DailyTotal.date)
+        .order_by(DailyTotal.date)
+    ).all()
+    if not rows:
+        return None
+
+    goals = rows[0][2:2 + len(NUTRIENTS)]
+    # With nothing logged in range the outer join leaves a single row with no date
+    logged = {row[0]: row for row in rows if row[0] is not None}
+
+    days = []
+    totals = dict.fromkeys(NUTRIENTS, 0)
+    for offset in range((end - start).days + 1):
+        day = start + timedelta(days=offset)
+        row = logged.get(day)
+        days.append({
+            'date': day.isoformat(),
+            'entry_count': row[1] if row else 0,
+            'nutrients': _nutrients(goals, row[2 + len(NUTRIENTS):]) if row else None
+        })
+        if row:
+            for nutrient, total in zip(NUTRIENTS, row[2 + len(NUTRIENTS):]):
+                totals[nutrient] += total
+
+    tracked = len(logged)
+    return {
+        'start_date': start.isoformat(),
+        'end_date': end.isoformat(),
+        'goals': dict(zip(NUTRIENTS, goals)),
+        'days': days,
+        'stats': {
+            'days': len(days),
+            'days_tracked': tracked,
+            'compliance': round(tracked / len(days) * 100, 1),
+            'totals': {n: round(total, 1) for n, total in totals.items()},
+            'averages': {n: round(total / tracked, 1) if tracked else 0 for n, total in totals.items()},
+            'percentages': {
+                n: round(total / tracked / goal * 100, 1) if tracked and goal > 0 else 0
+                for n, total, goal in zip(NUTRIENTS, totals.values(), goals)
+            }
+        }
+    }
+
+
+def encode_cursor(entry):
+    return base64.urlsafe_b64encode(f'{entry.date.isoformat()}:{entry.id}'.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return the (date, id) an entry history cursor points at; ValueError if it is malformed"""
+    day, entry_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(':')
+    return date.fromisoformat(day), int(entry_id)
+
+
+def entry_history(user_id, limit, after=None, meal_type=None, food_id=None, custom_food_id=None,
+                  start=None, end=None):
+    """One page of user_id's entries, newest first, and whether more follow.
+
+    Keyset pagination: `after` is the (date, id) of the last entry already
+    seen, and the page starts strictly below it on the (user_id, date, id)
+    index, so every page costs the same however deep it is.
+    """
+    criteria = [FoodEntry.user_id == user_id]
+    if after:
+        criteria.append(tuple_(FoodEntry.date, FoodEntry.id) < after)
+    if meal_type:
+        criteria.append(FoodEntry.meal_type == meal_type)
+    if food_id:
+        criteria.append(FoodEntry.food_id == food_id)
+    if custom_food_id:
+        criteria.append(FoodEntry.custom_food_id == custom_food_id)
+    if start:
+        criteria.append(FoodEntry.date >= start)
+    if end:
+        criteria.append(FoodEntry.date <= end)
+
+    entries = db.session.scalars(
+        select(FoodEntry)
+        .where(*criteria)
+        .order_by(FoodEntry.date.desc(), FoodEntry.id.desc())
+        .limit(limit + 1)
+    ).all()
+    return entries[:limit], len(entries) > limit
+
+
+def _entry_totals(*criteria):
+    entries = FoodEntry.__table__
+    return (
+        select(entries.c.user_id, entries.c.date, entries.c.meal_type,
+               func.count().label('entry_count'), *(func.sum(entries.c[n]).label(n) for n in NUTRIENTS))
+        .where(*criteria)
+        .group_by(entries.c.user_id, entries.c.date, entries.c.meal_type)
+    )
+
+
+def _replace_totals(criteria=lambda table: ()):
+    """Delete the rollup rows matching criteria(table) and rebuild them from the entries"""
+    totals = DailyTotal.__table__
+    db.session.execute(delete(totals).where(*criteria(totals)))
+    db.session.execute(insert(totals).from_select(
+        ['user_id', 'date', 'meal_type', 'entry_count', *NUTRIENTS],
+        _entry_totals(*criteria(FoodEntry.__table__))
+    ))
+
+
+def refresh_daily_totals(user_id, slots):
+    """Recompute user_id's rollups for (date, meal_type) slots from its entries; the caller commits"""
+    slots = {(day, meal_type) for day, meal_type in slots}
+    if not slots:
+        return
+
+    user_id = int(user_id)
+    # Pending entry changes must reach the database before they are summed
+    db.session.flush()
+    # Bumping the days' versions first row-locks them until commit, so
+    # concurrent writers to the same day rebuild its rollups one at a time
+    # instead of both deleting the old row and inserting the same key
+    _bump_versions(user_id, {day for day, _ in slots})
+    _replace_totals(lambda table: (
+        table.c.user_id == user_id,
+        tuple_(table.c.date, table.c.meal_type).in_(sorted(slots))
+    ))
+
+
+def _bump_versions(user_id, days):
+    table = DiaryVersion.__table__
+    rows = [{'user_id': user_id, 'date': day, 'version': 1} for day in sorted(days)]
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect in ('postgresql', 'sqlite'):
+        dialect_insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        statement = dialect_insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=['user_id', 'date'],
+            set_={'version': table.c.version + 1}
+        )
+        db.session.execute(statement, rows)
+        return
+
+    for row in rows:
+        version = db.session.get(DiaryVersion, (user_id, row['date']), with_for_update=True)
+        if version:
+            version.version += 1
+        else:
+            db.session.add(DiaryVersion(**row))
+
+
+def copy_entries(user_id, dates, meal_type=None, target_meal_type=None):
+    """Copy user_id's entries between (source_date, target_date) pairs in one INSERT ... SELECT.
+
+    Only meal_type is copied if given, into target_meal_type if that is given
+    too. Copies keep the source's snapshot and macros. Returns the
+    (food_id, custom_food_id, date, meal_type) of each row written; the
+    caller refreshes totals and commits.
+    """
+    entries = FoodEntry.__table__
+    pairs = union_all(*(
+        select(literal(source, Date).label('source'), literal(target, Date).label('target'))
+        for source, target in sorted(set(dates))
+    )).subquery('copy_dates')
+
+    criteria = [entries.c.user_id == int(user_id)]
+    if meal_type:
+        criteria.append(entries.c.meal_type == meal_type)
+
+    copied = ['food_id', 'custom_food_id', 'food_name', 'food_brand', 'quantity', *NUTRIENTS]
+    statement = insert(entries).from_select(
+        ['user_id', *copied, 'date', 'meal_type'],
+        select(entries.c.user_id, *(entries.c[name] for name in copied), pairs.c.target,
+               literal(target_meal_type, String) if target_meal_type else entries.c.meal_type)
+        .select_from(entries.join(pairs, entries.c.date == pairs.c.source))
+        .where(*criteria)
+        .order_by(entries.c.date, entries.c.id)
+    ).returning(entries.c.food_id, entries.c.custom_food_id, entries.c.date, entries.c.meal_type)
+    return db.session.execute(statement).all()
+
+
+def diary_etag(user_id, start, end=None):
+    """Strong ETag for user_id's diary from start to end (inclusive) and goals, or None if the user is gone.
+
+    Versions only ever grow, so their sum over a range changes whenever any
+    day in it does. Goals are folded in because summaries report them.
+    """
+    end = end or start
+    row = db.session.execute(
+        select(*_goal_columns(), func.coalesce(func.sum(DiaryVersion.version), 0))
+        .select_from(User)
+        .outerjoin(DiaryVersion, and_(DiaryVersion.user_id == User.id,
+                                      DiaryVersion.date >= start, DiaryVersion.date <= end))
+        .where(User.id == user_id)
+        .group_by(User.id)
+    ).first()
+    if row is None:
+        return None
+
+    key = f'{user_id}:{start.isoformat()}:{end.isoformat()}:' + ':'.join(str(value) for value in row)
+    return hashlib.sha1(key.encode()).hexdigest()[:20]
+
+
+def _bump_all_versions():
+    """Bump every diary day that has a version, entries or a rollup row"""
+    versions = DiaryVersion.__table__
+    db.session.execute(update(versions).values(version=versions.c.version + 1))
+
+    days = union_all(
+        select(FoodEntry.user_id, FoodEntry.date),
+        select(DailyTotal.user_id, DailyTotal.date)
+    ).subquery('diary_days')
+    unversioned = ~select(versions.c.user_id).where(
+        versions.c.user_id == days.c.user_id, versions.c.date == days.c.date
+    ).exists()
+    db.session.execute(insert(versions).from_select(
+        ['user_id', 'date', 'version'],
+        select(days.c.user_id, days.c.date, literal(1)).where(unversioned).distinct()
+    ))
+
+
+def rebuild_daily_totals():
+    """Recompute every rollup row from the entries and return how many there are"""
+    # Cached reads and ETags must not outlive the rows they were built from
+    _bump_all_versions()
+    _replace_totals()
+    db.session.commit()
+    return db.session.scalar(select(func.count()).select_from(DailyTotal))
+
+
+def verify_daily_totals():
+    """List (user_id, date, meal_type) slots whose rollup disagrees with the entries"""
+    totals = DailyTotal.__table__
+    expected = _entry_totals().subquery()
+    slot = and_(totals.c.user_id == expected.c.user_id, totals.c.date == expected.c.date,
+                totals.c.meal_type == expected.c.meal_type)
+    # Values are compared to a cent; PostgreSQL sums integers, SQLite may sum floats
+    differs = or_(
+        totals.c.user_id.is_(None),
+        totals.c.entry_count != expected.c.entry_count,
+        *(func.abs(totals.c[n] - expected.c[n]) > 0.01 for n in NUTRIENTS)
+    )
+
+    stale = db.session.execute(
+        select(expected.c.user_id, expected.c.date, expected.c.meal_type)
+        .select_from(expected.outerjoin(totals, slot))
+        .where(differs)
+    ).all()
+    orphaned = db.session.execute(
+        select(totals.c.user_id, totals.c.date, totals.c.meal_type)
+        .where(~select(expected.c.user_id).where(slot).exists())
+    ).all()
+    return sorted(tuple(row) for row in stale + orphaned)
@@ -0,0 +1,165 @@
+"""Streaming export of a user's data as NDJSON, CSV, or a zip of every table plus images.
+
+Rows are read on a dedicated connection with `yield_per`, which uses a
+server-side cursor where the driver has one, and are encoded a batch at a
+time, so memory stays flat whatever the size of the history. Rows come out
+in id order: an interrupted table export is resumed by passing the last id
+seen as `after_id`. `start`/`end` limit entries by diary date and the other
+tables by creation date (meal items by their meal's).
+"""
+import csv
+import io
+import json
+import os
+import zipfile
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import select
+from app import db
+from app.models import CommunityRecipe, CustomFood, FoodEntry, SavedMeal, SavedMealItem
+
+FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+TOTALS = ['total_calories', 'total_protein', 'total_carbs', 'total_fat', 'total_fiber']
+
+# table -> (model, exported columns, date column for range limits)
+EXPORT_TABLES = {
+    'entries': (FoodEntry, ['id', 'date', 'meal_type', 'food_id', 'custom_food_id', 'food_name',
+                            'food_brand', 'quantity', 'calories', 'protein', 'carbs', 'fat', 'fiber',
+                            'created_at'], 'date'),
+    'custom_foods': (CustomFood, ['id', 'name', 'brand', 'serving_size', 'calories', 'protein', 'carbs',
+                                  'fat', 'fiber', 'sugar', 'sodium', 'created_at'], 'created_at'),
+    'meals': (SavedMeal, ['id', 'name', 'description', *TOTALS, 'created_at'], 'created_at'),
+    'meal_items': (SavedMealItem, ['id', 'meal_id', 'position', 'food_id', 'custom_food_id', 'name', 'quantity',
+                                   'calories', 'protein', 'carbs', 'fat', 'fiber'], 'created_at'),
+    'recipes': (CommunityRecipe, ['id', 'title', 'description', 'instructions', 'image_filename', 'foods',
+                                  *TOTALS, 'likes_count', 'created_at'], 'created_at'),
+}
+
+# Tables without user_id/date columns of their own, scoped through their parent
+OWNERS = {'meal_items': SavedMeal}
+
+# Stored as JSON text; decoded for NDJSON, left as text in CSV
+JSON_COLUMNS = {'foods'}
+
+BATCH_SIZE = 1000
+
+
+def _bounds(column, start, end):
+    """Range criteria for a Date column, or a DateTime one (whole days)"""
+    criteria = []
+    is_datetime = column.type.python_type is datetime
+    if start:
+        criteria.append(column >= (datetime.combine(start, time.min) if is_datetime else start))
+    if end:
+        criteria.append(column < datetime.combine(end + timedelta(days=1), time.min) if is_datetime
+                        else column <= end)
+    return criteria
+
+
+def iter_batches(user_id, table, start=None, end=None, after_id=None, batch_size=BATCH_SIZE):
+    """Yield lists of row dicts from table for user_id in id order"""
+    model, columns, date_column = EXPORT_TABLES[table]
+    owner = OWNERS.get(table, model)
+    statement = (
+        select(*(getattr(model, name) for name in columns))
+        .where(owner.user_id == user_id, *_bounds(getattr(owner, date_column), start, end))
+        .order_by(model.id)
+    )
+    if owner is not model:
+        statement = statement.join_from(model, owner)
+    if after_id:
+        statement = statement.where(model.id > after_id)
+
+    with db.engine.connect() as connection:
+        result = connection.execution_options(yield_per=batch_size).execute(statement)
+        for partition in result.partitions():
+            yield [dict(zip(columns, row)) for row in partition]
+
+
+def _plain(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def ndjson_chunks(batches):
+    for rows in batches:
+        lines = []
+        for row in rows:
+            record = {key: _plain(value) for key, value in row.items()}
+            for key in JSON_COLUMNS & record.keys():
+                record[key] = json.loads(record[key]) if record[key] else None
+            lines.append(json.dumps(record) + '\n')
+        yield ''.join(lines)
+
+
+def csv_chunks(columns, batches, header=True):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(columns)
+    for rows in batches:
+        writer.writerows([_plain(row[name]) for name in columns] for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # A table with no rows still gets its header
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_table(user_id, table, fmt='ndjson', start=None, end=None, after_id=None):
+    """Yield text chunks of table for user_id in fmt ('ndjson' or 'csv').
+
+    A resumed CSV export (after_id given) has no header, so it can be appended
+    to the part already received.
+    """
+    batches = iter_batches(user_id, table, start=start, end=end, after_id=after_id)
+    if fmt == 'csv':
+        return csv_chunks(EXPORT_TABLES[table][1], batches, header=not after_id)
+    return ndjson_chunks(batches)
+
+
+class _ZipStream:
+    """Write-only file for ZipFile that hands back whatever has been written so far"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def export_archive(user_id, image_folder, fmt='ndjson', start=None, end=None):
+    """Yield the bytes of a zip holding every table in fmt plus the user's recipe images"""
+    stream = _ZipStream()
+    # Not seekable, so ZipFile writes sizes in data descriptors after each member
+    with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for table in EXPORT_TABLES:
+            with archive.open(f'{table}.{fmt}', 'w') as member:
+                for chunk in export_table(user_id, table, fmt=fmt, start=start, end=end):
+                    member.write(chunk.encode('utf-8'))
+                    yield stream.drain()
+
+        for rows in iter_batches(user_id, 'recipes', start=start, end=end):
+            for row in rows:
+                filename = row['image_filename']
+                path = os.path.join(image_folder, filename) if filename else None
+                if path and os.path.exists(path):
+                    archive.write(path, f'images/{filename}')
+                    yield stream.drain()
+    yield stream.drain()
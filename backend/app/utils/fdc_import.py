@@ -0,0 +1,344 @@
+"""Bulk import of USDA FoodData Central downloads into `foods`.
+
+Accepts the CSV download (a directory or .zip holding food.csv,
+food_nutrient.csv and optionally branded_food.csv) or a JSON download (.json,
+or a .zip holding one). Files are streamed, so memory stays flat whatever
+their size: CSV nutrient and brand rows are staged in temporary tables (with
+COPY on PostgreSQL) and joined back to food.csv one chunk at a time, JSON
+foods are decoded one object at a time.
+
+Foods are keyed by `fdc_id` (and GTIN barcode, so a product listed under
+several FDC ids is kept once), inserted with ON CONFLICT DO NOTHING and each
+chunk is committed on its own, so an interrupted import is resumed by running
+it again; foods already present are skipped without touching their nutrients.
+"""
+import csv
+import io
+import json
+import os
+import time
+import zipfile
+from collections import defaultdict
+from sqlalchemy import bindparam, insert, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+from app.models import Food
+from app.schemas import CustomValidators
+from app.utils.nutrients import ALL_NUTRIENT_IDS, food_columns, normalize_usda_foods
+
+DEFAULT_DATA_TYPES = ('foundation_food', 'sr_legacy_food', 'survey_fndds_food', 'branded_food')
+
+# JSON downloads spell data types the way the API does
+JSON_DATA_TYPES = {
+    'Foundation': 'foundation_food',
+    'SR Legacy': 'sr_legacy_food',
+    'Survey (FNDDS)': 'survey_fndds_food',
+    'Branded': 'branded_food',
+}
+
+STAGING_DDL = [
+    "CREATE TEMPORARY TABLE IF NOT EXISTS fdc_nutrient_staging "
+    "(fdc_id INTEGER NOT NULL, nutrient_id INTEGER NOT NULL, amount FLOAT)",
+    "CREATE TEMPORARY TABLE IF NOT EXISTS fdc_brand_staging "
+    "(fdc_id INTEGER NOT NULL, brand VARCHAR(50), gtin_upc VARCHAR(20))",
+    "DELETE FROM fdc_nutrient_staging",
+    "DELETE FROM fdc_brand_staging",
+]
+
+STAGING_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_fdc_nutrient_staging_fdc_id ON fdc_nutrient_staging (fdc_id)",
+    "CREATE INDEX IF NOT EXISTS ix_fdc_brand_staging_fdc_id ON fdc_brand_staging (fdc_id)",
+]
+
+
+def _truncate(value, length):
+    value = (value or '').strip()
+    return value[:length] or None
+
+
+def _whole(value):
+    return int(round(value)) if value is not None else None
+
+
+def food_row(food, require_energy=True):
+    """Build a `foods` row from a normalized food, or None if it reports no energy"""
+    if require_energy and food['calories'] is None:
+        return None
+    if not (food['name'] or '').strip():
+        return None
+
+    return {
+        'source': 'usda',
+        'fdc_id': food['fdc_id'],
+        'name': _truncate(food['name'], 100),
+        'brand': _truncate(food['brand'], 50),
+        'barcode': CustomValidators.normalize_barcode(food['barcode']),
+        'calories': _whole(food['calories']) or 0,
+        'protein': _whole(food['protein']) or 0,
+        'carbs': _whole(food['carbs']) or 0,
+        'fat': _whole(food['fat']) or 0,
+        'fiber': _whole(food['fiber']) or 0,
+        'sugar': _whole(food['sugar']),
+        'sodium': _whole(food['sodium']),
+    }
+
+
+def insert_ignore(connection, rows):
+    """Insert food rows, skipping any whose fdc_id or barcode is already stored"""
+    if not rows:
+        return 0
+
+    dialect = connection.dialect.name
+    if dialect == 'postgresql':
+        statement = postgresql.insert(Food).on_conflict_do_nothing()
+    elif dialect == 'sqlite':
+        statement = sqlite.insert(Food).on_conflict_do_nothing()
+    else:
+        statement = insert(Food)
+
+    result = connection.execute(statement, rows)
+    return result.rowcount if result.rowcount >= 0 else len(rows)
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _open_text(archive, name):
+    return io.TextIOWrapper(archive.open(name), encoding='utf-8', newline='')
+
+
+def _csv_opener(path):
+    """Return open(name) for the CSV members of a directory or zip, or None"""
+    if os.path.isdir(path):
+        def opener(name):
+            member = os.path.join(path, name)
+            return open(member, encoding='utf-8', newline='') if os.path.exists(member) else None
+        return opener if os.path.exists(os.path.join(path, 'food.csv')) else None
+
+    if zipfile.is_zipfile(path):
+        archive = zipfile.ZipFile(path)
+        members = {os.path.basename(name): name for name in archive.namelist()}
+        if 'food.csv' not in members:
+            return None
+
+        def opener(name):
+            return _open_text(archive, members[name]) if name in members else None
+        return opener
+
+    return None
+
+
+def _json_stream(path):
+    if zipfile.is_zipfile(path):
+        archive = zipfile.ZipFile(path)
+        names = [name for name in archive.namelist() if name.endswith('.json')]
+        if not names:
+            raise ValueError(f'{path} holds neither food.csv nor a JSON file')
+        return _open_text(archive, names[0])
+    return open(path, encoding='utf-8')
+
+
+def iter_json_array(stream, read_size=1 << 16):
+    """Yield the elements of the first JSON array in stream without loading it whole"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = -1
+    eof = False
+
+    while position < 0:
+        chunk = stream.read(read_size)
+        if not chunk:
+            return
+        position = chunk.find('[')
+        buffer = chunk[position + 1:] if position >= 0 else ''
+
+    while True:
+        buffer = buffer.lstrip(' \t\r\n,')
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            # Element split across reads; pull in more and retry
+            if eof:
+                raise
+            chunk = stream.read(read_size)
+            eof = not chunk
+            buffer += chunk
+            continue
+        yield item
+        buffer = buffer[end:]
+
+
+def _stage(connection, table, columns, rows, chunk_size):
+    """Load rows into a staging table, with COPY where the driver supports it"""
+    staged = 0
+
+    if connection.dialect.name == 'postgresql':
+        cursor = connection.connection.dbapi_connection.cursor()
+        for chunk in _chunks(rows, chunk_size):
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(chunk)
+            buffer.seek(0)
+            cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+            staged += len(chunk)
+        cursor.close()
+        return staged
+
+    statement = text(f"INSERT INTO {table} ({', '.join(columns)}) "
+                     f"VALUES ({', '.join(':' + c for c in columns)})")
+    for chunk in _chunks(rows, chunk_size):
+        connection.execute(statement, [dict(zip(columns, row)) for row in chunk])
+        staged += len(chunk)
+    return staged
+
+
+def _nutrient_rows(reader):
+    for row in reader:
+        nutrient_id = int(row['nutrient_id'])
+        if nutrient_id in ALL_NUTRIENT_IDS and row['amount'] != '':
+            yield int(row['fdc_id']), nutrient_id, float(row['amount'])
+
+
+def _brand_rows(reader):
+    for row in reader:
+        brand = _truncate(row.get('brand_name') or row.get('brand_owner'), 50)
+        yield int(row['fdc_id']), brand, _truncate(row.get('gtin_upc'), 20)
+
+
+def _existing(connection, fdc_ids):
+    found = connection.execute(select(Food.fdc_id).where(Food.fdc_id.in_(fdc_ids)))
+    return set(found.scalars())
+
+
+class _Progress:
+    def __init__(self, report):
+        self.report = report
+        self.started = time.perf_counter()
+        self.read = 0
+        self.inserted = 0
+
+    def add(self, read, inserted):
+        self.read += read
+        self.inserted += inserted
+        if self.report:
+            self.report(f"  {self.read} foods read, {self.inserted} inserted "
+                        f"({self.rate():.0f} rows/sec)")
+
+    def rate(self):
+        elapsed = time.perf_counter() - self.started
+        return self.read / elapsed if elapsed else 0.0
+
+    def to_dict(self):
+        seconds = time.perf_counter() - self.started
+        return {
+            'read': self.read,
+            'inserted': self.inserted,
+            'skipped': self.read - self.inserted,
+            'seconds': round(seconds, 3),
+            'rows_per_sec': round(self.rate(), 1),
+        }
+
+
+def _import_csv(connection, opener, data_types, chunk_size, progress):
+    nutrient_file = opener('food_nutrient.csv')
+    if not nutrient_file:
+        raise ValueError('FDC CSV download is missing food_nutrient.csv')
+
+    for statement in STAGING_DDL:
+        connection.exec_driver_sql(statement)
+
+    with nutrient_file as stream:
+        staged = _stage(connection, 'fdc_nutrient_staging', ('fdc_id', 'nutrient_id', 'amount'),
+                        _nutrient_rows(csv.DictReader(stream)), chunk_size)
+    if progress.report:
+        progress.report(f"  staged {staged} nutrient values")
+
+    brands = opener('branded_food.csv')
+    if brands:
+        with brands as stream:
+            _stage(connection, 'fdc_brand_staging', ('fdc_id', 'brand', 'gtin_upc'),
+                   _brand_rows(csv.DictReader(stream)), chunk_size)
+
+    for statement in STAGING_INDEXES:
+        connection.exec_driver_sql(statement)
+    connection.commit()
+
+    nutrients = text('SELECT fdc_id, nutrient_id, amount FROM fdc_nutrient_staging '
+                     'WHERE fdc_id IN :ids').bindparams(bindparam('ids', expanding=True))
+    brand_info = text('SELECT fdc_id, brand, gtin_upc FROM fdc_brand_staging '
+                      'WHERE fdc_id IN :ids').bindparams(bindparam('ids', expanding=True))
+
+    with opener('food.csv') as stream:
+        foods = (row for row in csv.DictReader(stream) if row['data_type'] in data_types)
+        for chunk in _chunks(foods, chunk_size):
+            existing = _existing(connection, [int(row['fdc_id']) for row in chunk])
+            pending = [row for row in chunk if int(row['fdc_id']) not in existing]
+            ids = [int(row['fdc_id']) for row in pending]
+
+            amounts = defaultdict(dict)
+            branded = {}
+            if ids:
+                for fdc_id, nutrient_id, amount in connection.execute(nutrients, {'ids': ids}):
+                    amounts[fdc_id][nutrient_id] = amount
+                for fdc_id, brand, gtin_upc in connection.execute(brand_info, {'ids': ids}):
+                    branded[fdc_id] = (brand, gtin_upc)
+
+            rows = []
+            for row in pending:
+                fdc_id = int(row['fdc_id'])
+                brand, gtin_upc = branded.get(fdc_id, (None, None))
+                built = food_row({
+                    'fdc_id': fdc_id,
+                    'name': row['description'],
+                    'brand': brand,
+                    'barcode': gtin_upc,
+                    **food_columns(amounts[fdc_id])
+                })
+                if built:
+                    rows.append(built)
+
+            inserted = insert_ignore(connection, rows)
+            connection.commit()
+            progress.add(len(chunk), inserted)
+
+
+def _import_json(connection, stream, data_types, chunk_size, progress):
+    foods = (
+        food for food in iter_json_array(stream)
+        if JSON_DATA_TYPES.get(food.get('dataType'), food.get('dataType')) in data_types
+    )
+    for chunk in _chunks(foods, chunk_size):
+        existing = _existing(connection, [food['fdcId'] for food in chunk])
+        rows = [food_row(food) for food in normalize_usda_foods(chunk) if food['fdc_id'] not in existing]
+
+        inserted = insert_ignore(connection, [row for row in rows if row])
+        connection.commit()
+        progress.add(len(chunk), inserted)
+
+
+def import_fdc(path, data_types=DEFAULT_DATA_TYPES, chunk_size=5000, report=print):
+    """Import an FDC download from path and return row counts and throughput"""
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+
+    data_types = set(data_types)
+    progress = _Progress(report)
+    opener = _csv_opener(path)
+
+    with db.engine.connect() as connection:
+        if opener:
+            _import_csv(connection, opener, data_types, chunk_size, progress)
+        else:
+            with _json_stream(path) as stream:
+                _import_json(connection, stream, data_types, chunk_size, progress)
+
+    return progress.to_dict()
@@ -0,0 +1,393 @@
+"""In-process typeahead index over food names.
+
+Short prefixes are what the AddFoodModal sends on every debounced keystroke,
+so they are answered from sorted arrays held in memory instead of the
+database. Every word start of a name is indexed ("fried chicken" is found by
+"fr" and by "ch"). Misspelled queries fall back to trigram similarity over
+the words of those names. Catalog foods are shared by all users; custom
+foods are partitioned per user, keeping the most recently searched users.
+
+Foods written by other workers or by `flask import-fdc` are picked up by a
+periodic check of the catalog's row count and highest id. Database reads
+happen outside the index lock; only swapping partitions in and reading them
+take it.
+"""
+import bisect
+import heapq
+import re
+import sys
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict, defaultdict
+from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError
+from app import db
+from app.models import Food, CustomFood
+
+# Column order mirrors Food.to_dict / CustomFood.to_dict
+FOOD_FIELDS = ('id', 'name', 'brand', 'calories', 'protein', 'carbs', 'fat', 'fiber')
+CUSTOM_FOOD_FIELDS = FOOD_FIELDS + ('serving_size',)
+
+
+def normalize(name):
+    name = unicodedata.normalize('NFKD', name or '')
+    name = ''.join(c for c in name if not unicodedata.combining(c))
+    return ' '.join(re.findall(r'\w+', name.lower()))
+
+
+class PrefixIndex:
+    """Sorted array of (word-start suffix, id) pairs searched with bisect.
+
+    With key_length, suffixes are cut to that many characters and interned,
+    so the keys of a large catalog share a few thousand strings. Longer
+    prefixes are then checked against the full name by the caller's match.
+    """
+
+    def __init__(self, pairs=(), key_length=None):
+        self.key_length = key_length
+        pairs = sorted((self.key(key), row_id) for key, row_id in pairs)
+        self.keys = [key for key, _ in pairs]
+        self.ids = [row_id for _, row_id in pairs]
+
+    def key(self, suffix):
+        return sys.intern(suffix[:self.key_length]) if self.key_length else suffix
+
+    @staticmethod
+    def suffixes(normalized):
+        words = normalized.split(' ')
+        return [' '.join(words[i:]) for i in range(len(words)) if words[i]]
+
+    def add(self, normalized, row_id):
+        for key in self.suffixes(normalized):
+            key = self.key(key)
+            position = bisect.bisect_right(self.keys, key)
+            self.keys.insert(position, key)
+            self.ids.insert(position, row_id)
+
+    def lookup(self, prefix, limit, match=None):
+        found = []
+        key = self.key(prefix)
+        position = bisect.bisect_left(self.keys, key)
+        while position < len(self.keys) and len(found) < limit:
+            if not self.keys[position].startswith(key):
+                break
+            row_id = self.ids[position]
+            if row_id not in found and (match is None or match(row_id)):
+                found.append(row_id)
+            position += 1
+        return found
+
+    def __len__(self):
+        return len(self.keys)
+
+    def nbytes(self):
+        return (
+            sys.getsizeof(self.keys) + sys.getsizeof(self.ids)
+            + sum(sys.getsizeof(key) for key in set(self.keys))
+        )
+
+
+def trigrams(word):
+    """pg_trgm-style trigrams: the word padded with two leading and one trailing space"""
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """Name vocabulary with trigram postings for typo-tolerant lookups.
+
+    Misspelled query words are matched against distinct name words rather
+    than whole names, so the candidate set stays bounded by the vocabulary.
+    """
+
+    # Query words shorter than this are too ambiguous to match fuzzily
+    MIN_WORD = 3
+
+    def __init__(self, threshold=0.3, max_words=20):
+        self.threshold = threshold
+        self.max_words = max_words
+        self.word_ids = {}
+        self.gram_counts = []
+        self.postings = defaultdict(list)
+        self.rows_by_word = []
+
+    def add(self, normalized, row_id):
+        for word in set(normalized.split(' ')):
+            if len(word) < self.MIN_WORD:
+                continue
+            word_id = self.word_ids.get(word)
+            if word_id is None:
+                word_id = self.word_ids[word] = len(self.gram_counts)
+                grams = trigrams(word)
+                self.gram_counts.append(len(grams))
+                self.rows_by_word.append([])
+                for gram in grams:
+                    self.postings[gram].append(word_id)
+            self.rows_by_word[word_id].append(row_id)
+
+    def similar_words(self, word):
+        """[(similarity, word_id)] for the closest vocabulary words above threshold"""
+        grams = trigrams(word)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+
+        scored = []
+        for word_id, count in shared.items():
+            similarity = count / (len(grams) + self.gram_counts[word_id] - count)
+            if similarity >= self.threshold:
+                scored.append((similarity, word_id))
+        return heapq.nlargest(self.max_words, scored)
+
+    def lookup(self, normalized):
+        """{row_id: similarity}, averaged over the query words"""
+        words = [word for word in normalized.split(' ') if len(word) >= self.MIN_WORD]
+        scores = defaultdict(float)
+        for word in words:
+            best = {}
+            for similarity, word_id in self.similar_words(word):
+                for row_id in self.rows_by_word[word_id]:
+                    if similarity > best.get(row_id, 0):
+                        best[row_id] = similarity
+            for row_id, similarity in best.items():
+                scores[row_id] += similarity / len(words)
+        return scores
+
+    def __len__(self):
+        return len(self.gram_counts)
+
+    def nbytes(self):
+        return (
+            sys.getsizeof(self.word_ids) + sys.getsizeof(self.postings)
+            + sum(sys.getsizeof(ids) for ids in self.postings.values())
+            + sum(sys.getsizeof(ids) for ids in self.rows_by_word)
+        )
+
+
+class _Partition:
+    def __init__(self, rows, key_length=None):
+        self.rows = {row[0]: row for row in rows}
+        names = [(normalize(row[1]), row[0]) for row in rows]
+        self.prefixes = PrefixIndex(
+            ((key, row_id) for name, row_id in names for key in PrefixIndex.suffixes(name)), key_length
+        )
+        # Rows added after the build; inserting into a small array keeps adds cheap
+        self.recent = PrefixIndex(key_length=key_length)
+        self.trigrams = TrigramIndex()
+        for name, row_id in names:
+            self.trigrams.add(name, row_id)
+        self.max_id = max(self.rows, default=0)
+        self.loaded_at = time.monotonic()
+
+    def add(self, row):
+        if row[0] in self.rows:
+            return
+        self.rows[row[0]] = row
+        self.recent.add(normalize(row[1]), row[0])
+        self.trigrams.add(normalize(row[1]), row[0])
+        self.max_id = max(self.max_id, row[0])
+
+    def _matches(self, prefix):
+        key_length = self.prefixes.key_length
+        if not key_length or len(prefix) <= key_length:
+            return None
+        return lambda row_id: any(
+            key.startswith(prefix) for key in PrefixIndex.suffixes(normalize(self.rows[row_id][1]))
+        )
+
+    def lookup(self, prefix, limit):
+        # Over-fetch so whole-name matches can be ranked ahead of later-word matches
+        match = self._matches(prefix)
+        ids = self.recent.lookup(prefix, limit * 4, match) + self.prefixes.lookup(prefix, limit * 4, match)
+        rows = [self.rows[row_id] for row_id in dict.fromkeys(ids)]
+        rows.sort(key=lambda row: (not normalize(row[1]).startswith(prefix), len(row[1])))
+        return rows[:limit]
+
+    def fuzzy_lookup(self, normalized, limit):
+        scores = self.trigrams.lookup(normalized)
+        # Best similarity first; among equals prefer the shortest (least qualified) name
+        best = heapq.nsmallest(limit, scores, key=lambda row_id: (-scores[row_id], len(self.rows[row_id][1])))
+        return [self.rows[row_id] for row_id in best]
+
+    def nbytes(self):
+        return (
+            self.prefixes.nbytes() + self.recent.nbytes() + self.trigrams.nbytes() + sys.getsizeof(self.rows)
+            + sum(sys.getsizeof(row) for row in self.rows.values())
+        )
+
+
+class FoodNameIndex:
+    # More new catalog rows than this are picked up by a rebuild rather than one by one
+    MAX_CATCH_UP = 1000
+
+    def __init__(self, user_ttl=60, catalog_ttl=30, max_users=1000, key_length=None):
+        self.user_ttl = user_ttl
+        self.catalog_ttl = catalog_ttl
+        self.max_users = max_users
+        self.key_length = key_length
+        self.foods = None
+        self.custom = OrderedDict()
+        self.build_seconds = None
+        self.built_at = None
+        self.checked_at = None
+        self._warming = False
+        # Guards reading and swapping partitions; never held across a query
+        self._lock = threading.Lock()
+        # One catalog build or refresh at a time
+        self._build_lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self.foods is not None
+
+    def _food_rows(self, *criteria):
+        return [tuple(row) for row in db.session.query(
+            *[getattr(Food, field) for field in FOOD_FIELDS]
+        ).filter(*criteria).yield_per(5000)]
+
+    def _build(self):
+        started = time.perf_counter()
+        foods = _Partition(self._food_rows(), self.key_length)
+
+        with self._lock:
+            self.foods = foods
+            self.build_seconds = time.perf_counter() - started
+            self.built_at = time.time()
+            self.checked_at = time.monotonic()
+
+        print(f"Food index built: {len(foods.rows)} foods in {self.build_seconds:.3f}s, "
+              f"~{self.nbytes() / 1024 / 1024:.1f} MiB")
+
+    def build(self):
+        with self._build_lock:
+            self._build()
+
+    def warm(self, app):
+        """Build the catalog in a background thread, once"""
+        if self._warming or self.ready:
+            return
+        self._warming = True
+
+        def run():
+            with app.app_context():
+                try:
+                    self.build()
+                except SQLAlchemyError as e:
+                    print(f"Food index will be built on first search: {e}")
+
+        threading.Thread(target=run, name='food-index-warm', daemon=True).start()
+
+    def _refresh_catalog(self):
+        """Add foods other processes wrote since the last check; rebuild if any were deleted"""
+        count, max_id = db.session.query(func.count(Food.id), func.max(Food.id)).one()
+        foods = self.foods
+
+        if max_id and max_id > foods.max_id and count - len(foods.rows) <= self.MAX_CATCH_UP:
+            rows = self._food_rows(Food.id > foods.max_id)
+            with self._lock:
+                for row in rows:
+                    foods.add(row)
+
+        if count != len(foods.rows):
+            self._build()
+        else:
+            self.checked_at = time.monotonic()
+
+    def _catalog(self):
+        if not self.ready:
+            with self._build_lock:
+                if not self.ready:
+                    self._build()
+        # Whoever gets the lock checks; other searches carry on with what is loaded
+        elif time.monotonic() - self.checked_at > self.catalog_ttl and self._build_lock.acquire(blocking=False):
+            try:
+                self._refresh_catalog()
+            finally:
+                self._build_lock.release()
+        return self.foods
+
+    def _user_partition(self, user_id):
+        with self._lock:
+            partition = self.custom.get(user_id)
+            if partition is not None:
+                self.custom.move_to_end(user_id)
+
+        # Other workers may have created custom foods since this one loaded them
+        if partition is None or time.monotonic() - partition.loaded_at > self.user_ttl:
+            rows = db.session.query(
+                *[getattr(CustomFood, field) for field in CUSTOM_FOOD_FIELDS]
+            ).filter(CustomFood.user_id == user_id).all()
+            partition = _Partition([tuple(row) for row in rows], self.key_length)
+
+            with self._lock:
+                self.custom[user_id] = partition
+                self.custom.move_to_end(user_id)
+                while len(self.custom) > self.max_users:
+                    self.custom.popitem(last=False)
+
+        return partition
+
+    def lookup(self, query, user_id, limit=10, custom_limit=5):
+        prefix = normalize(query)
+        if not prefix:
+            return [], []
+
+        catalog = self._catalog()
+        partition = self._user_partition(user_id)
+        with self._lock:
+            foods = catalog.lookup(prefix, limit)
+            custom = partition.lookup(prefix, custom_limit)
+
+        return (
+            [dict(zip(FOOD_FIELDS, row), per='100g') for row in foods],
+            [dict(zip(CUSTOM_FOOD_FIELDS, row), type='custom') for row in custom],
+        )
+
+    def fuzzy_lookup(self, query, user_id, limit=10, custom_limit=5):
+        """Like lookup, but matching misspelled words by trigram similarity"""
+        normalized = normalize(query)
+        if not normalized:
+            return [], []
+
+        catalog = self._catalog()
+        partition = self._user_partition(user_id)
+        with self._lock:
+            foods = catalog.fuzzy_lookup(normalized, limit)
+            custom = partition.fuzzy_lookup(normalized, custom_limit)
+
+        return (
+            [dict(zip(FOOD_FIELDS, row), per='100g') for row in foods],
+            [dict(zip(CUSTOM_FOOD_FIELDS, row), type='custom') for row in custom],
+        )
+
+    def add_food(self, food):
+        with self._lock:
+            if self.ready:
+                self.foods.add(tuple(getattr(food, field) for field in FOOD_FIELDS))
+
+    def add_custom_food(self, custom_food):
+        with self._lock:
+            partition = self.custom.get(custom_food.user_id)
+            if partition is not None:
+                partition.add(tuple(getattr(custom_food, field) for field in CUSTOM_FOOD_FIELDS))
+
+    def nbytes(self):
+        with self._lock:
+            if not self.ready:
+                return 0
+            return self.foods.nbytes() + sum(p.nbytes() for p in self.custom.values())
+
+    def stats(self):
+        with self._lock:
+            stats = {
+                'ready': self.ready,
+                'foods': len(self.foods.rows) if self.ready else 0,
+                'users': len(self.custom),
+                'keys': len(self.foods.prefixes) + len(self.foods.recent) if self.ready else 0,
+                'words': len(self.foods.trigrams) if self.ready else 0,
+                'build_seconds': round(self.build_seconds, 4) if self.build_seconds else None,
+                'built_at': self.built_at,
+            }
+        stats['memory_bytes'] = self.nbytes()
+        return stats
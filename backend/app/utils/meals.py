@@ -0,0 +1,46 @@
+"""Saved meal items, one row per food, and the meal totals kept from them.
+
+Clients still send and receive a meal's foods as a list of dicts; these
+helpers turn such a list into `SavedMealItem` rows and keep the meal's
+`total_*` columns equal to the sum of its items.
+"""
+from sqlalchemy import select
+from app import db
+from app.models import CustomFood, Food, SavedMealItem
+from app.utils.diary import NUTRIENTS
+
+
+def _reference(value):
+    # Foods from outside the database (e.g. 'spoon_123') have no row to point at
+    return value if isinstance(value, int) and not isinstance(value, bool) else None
+
+
+def build_items(user_id, foods, start=0):
+    """SavedMealItem rows for food dicts, dropping references to foods that don't exist or aren't user_id's"""
+    food_ids = {_reference(food.get('food_id')) for food in foods} - {None}
+    custom_ids = {_reference(food.get('custom_food_id')) for food in foods} - {None}
+    if food_ids:
+        food_ids = set(db.session.scalars(select(Food.id).where(Food.id.in_(food_ids))))
+    if custom_ids:
+        custom_ids = set(db.session.scalars(
+            select(CustomFood.id).where(CustomFood.id.in_(custom_ids), CustomFood.user_id == int(user_id))
+        ))
+
+    items = []
+    for position, food in enumerate(foods, start):
+        food_id = _reference(food.get('food_id'))
+        custom_food_id = _reference(food.get('custom_food_id'))
+        items.append(SavedMealItem(
+            position=position,
+            food_id=food_id if food_id in food_ids else None,
+            custom_food_id=custom_food_id if custom_food_id in custom_ids else None,
+            name=food['name'][:100] if isinstance(food.get('name'), str) else None,
+            quantity=food.get('quantity') or 0,
+            **{n: food.get(n) or 0 for n in NUTRIENTS}
+        ))
+    return items
+
+
+def refresh_meal_totals(meal):
+    for nutrient in NUTRIENTS:
+        setattr(meal, f'total_{nutrient}', sum(getattr(item, nutrient) for item in meal.items))
@@ -0,0 +1,150 @@
+"""FoodData Central nutrients mapped onto `Food` columns.
+
+Each column lists candidate FDC nutrient ids in order of preference: SR
+Legacy and Branded foods report energy as 1008, Foundation foods often only
+carry the Atwater factors (2047/2048), carbohydrate may be "by summation"
+(1050), and so on. Amounts are per 100 g; sodium is in mg.
+
+USDA payloads come in several shapes (search results carry `nutrientId` and
+`value`, food details a nested `nutrient` and `amount`, abridged details
+`number` and `amount`), so entries are resolved through precomputed id,
+nutrient-number and exact-name tables in that order.
+"""
+
+NUTRIENT_IDS = {
+    'calories': (1008, 2047, 2048),
+    'protein': (1003,),
+    'carbs': (1005, 1050),
+    'fat': (1004, 1085),
+    'fiber': (1079,),
+    'sugar': (2000, 1063),
+    'sodium': (1093,),
+}
+
+ALL_NUTRIENT_IDS = frozenset(nid for ids in NUTRIENT_IDS.values() for nid in ids)
+
+# nutrient id -> (column, rank); the lowest rank reported wins
+NUTRIENT_TABLE = {
+    nid: (column, rank)
+    for column, ids in NUTRIENT_IDS.items()
+    for rank, nid in enumerate(ids)
+}
+
+NUTRIENT_NUMBERS = {
+    '208': 1008, '957': 2047, '958': 2048,
+    '203': 1003,
+    '205': 1005, '205.2': 1050,
+    '204': 1004, '298': 1085,
+    '291': 1079,
+    '269': 2000, '269.3': 1063,
+    '307': 1093,
+}
+
+NUTRIENT_NAMES = {
+    'energy': 1008,
+    'energy (atwater general factors)': 2047,
+    'energy (atwater specific factors)': 2048,
+    'protein': 1003,
+    'carbohydrate, by difference': 1005,
+    'carbohydrate, by summation': 1050,
+    'total lipid (fat)': 1004,
+    'total fat (nlea)': 1085,
+    'fiber, total dietary': 1079,
+    'sugars, total including nlea': 2000,
+    'total sugars': 2000,
+    'sugars, total': 1063,
+    'sodium, na': 1093,
+}
+
+# labelNutrients keys (per serving, Branded foods only) -> column
+LABEL_COLUMNS = {
+    'calories': 'calories',
+    'protein': 'protein',
+    'carbohydrates': 'carbs',
+    'fat': 'fat',
+    'fiber': 'fiber',
+    'sugars': 'sugar',
+    'sodium': 'sodium',
+}
+
+# Serving size units -> grams (ml taken as g)
+SERVING_UNITS = {'g': 1.0, 'grm': 1.0, 'ml': 1.0, 'mlt': 1.0, 'oz': 28.3495, 'onz': 28.3495}
+
+
+def food_columns(amounts):
+    """Map {nutrient_id: amount} to `Food` column values (None when not reported)"""
+    columns = dict.fromkeys(NUTRIENT_IDS)
+    ranks = {}
+    for nid, amount in amounts.items():
+        if nid not in NUTRIENT_TABLE or amount is None:
+            continue
+        column, rank = NUTRIENT_TABLE[nid]
+        if rank < ranks.get(column, len(ALL_NUTRIENT_IDS)):
+            columns[column] = amount
+            ranks[column] = rank
+    return columns
+
+
+def _nutrient_id(entry):
+    """Resolve a detail or abridged entry (no `nutrientId`) to one of our nutrient ids"""
+    nutrient = entry.get('nutrient') or entry
+    nid = nutrient.get('id')
+    if nid is not None:
+        return nid if nid in NUTRIENT_TABLE else None
+
+    number = nutrient.get('number', entry.get('nutrientNumber'))
+    if number is not None:
+        return NUTRIENT_NUMBERS.get(str(number))
+
+    if (nutrient.get('unitName') or entry.get('unitName') or '').lower() == 'kj':
+        return None
+    return NUTRIENT_NAMES.get((nutrient.get('name') or entry.get('nutrientName') or '').lower())
+
+
+def _label_scale(item):
+    """Factor converting per-serving label values to per 100 g, or None if unusable"""
+    size = item.get('servingSize')
+    if not size:
+        # No serving information: take label values as they are
+        return 1.0
+    grams = SERVING_UNITS.get((item.get('servingSizeUnit') or '').lower())
+    return 100.0 / (size * grams) if grams else None
+
+
+def normalize_usda_food(item):
+    """Convert one USDA search or detail payload to our per-100 g nutrient schema.
+
+    foodNutrients (always per 100 g) take precedence; labelNutrients only fill
+    gaps, scaled to 100 g from the serving size.
+    """
+    amounts = {}
+    for entry in item.get('foodNutrients') or ():
+        # Search results carry the id directly; other shapes need resolving
+        nid = entry.get('nutrientId')
+        if nid is None:
+            nid = _nutrient_id(entry)
+        if nid in NUTRIENT_TABLE and nid not in amounts:
+            amounts[nid] = entry['value'] if 'value' in entry else entry.get('amount')
+
+    columns = food_columns(amounts)
+
+    label = item.get('labelNutrients')
+    scale = _label_scale(item) if label else None
+    if scale:
+        for key, column in LABEL_COLUMNS.items():
+            value = (label.get(key) or {}).get('value')
+            if columns[column] is None and value is not None:
+                columns[column] = value * scale
+
+    return {
+        'fdc_id': item.get('fdcId'),
+        'name': item.get('description'),
+        'brand': item.get('brandName') or item.get('brandOwner'),
+        'barcode': item.get('gtinUpc'),
+        **columns
+    }
+
+
+def normalize_usda_foods(items):
+    """Normalize a batch of USDA payloads in one pass"""
+    return [normalize_usda_food(item) for item in items]
@@ -0,0 +1,24 @@
+"""Paged, searchable and sortable listings of a user's rows, driven by `ListingSchema` arguments."""
+from sqlalchemy import or_
+
+
+def paginate_listing(query, model, args, sort_columns, search_columns):
+    """Filter query by args['search'], sort it and return the requested page"""
+    if args.get('search'):
+        pattern = f"%{args['search']}%"
+        query = query.filter(or_(*(column.ilike(pattern) for column in search_columns)))
+
+    column = sort_columns[args['sort_by']]
+    direction = 'asc' if args['sort_order'] == 'asc' else 'desc'
+    # id breaks ties so rows with equal sort keys never repeat or go missing between pages
+    query = query.order_by(getattr(column, direction)(), getattr(model.id, direction)())
+
+    return query.paginate(page=args['page'], per_page=args['per_page'], error_out=False)
+
+
+def page_info(pagination):
+    return {
+        'total': pagination.total,
+        'pages': pagination.pages,
+        'current_page': pagination.page
+    }
@@ -0,0 +1,215 @@
+"""Indexed full-text search over `foods` and `custom_foods`.
+
+SQLite databases get FTS5 external-content tables kept in sync by triggers.
+PostgreSQL gets a generated `tsvector` column with a GIN index plus a trigram
+index on the lower-cased name, which also serves typo-tolerant matching.
+Anything else falls back to ILIKE.
+"""
+import re
+import weakref
+from sqlalchemy import event, func, or_, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.sql import column, table
+from app import db
+from app.models import Food, CustomFood
+
+SEARCHABLE_TABLES = ('foods', 'custom_foods')
+
+# Minimum trigram word similarity for typo-tolerant matches
+FUZZY_THRESHOLD = 0.3
+
+_backends = weakref.WeakKeyDictionary()
+
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS {t}_fts USING fts5("
+    "name, brand, content='{t}', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    # Rank name matches well above brand matches
+    "INSERT INTO {t}_fts({t}_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+    "CREATE TRIGGER IF NOT EXISTS {t}_fts_ai AFTER INSERT ON {t} BEGIN "
+    "INSERT INTO {t}_fts(rowid, name, brand) VALUES (new.id, new.name, new.brand); END",
+    "CREATE TRIGGER IF NOT EXISTS {t}_fts_ad AFTER DELETE ON {t} BEGIN "
+    "INSERT INTO {t}_fts({t}_fts, rowid, name, brand) VALUES ('delete', old.id, old.name, old.brand); END",
+    "CREATE TRIGGER IF NOT EXISTS {t}_fts_au AFTER UPDATE OF name, brand ON {t} BEGIN "
+    "INSERT INTO {t}_fts({t}_fts, rowid, name, brand) VALUES ('delete', old.id, old.name, old.brand); "
+    "INSERT INTO {t}_fts(rowid, name, brand) VALUES (new.id, new.name, new.brand); END",
+]
+
+POSTGRES_DDL = [
+    "ALTER TABLE {t} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    "GENERATED ALWAYS AS (to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(brand, ''))) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_{t}_search_vector ON {t} USING gin (search_vector)",
+    "CREATE INDEX IF NOT EXISTS ix_{t}_name_trgm ON {t} USING gin (lower(name) gin_trgm_ops)",
+]
+
+
+def _tokens(query):
+    return re.findall(r'\w+', query.lower())
+
+
+def create_search_index(connection):
+    """Create (idempotently) the search structures for the connection's dialect"""
+    dialect = connection.dialect.name
+
+    if dialect == 'sqlite':
+        try:
+            for name in SEARCHABLE_TABLES:
+                exists = connection.exec_driver_sql(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (f'{name}_fts',)
+                ).first()
+                for statement in SQLITE_DDL:
+                    connection.exec_driver_sql(statement.format(t=name))
+                # The triggers only see rows written from now on; index the ones already there
+                if not exists:
+                    connection.exec_driver_sql(f"INSERT INTO {name}_fts({name}_fts) VALUES ('rebuild')")
+        except DBAPIError as e:
+            print(f"FTS5 unavailable, using LIKE search: {e}")
+
+    elif dialect == 'postgresql':
+        try:
+            with connection.begin_nested():
+                connection.exec_driver_sql('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        except DBAPIError as e:
+            print(f"pg_trgm unavailable: {e}")
+
+        for name in SEARCHABLE_TABLES:
+            for statement in POSTGRES_DDL:
+                try:
+                    with connection.begin_nested():
+                        connection.exec_driver_sql(statement.format(t=name))
+                except DBAPIError as e:
+                    print(f"Search index DDL failed on {name}: {e}")
+
+    _backends.pop(connection.engine, None)
+
+
+def drop_search_index(connection):
+    if connection.dialect.name == 'sqlite':
+        for name in SEARCHABLE_TABLES:
+            connection.exec_driver_sql(f'DROP TABLE IF EXISTS {name}_fts')
+    _backends.pop(connection.engine, None)
+
+
+def rebuild_search_index():
+    """Create the index if missing and repopulate it from the base tables"""
+    with db.engine.begin() as connection:
+        create_search_index(connection)
+
+    if search_backend() == 'fts5':
+        with db.engine.begin() as connection:
+            for name in SEARCHABLE_TABLES:
+                connection.exec_driver_sql(f"INSERT INTO {name}_fts({name}_fts) VALUES ('rebuild')")
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _after_create(target, connection, **kw):
+    create_search_index(connection)
+
+
+@event.listens_for(db.metadata, 'before_drop')
+def _before_drop(target, connection, **kw):
+    drop_search_index(connection)
+
+
+def search_backend():
+    engine = db.engine
+    backend = _backends.get(engine)
+
+    if backend is None:
+        backend = 'like'
+        with engine.connect() as connection:
+            if engine.dialect.name == 'sqlite':
+                found = connection.exec_driver_sql(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'foods_fts'"
+                ).first()
+                if found:
+                    backend = 'fts5'
+            elif engine.dialect.name == 'postgresql':
+                found = connection.exec_driver_sql(
+                    "SELECT 1 FROM information_schema.columns "
+                    "WHERE table_name = 'foods' AND column_name = 'search_vector'"
+                ).first()
+                if found:
+                    backend = 'postgres'
+        _backends[engine] = backend
+
+    return backend
+
+
+def _ranked(query, model, terms, limit):
+    backend = search_backend()
+    name = model.__tablename__
+
+    if backend == 'fts5':
+        fts = table(f'{name}_fts', column('rowid'))
+        match = ' '.join(f'"{term}"*' for term in terms)
+        return (
+            query.join(fts, fts.c.rowid == model.id)
+            .filter(text(f'{name}_fts MATCH :match'))
+            .order_by(text(f'{name}_fts.rank'))
+            .params(match=match)
+            .limit(limit)
+            .all()
+        )
+
+    if backend == 'postgres':
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        pattern = '%' + ' '.join(terms) + '%'
+        return (
+            query.filter(or_(
+                text(f"{name}.search_vector @@ to_tsquery('simple', :tsquery)"),
+                func.lower(model.name).like(pattern)
+            ))
+            .order_by(text(f"ts_rank({name}.search_vector, to_tsquery('simple', :tsquery)) DESC"))
+            .params(tsquery=tsquery)
+            .limit(limit)
+            .all()
+        )
+
+    pattern = '%' + ' '.join(terms) + '%'
+    return query.filter(model.name.ilike(pattern)).limit(limit).all()
+
+
+def find_foods(query, limit=10):
+    terms = _tokens(query)
+    if not terms:
+        return []
+    return _ranked(Food.query, Food, terms, limit)
+
+
+def find_custom_foods(user_id, query, limit=5):
+    terms = _tokens(query)
+    if not terms:
+        return []
+    return _ranked(CustomFood.query.filter_by(user_id=user_id), CustomFood, terms, limit)
+
+
+def _similar(query, model, text_query, limit):
+    """Postgres only: rank by pg_trgm word similarity, served by the trigram index"""
+    name = model.__tablename__
+    db.session.execute(
+        text("SELECT set_config('pg_trgm.word_similarity_threshold', :threshold, true)"),
+        {'threshold': str(FUZZY_THRESHOLD)}
+    )
+    return (
+        query.filter(text(f'lower({name}.name) %> lower(:fuzzy)'))
+        .order_by(text(f'word_similarity(lower(:fuzzy), lower({name}.name)) DESC'), func.length(model.name))
+        .params(fuzzy=text_query)
+        .limit(limit)
+        .all()
+    )
+
+
+def find_similar_foods(query, limit=10):
+    """Typo-tolerant match on Postgres; other backends use the in-process food index"""
+    text_query = ' '.join(_tokens(query))
+    if not text_query:
+        return []
+    return _similar(Food.query, Food, text_query, limit)
+
+
+def find_similar_custom_foods(user_id, query, limit=5):
+    text_query = ' '.join(_tokens(query))
+    if not text_query:
+        return []
+    return _similar(CustomFood.query.filter_by(user_id=user_id), CustomFood, text_query, limit)
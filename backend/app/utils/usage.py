@@ -0,0 +1,177 @@
+"""Per-user and global food usage counters used to rank search results.
+
+Each logged use weighs 2^((t - EPOCH) / half-life). Sums of these weights
+order foods exactly as exponentially decayed counts would at any moment, so
+rows never need rewriting as time passes. The weights themselves grow without
+bound, so scores are stored as log2 of the sum and combined with log_add.
+Counters are bumped in the same transaction as the entries that cause them
+instead of being recomputed from `food_entries`.
+"""
+import math
+from collections import Counter
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import bindparam, case, func, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import joinedload
+from app import db
+from app.models import Food, FoodUsage
+
+EPOCH = datetime(2024, 1, 1)
+# Beyond this gap 2^-gap no longer changes a float sum
+LOG_ADD_MAX_GAP = 64
+
+
+def log_weight(when=None):
+    """log2 of the weight of one use at when"""
+    half_life = current_app.config['USAGE_HALF_LIFE_DAYS'] * 24 * 60 * 60
+    return ((when or datetime.utcnow()) - EPOCH).total_seconds() / half_life
+
+
+def log_add(a, b):
+    """log2(2^a + 2^b) without leaving log space"""
+    gap = abs(a - b)
+    return max(a, b) + (math.log2(1 + 2 ** -gap) if gap < LOG_ADD_MAX_GAP else 0)
+
+
+def _sql_log_add(a, b, dialect):
+    greatest = func.max if dialect == 'sqlite' else func.greatest
+    gap = func.abs(a - b)
+    return greatest(a, b) + case(
+        (gap < LOG_ADD_MAX_GAP, func.ln(1 + func.exp(-gap * math.log(2))) / math.log(2)),
+        else_=0
+    )
+
+
+def _upsert(rows, column):
+    table = FoodUsage.__table__
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect in ('postgresql', 'sqlite'):
+        insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        statement = insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=['user_id', column],
+            index_where=table.c[column].isnot(None),
+            set_={
+                'use_count': table.c.use_count + statement.excluded.use_count,
+                'score': _sql_log_add(table.c.score, statement.excluded.score, dialect),
+                'last_used_at': statement.excluded.last_used_at,
+            }
+        )
+        db.session.execute(statement, rows)
+        return
+
+    for row in rows:
+        usage = FoodUsage.query.filter_by(user_id=row['user_id'], **{column: row[column]}).first()
+        if usage:
+            usage.use_count += row['use_count']
+            usage.score = log_add(usage.score, row['score'])
+            usage.last_used_at = row['last_used_at']
+        else:
+            db.session.add(FoodUsage(**row))
+
+
+def record_usage(user_id, items, when=None):
+    """Count uses of (food_id, custom_food_id) pairs for user_id; the caller commits"""
+    counts = Counter((food_id, custom_food_id) for food_id, custom_food_id in items
+                     if food_id or custom_food_id)
+    if not counts:
+        return
+
+    when = when or datetime.utcnow()
+    weight = log_weight(when)
+    rows = {'food_id': [], 'custom_food_id': []}
+    for (food_id, custom_food_id), count in counts.items():
+        rows['food_id' if food_id else 'custom_food_id'].append({
+            'user_id': user_id,
+            'food_id': food_id or None,
+            'custom_food_id': None if food_id else custom_food_id,
+            'use_count': count,
+            'score': math.log2(count) + weight,
+            'last_used_at': when,
+        })
+
+    for column, column_rows in rows.items():
+        if column_rows:
+            _upsert(column_rows, column)
+
+    if rows['food_id']:
+        foods = Food.__table__
+        dialect = db.session.get_bind().dialect.name
+        score = bindparam('b_score')
+        db.session.execute(
+            update(foods)
+            .where(foods.c.id == bindparam('b_id'))
+            .values(use_count=foods.c.use_count + bindparam('b_count'),
+                    # A food nobody has used has no weight to add to
+                    usage_score=case((foods.c.use_count == 0, score),
+                                     else_=_sql_log_add(foods.c.usage_score, score, dialect))),
+            [{'b_id': row['food_id'], 'b_count': row['use_count'], 'b_score': row['score']}
+             for row in rows['food_id']]
+        )
+
+
+def rank_results(user_id, results, limit=10, custom_limit=5):
+    """Order search results by the user's usage, then global popularity, then relevance"""
+    food_ids = [r['id'] for r in results if r.get('type') != 'custom']
+    custom_ids = [r['id'] for r in results if r.get('type') == 'custom']
+
+    personal = {}
+    if results:
+        usages = db.session.execute(
+            select(FoodUsage.food_id, FoodUsage.custom_food_id, FoodUsage.score).where(
+                FoodUsage.user_id == user_id,
+                or_(FoodUsage.food_id.in_(food_ids), FoodUsage.custom_food_id.in_(custom_ids))
+            )
+        )
+        for food_id, custom_food_id, score in usages:
+            personal[('food', food_id) if food_id else ('custom', custom_food_id)] = score
+
+    popular = {}
+    if food_ids:
+        popular = dict(db.session.execute(
+            select(Food.id, Food.usage_score).where(Food.id.in_(food_ids), Food.use_count > 0)
+        ).all())
+
+    def key(result):
+        kind = 'custom' if result.get('type') == 'custom' else 'food'
+        # Scores are logs, so foods without any use sort after every used one
+        return (-personal.get((kind, result['id']), -math.inf),
+                -(popular.get(result['id'], -math.inf) if kind == 'food' else -math.inf))
+
+    ranked = []
+    remaining = {'food': limit, 'custom': custom_limit}
+    # sorted() is stable, so relevance order survives among equal scores
+    for result in sorted(results, key=key):
+        kind = 'custom' if result.get('type') == 'custom' else 'food'
+        if remaining[kind] > 0:
+            ranked.append(result)
+            remaining[kind] -= 1
+    return ranked
+
+
+def recent_foods(user_id, limit=20):
+    """The user's most used foods, most recent and frequent first"""
+    usages = (
+        FoodUsage.query
+        .filter_by(user_id=user_id)
+        .options(joinedload(FoodUsage.food), joinedload(FoodUsage.custom_food))
+        .order_by(FoodUsage.score.desc())
+        .limit(limit)
+        .all()
+    )
+
+    results = []
+    for usage in usages:
+        if usage.food:
+            food = usage.food.to_dict()
+        elif usage.custom_food:
+            food = usage.custom_food.to_dict()
+            food['type'] = 'custom'
+        else:
+            continue
+        food['use_count'] = usage.use_count
+        food['last_used_at'] = usage.last_used_at.isoformat() if usage.last_used_at else None
+        results.append(food)
+    return results
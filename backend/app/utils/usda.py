@@ -0,0 +1,250 @@
+"""Client for the USDA FoodData Central API.
+
+One pooled keep-alive session is shared by every request in the process.
+Connection errors and 502/503/504 responses are retried with backoff; read
+timeouts are not, and `timeout` bounds the whole call, retries included. After
+`failure_threshold` consecutive failures the circuit opens and calls fail
+fast with `UsdaUnavailableError` for `reset_timeout` seconds, after which a
+single trial request decides whether it closes again. Requests per API key
+are counted per hour and the rate-limit headers api.data.gov sends back are
+recorded, so an exhausted key is also short-circuited until its window ends.
+"""
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_BASE_URL = 'https://api.nal.usda.gov/fdc/v1'
+SEARCH_DATA_TYPES = ['Branded', 'SR Legacy', 'Foundation']
+RETRY_STATUSES = (502, 503, 504)
+BACKOFF_FACTOR = 0.2
+
+
+class UsdaError(Exception):
+    pass
+
+
+class UsdaUnavailableError(UsdaError):
+    """Raised without calling upstream while the circuit is open or the key is exhausted"""
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._trial_thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def available(self):
+        """Whether allow() would let a call through right now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            return not self._trial_running
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+
+            if self.state == self.CLOSED:
+                return True
+
+            # Half-open: let exactly one trial request through
+            if self.state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                self._trial_thread = threading.get_ident()
+                return True
+
+            return False
+
+    def release(self):
+        """Free the trial slot if this thread holds it, whatever the call's outcome"""
+        with self._lock:
+            if self._trial_running and self._trial_thread == threading.get_ident():
+                self._trial_running = False
+                self._trial_thread = None
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class KeyQuota:
+    """Requests made with one API key in the current hour"""
+
+    def __init__(self, hourly_limit):
+        self.limit = hourly_limit
+        self.window_start = time.time()
+        self.used = 0
+        self.remaining = None
+
+    def _roll(self):
+        if time.time() - self.window_start >= 3600:
+            self.window_start = time.time()
+            self.used = 0
+            self.remaining = None
+
+    def exhausted(self):
+        self._roll()
+        if self.remaining is not None:
+            return self.remaining <= 0
+        return self.used >= self.limit
+
+    def record(self, response):
+        self._roll()
+        self.used += 1
+        limit = response.headers.get('X-RateLimit-Limit')
+        remaining = response.headers.get('X-RateLimit-Remaining')
+        if limit and limit.isdigit():
+            self.limit = int(limit)
+        if remaining and remaining.isdigit():
+            self.remaining = int(remaining)
+
+    def to_dict(self):
+        self._roll()
+        return {
+            'limit': self.limit,
+            'used': self.used,
+            'remaining': self.remaining if self.remaining is not None else max(self.limit - self.used, 0),
+            'window_start': self.window_start,
+        }
+
+
+class UsdaClient:
+    def __init__(self, api_key=None, base_url=DEFAULT_BASE_URL, timeout=5, retries=2,
+                 pool_size=10, failure_threshold=5, reset_timeout=30, hourly_quota=1000):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.retries = retries
+        self.hourly_quota = hourly_quota
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.quotas = {}
+        self._lock = threading.Lock()
+
+        # Retries are made by _send so they share one deadline
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _quota(self):
+        with self._lock:
+            if self.api_key not in self.quotas:
+                self.quotas[self.api_key] = KeyQuota(self.hourly_quota)
+            return self.quotas[self.api_key]
+
+    @property
+    def available(self):
+        """Whether a call would be attempted right now"""
+        if not self.api_key or self._quota().exhausted():
+            return False
+        return self.breaker.available
+
+    def _can_retry(self, attempt, deadline):
+        return attempt < self.retries and time.monotonic() + BACKOFF_FACTOR * 2 ** attempt < deadline
+
+    def _send(self, method, url, quota, **kwargs):
+        """Send with retries on connection errors and 502/503/504, all within `timeout`"""
+        deadline = time.monotonic() + self.timeout
+        attempt = 0
+        while True:
+            try:
+                response = self.session.request(
+                    method,
+                    url,
+                    params={'api_key': self.api_key},
+                    timeout=max(deadline - time.monotonic(), 0.001),
+                    **kwargs
+                )
+            except requests.ConnectionError:
+                # A read timeout isn't a ConnectionError, so a slow upstream is never retried
+                if not self._can_retry(attempt, deadline):
+                    raise
+            else:
+                with self._lock:
+                    quota.record(response)
+                if response.status_code not in RETRY_STATUSES or not self._can_retry(attempt, deadline):
+                    return response
+                response.close()
+
+            time.sleep(BACKOFF_FACTOR * 2 ** attempt)
+            attempt += 1
+
+    def _request(self, method, path, missing=(), **kwargs):
+        """Return the decoded JSON body, or None if the status is in missing"""
+        if not self.api_key:
+            raise UsdaError('USDA API not configured')
+
+        quota = self._quota()
+        if quota.exhausted():
+            raise UsdaUnavailableError('USDA API key quota exhausted')
+        if not self.breaker.allow():
+            raise UsdaUnavailableError('USDA API circuit open')
+
+        try:
+            response = self._send(method, f'{self.base_url}{path}', quota, **kwargs)
+
+            if response.status_code >= 500 or response.status_code == 429:
+                self.breaker.record_failure()
+                raise UsdaError(f'USDA API returned {response.status_code}')
+            if response.status_code in missing:
+                self.breaker.record_success()
+                return None
+            if response.status_code != 200:
+                # Upstream answered but refused this request; that says nothing about its health
+                raise UsdaError(f'USDA API returned {response.status_code}')
+
+            data = response.json()
+            self.breaker.record_success()
+            return data
+        except (requests.RequestException, ValueError):
+            self.breaker.record_failure()
+            raise
+        finally:
+            self.breaker.release()
+
+    def search(self, query, page_size=5, data_types=SEARCH_DATA_TYPES):
+        data = self._request('POST', '/foods/search', json={
+            'query': query,
+            'pageSize': page_size,
+            'dataType': data_types
+        })
+        return data.get('foods', [])
+
+    def food(self, fdc_id):
+        """Return the food detail payload, or None if USDA does not know the id"""
+        return self._request('GET', f'/food/{fdc_id}', missing=(404,))
+
+    def stats(self):
+        with self._lock:
+            quotas = {
+                f'...{key[-4:]}' if key else None: quota.to_dict()
+                for key, quota in self.quotas.items()
+            }
+        return {
+            'configured': bool(self.api_key),
+            'circuit': self.breaker.state,
+            'consecutive_failures': self.breaker.failures,
+            'quota': quotas,
+        }
@@ -0,0 +1,161 @@
+"""Cache for USDA FoodData Central search results.
+
+Lookups go through an in-process LRU first, then the `usda_search_results`
+table so results survive restarts and are shared between workers. On a miss,
+the upstream call runs on an executor and concurrent callers asking for the
+same query in this process share its future instead of each spending API
+quota. Results that land after the caller stopped waiting are kept in the
+LRU and written to the table by the next request that reads them.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from sqlalchemy.exc import SQLAlchemyError
+from app import db
+from app.models import UsdaSearchResult
+
+
+def normalize_query(query):
+    return ' '.join(query.lower().split())
+
+
+class UsdaSearchCache:
+    def __init__(self, ttl=86400, max_entries=1024, namespace=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # Kept apart from search keys in the shared table; a tab never survives normalize_query
+        self.namespace = namespace
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _key(self, query):
+        key = normalize_query(query)
+        return f'{self.namespace}\t{key}' if self.namespace else key
+
+    def _remember(self, key, results, fetched_at, persisted=True):
+        with self._lock:
+            self._entries[key] = (results, fetched_at, persisted)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, query):
+        key = self._key(query)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.time() - entry[1] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self._entries.pop(key, None)
+                entry = None
+
+        if entry:
+            if not entry[2]:
+                self.persist(query)
+            return entry[0]
+
+        row = db.session.get(UsdaSearchResult, key)
+        if row and row.fetched_at > datetime.utcnow() - timedelta(seconds=self.ttl):
+            results = json.loads(row.results)
+            fetched_at = time.time() - (datetime.utcnow() - row.fetched_at).total_seconds()
+            self._remember(key, results, fetched_at)
+            with self._lock:
+                self.persistent_hits += 1
+            return results
+
+        return None
+
+    def put(self, query, results):
+        key = self._key(query)
+
+        with self._lock:
+            known = key in self._entries
+        if not known:
+            self._remember(key, results, time.time(), persisted=False)
+
+        self.persist(query)
+
+    def persist(self, query):
+        """Write a remembered result to the table if it is not there yet"""
+        key = self._key(query)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry or entry[2]:
+                return
+            self._entries[key] = (entry[0], entry[1], True)
+
+        try:
+            db.session.merge(UsdaSearchResult(
+                query_key=key,
+                results=json.dumps(entry[0]),
+                fetched_at=datetime.utcfromtimestamp(entry[1])
+            ))
+            db.session.commit()
+        except SQLAlchemyError as e:
+            # Another worker stored the same query first; the memory tier still has it
+            db.session.rollback()
+            print(f"USDA cache write skipped: {e}")
+
+    def _landed(self, key, future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+        if future.cancelled() or future.exception() is not None:
+            return
+
+        with self._lock:
+            known = key in self._entries
+        if not known:
+            self._remember(key, future.result(), time.time(), persisted=False)
+
+    def fetch_async(self, query, fetch, executor):
+        """Return a future for query's results, starting at most one fetch(query) per miss"""
+        cached = self.get(query)
+        if cached is not None:
+            future = Future()
+            future.set_result(cached)
+            return future
+
+        key = self._key(query)
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is None:
+                future = executor.submit(fetch, query)
+                self._inflight[key] = future
+                self.misses += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if leader:
+            future.add_done_callback(partial(self._landed, key))
+
+        return future
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.persistent_hits + self.misses + self.coalesced
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'persistent_hits': self.persistent_hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'hit_rate': round((lookups - self.misses) / lookups, 3) if lookups else None,
+            }
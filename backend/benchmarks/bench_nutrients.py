@@ -0,0 +1,105 @@
+"""Compare the nested `get_nutrient` substring scan with the batch normalizer.
+
+Uses synthetic search payloads shaped like FDC Branded results (the macros
+plus a few dozen vitamins and minerals per food):
+
+    python -m benchmarks.bench_nutrients --foods 50 --rounds 200
+"""
+import argparse
+import time
+from app.utils.nutrients import normalize_usda_foods
+from benchmarks.fake_fdc import make_food, search_item, SAMPLE_FOODS
+
+EXTRA_NUTRIENTS = [
+    'Calcium, Ca', 'Iron, Fe', 'Potassium, K', 'Sodium, Na', 'Vitamin A, IU', 'Vitamin C, total ascorbic acid',
+    'Cholesterol', 'Fatty acids, total saturated', 'Fatty acids, total trans', 'Sugars, total including NLEA',
+    'Magnesium, Mg', 'Phosphorus, P', 'Zinc, Zn', 'Copper, Cu', 'Selenium, Se', 'Thiamin', 'Riboflavin',
+    'Niacin', 'Vitamin B-6', 'Folate, total', 'Vitamin B-12', 'Vitamin D (D2 + D3)', 'Vitamin E', 'Vitamin K',
+    'Fatty acids, total monounsaturated', 'Fatty acids, total polyunsaturated', 'Water', 'Ash',
+]
+
+
+def legacy_convert(items):
+    """The per-item closure scan search_foods used before the normalizer"""
+    results = []
+    for item in items:
+        food_nutrients = item.get('foodNutrients', [])
+
+        def get_nutrient(nutrient_name):
+            for nutrient in food_nutrients:
+                name = nutrient.get('nutrientName', '')
+                if nutrient_name.lower() in name.lower():
+                    return nutrient.get('value', 0)
+            return 0
+
+        label_nutrients = item.get('labelNutrients', {})
+
+        results.append({
+            'id': f"usda_{item['fdcId']}",
+            'name': item.get('description', '').title(),
+            'calories': label_nutrients.get('calories', {}).get('value') or get_nutrient('Energy'),
+            'protein': label_nutrients.get('protein', {}).get('value') or get_nutrient('Protein'),
+            'carbs': label_nutrients.get('carbohydrates', {}).get('value') or get_nutrient('Carbohydrate'),
+            'fat': label_nutrients.get('fat', {}).get('value') or get_nutrient('Total lipid'),
+            'fiber': label_nutrients.get('fiber', {}).get('value') or get_nutrient('Fiber'),
+            'type': 'usda'
+        })
+    return results
+
+
+def normalized_convert(items):
+    return [
+        {
+            'id': f"usda_{food['fdc_id']}",
+            'name': (food['name'] or '').title(),
+            'calories': food['calories'] or 0,
+            'protein': food['protein'] or 0,
+            'carbs': food['carbs'] or 0,
+            'fat': food['fat'] or 0,
+            'fiber': food['fiber'] or 0,
+            'type': 'usda'
+        }
+        for food in normalize_usda_foods(items)
+    ]
+
+
+def make_items(count):
+    items = []
+    for i in range(count):
+        fdc_id, description, data_type, amounts = SAMPLE_FOODS[i % len(SAMPLE_FOODS)]
+        item = search_item(make_food(fdc_id + i, description, data_type, amounts))
+        # Real payloads list vitamins and minerals first, so the scan walks past them
+        extras = [
+            {'nutrientId': 5000 + n, 'nutrientNumber': str(500 + n), 'nutrientName': name,
+             'unitName': 'MG', 'value': 1.0}
+            for n, name in enumerate(EXTRA_NUTRIENTS)
+        ]
+        item['foodNutrients'] = extras + item['foodNutrients']
+        items.append(item)
+    return items
+
+
+def timed(label, convert, items, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        convert(items)
+    elapsed = time.perf_counter() - started
+    per_item = elapsed * 1e6 / (rounds * len(items))
+    print(f"{label:<22} {elapsed * 1000 / rounds:8.3f} ms/batch  {per_item:7.2f} us/item")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--foods', type=int, default=50, help='USDA results per batch')
+    parser.add_argument('--rounds', type=int, default=200)
+    args = parser.parse_args()
+
+    items = make_items(args.foods)
+    legacy = timed('get_nutrient scan', legacy_convert, items, args.rounds)
+    batch = timed('normalize_usda_foods', normalized_convert, items, args.rounds)
+    print(f"speedup: {legacy / batch:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
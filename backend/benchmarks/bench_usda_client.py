@@ -0,0 +1,63 @@
+"""Compare bare `requests.post` calls with the pooled USDA client.
+
+Runs against the fake FDC server, so no API key or network is needed:
+
+    python -m benchmarks.bench_usda_client --requests 200 --latency 0.01
+"""
+import argparse
+import time
+import requests
+from app.utils.usda import UsdaClient, UsdaError
+from benchmarks.fake_fdc import FakeFDCServer
+
+
+def bare_search(url, query):
+    response = requests.post(
+        f'{url}/foods/search',
+        params={'api_key': 'bench'},
+        json={'query': query, 'pageSize': 5},
+        timeout=5
+    )
+    if response.status_code != 200:
+        raise UsdaError(response.status_code)
+    return response.json().get('foods', [])
+
+
+def run(label, fake, search, count):
+    fake.requests = 0
+    fake.connections.clear()
+    failures = 0
+    started = time.perf_counter()
+
+    for _ in range(count):
+        try:
+            search('banana')
+        except Exception:
+            failures += 1
+
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {elapsed * 1000 / count:8.2f} ms/call  "
+          f"{fake.requests:5d} upstream requests  {len(fake.connections):4d} connections  "
+          f"{failures:4d} failures")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.01)
+    args = parser.parse_args()
+
+    with FakeFDCServer(latency=args.latency) as fake:
+        run('bare requests.post', fake, lambda q: bare_search(fake.url, q), args.requests)
+        client = UsdaClient(api_key='bench', base_url=fake.url, hourly_quota=10 ** 6)
+        run('pooled client', fake, client.search, args.requests)
+
+        # Upstream down: bare calls keep paying for every request, the breaker stops after a few
+        fake.failure_rate = 1.0
+        run('bare requests.post (down)', fake, lambda q: bare_search(fake.url, q), args.requests)
+        client = UsdaClient(api_key='bench', base_url=fake.url, hourly_quota=10 ** 6, reset_timeout=60)
+        run('pooled client (down)', fake, client.search, args.requests)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+"""Local stand-in for the USDA FoodData Central API.
+
+Serves `POST /fdc/v1/foods/search` and `GET /fdc/v1/food/<fdc_id>` from an
+in-memory list of foods, with configurable latency and failure rate, so the
+USDA client can be tested and benchmarked offline:
+
+    python -m benchmarks.fake_fdc --port 8089 --latency 0.2 --failure-rate 0.1
+    USDA_API_URL=http://127.0.0.1:8089/fdc/v1 USDA_API_KEY=fake flask run
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# FDC nutrient ids/numbers: energy, protein, fat, carbohydrate, fiber
+NUTRIENTS = [
+    (1008, '208', 'Energy', 'KCAL'),
+    (1003, '203', 'Protein', 'G'),
+    (1004, '204', 'Total lipid (fat)', 'G'),
+    (1005, '205', 'Carbohydrate, by difference', 'G'),
+    (1079, '291', 'Fiber, total dietary', 'G'),
+]
+
+SAMPLE_FOODS = [
+    (171077, 'Chicken, broiler or fryers, breast, skinless, boneless, meat only, cooked, grilled',
+     'SR Legacy', [151, 30.5, 3.2, 0, 0]),
+    (173944, 'Bananas, raw', 'SR Legacy', [89, 1.1, 0.3, 22.8, 2.6]),
+    (170379, 'Broccoli, raw', 'SR Legacy', [34, 2.8, 0.4, 6.6, 2.6]),
+    (173424, 'Salmon, Atlantic, farmed, raw', 'SR Legacy', [208, 20.4, 13.4, 0, 0]),
+    (2345678, 'Greek yogurt, plain, nonfat', 'Branded', [59, 10.2, 0.4, 3.6, 0], '818290011510'),
+]
+
+
+def make_food(fdc_id, description, data_type, amounts, gtin_upc=None):
+    """Build a food in the detail (`GET /food/<id>`) format"""
+    food = {
+        'fdcId': fdc_id,
+        'description': description,
+        'dataType': data_type,
+        'foodNutrients': [
+            {'nutrient': {'id': nid, 'number': number, 'name': name, 'unitName': unit}, 'amount': amount}
+            for (nid, number, name, unit), amount in zip(NUTRIENTS, amounts)
+        ],
+    }
+    if gtin_upc:
+        food['gtinUpc'] = gtin_upc
+    return food
+
+
+def search_item(food):
+    """Convert a detail-format food into the abridged `/foods/search` format"""
+    item = {key: value for key, value in food.items() if key != 'foodNutrients'}
+    item['foodNutrients'] = [
+        {
+            'nutrientId': n['nutrient'].get('id'),
+            'nutrientNumber': n['nutrient'].get('number'),
+            'nutrientName': n['nutrient'].get('name'),
+            'unitName': n['nutrient'].get('unitName'),
+            'value': n.get('amount', 0),
+        }
+        for n in food.get('foodNutrients', [])
+    ]
+    return item
+
+
+class FakeFDCServer:
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, failure_rate=0.0,
+                 foods=None, hourly_limit=1000):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.hourly_limit = hourly_limit
+        self.foods = {food['fdcId']: food for food in (foods or [make_food(*f) for f in SAMPLE_FOODS])}
+        self.requests = 0
+        self.connections = set()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f'http://{host}:{port}/fdc/v1'
+
+    def search(self, query, page_size=50):
+        words = re.findall(r'\w+', query.lower())
+        hits = [
+            food for food in self.foods.values()
+            if all(word in food['description'].lower() or word == food.get('gtinUpc') for word in words)
+        ]
+        return [search_item(food) for food in hits[:page_size]]
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out in separate writes; don't let Nagle delay keep-alive replies
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode()
+                with server._lock:
+                    remaining = max(server.hourly_limit - server.requests, 0)
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('X-RateLimit-Limit', str(server.hourly_limit))
+                self.send_header('X-RateLimit-Remaining', str(remaining))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _begin(self):
+                with server._lock:
+                    server.requests += 1
+                    server.connections.add(self.client_address)
+
+                if server.latency:
+                    time.sleep(server.latency)
+
+                if 'api_key=' not in self.path:
+                    self._send(403, {'error': {'code': 'API_KEY_MISSING'}})
+                    return False
+
+                if server.failure_rate and random.random() < server.failure_rate:
+                    self._send(503, {'error': 'Service Unavailable'})
+                    return False
+
+                return True
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length) or b'{}')
+                if not self._begin():
+                    return
+
+                if self.path.split('?')[0].endswith('/foods/search'):
+                    foods = server.search(body.get('query', ''), body.get('pageSize', 50))
+                    self._send(200, {'totalHits': len(foods), 'foods': foods})
+                else:
+                    self._send(404, {'error': 'Not Found'})
+
+            def do_GET(self):
+                if not self._begin():
+                    return
+
+                match = re.search(r'/food/(\d+)', self.path)
+                food = server.foods.get(int(match.group(1))) if match else None
+                if food:
+                    self._send(200, food)
+                else:
+                    self._send(404, {'error': 'Not Found'})
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fake USDA FoodData Central API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='fraction of requests answered with 503')
+    args = parser.parse_args()
+
+    fake = FakeFDCServer(args.host, args.port, args.latency, args.failure_rate)
+    print(f"Fake FDC API listening on {fake.url}")
+    try:
+        fake._server.serve_forever()
+    except KeyboardInterrupt:
+        fake.stop()
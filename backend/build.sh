@@ -6,5 +6,6 @@ set -o errexit
 pip install --upgrade pip
 pip install -r requirements.txt
 
-# Run database migrations
-python -c "from run import app, db; app.app_context().push(); db.create_all(); print('Database initialized!')"
\ No newline at end of file
+# Create any missing tables, then apply schema migrations
+python -c "from run import app, db; app.app_context().push(); db.create_all(); print('Database initialized!')"
+FLASK_APP=run.py flask db upgrade
\ No newline at end of file
@@ -27,13 +27,52 @@ class Config:
     FRONTEND_URL = os.environ.get('FRONTEND_URL') or 'http://localhost:3000'
 
     USDA_API_KEY = os.environ.get('USDA_API_KEY')
+    USDA_API_URL = os.environ.get('USDA_API_URL') or 'https://api.nal.usda.gov/fdc/v1'
+    # Seconds a USDA call may take in total, retries of connection errors and 502/503/504 included
+    USDA_TIMEOUT = float(os.environ.get('USDA_TIMEOUT', 5))
+    USDA_RETRIES = int(os.environ.get('USDA_RETRIES', 2))
+    USDA_POOL_SIZE = int(os.environ.get('USDA_POOL_SIZE', 10))
+    # Consecutive failures before USDA calls are skipped, and for how many seconds
+    USDA_BREAKER_THRESHOLD = int(os.environ.get('USDA_BREAKER_THRESHOLD', 5))
+    USDA_BREAKER_RESET = float(os.environ.get('USDA_BREAKER_RESET', 30))
+    USDA_HOURLY_QUOTA = int(os.environ.get('USDA_HOURLY_QUOTA', 1000))
     OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
 
+    # Queries up to this many characters are answered from the in-memory food index
+    FOOD_INDEX_MAX_PREFIX = int(os.environ.get('FOOD_INDEX_MAX_PREFIX', 3))
+    FOOD_INDEX_USER_TTL = int(os.environ.get('FOOD_INDEX_USER_TTL', 60))
+    # Seconds between checks for catalog foods written by other processes
+    FOOD_INDEX_CATALOG_TTL = int(os.environ.get('FOOD_INDEX_CATALOG_TTL', 30))
+    # Users whose custom foods stay loaded, least recently searched dropped first
+    FOOD_INDEX_MAX_USERS = int(os.environ.get('FOOD_INDEX_MAX_USERS', 1000))
+    FOOD_INDEX_WARM_ON_STARTUP = False
+    # GET /foods/search/stats exposes index sizes and USDA quota; off unless asked for
+    SEARCH_STATS_ENABLED = os.environ.get('SEARCH_STATS_ENABLED', '').lower() in ('1', 'true')
+
+    USDA_CACHE_TTL = int(os.environ.get('USDA_CACHE_TTL', 24 * 60 * 60))
+    USDA_CACHE_SIZE = int(os.environ.get('USDA_CACHE_SIZE', 1024))
+
+    # Seconds from the start of /foods/search until it answers without USDA; the USDA
+    # call runs alongside the database lookups, so their time overlaps with it
+    SEARCH_LATENCY_BUDGET = float(os.environ.get('SEARCH_LATENCY_BUDGET', 1.5))
+    SEARCH_STREAM_BUDGET = float(os.environ.get('SEARCH_STREAM_BUDGET', 4.0))
+    # Longest a barcode scan waits on the USDA branded-food fallback
+    BARCODE_LOOKUP_BUDGET = float(os.environ.get('BARCODE_LOOKUP_BUDGET', 3.0))
+    SEARCH_WORKERS = int(os.environ.get('SEARCH_WORKERS', 4))
+
+    # Usage older than this counts half as much when ranking search results
+    USAGE_HALF_LIFE_DAYS = float(os.environ.get('USAGE_HALF_LIFE_DAYS', 14))
+
+    # Computed /analytics results kept per worker, keyed by user and range
+    ANALYTICS_CACHE_SIZE = int(os.environ.get('ANALYTICS_CACHE_SIZE', 256))
+
 class DevelopmentConfig(Config):
     DEBUG = True
+    SEARCH_STATS_ENABLED = True
 
 class ProductionConfig(Config):
     DEBUG = False
+    FOOD_INDEX_WARM_ON_STARTUP = True
 
 config = {
     'development': DevelopmentConfig,
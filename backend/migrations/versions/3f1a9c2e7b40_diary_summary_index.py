@@ -0,0 +1,32 @@
+"""Composite diary index for the SQL daily summary
+
+Revision ID: 3f1a9c2e7b40
+Revises: 7e1d3c5a9b26
+Create Date: 2026-10-16 09:12:00.000000
+
+On PostgreSQL the index INCLUDEs the macro columns so the summary is an
+index-only scan; SQLite has no INCLUDE and uses it as a plain range lookup.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1a9c2e7b40'
+down_revision = '7e1d3c5a9b26'
+branch_labels = None
+depends_on = None
+
+MACROS = ['calories', 'protein', 'carbs', 'fat', 'fiber']
+
+
+def upgrade():
+    indexes = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('food_entries')}
+    if 'ix_food_entries_user_date_meal' not in indexes:
+        op.create_index('ix_food_entries_user_date_meal', 'food_entries', ['user_id', 'date', 'meal_type'],
+                        postgresql_include=MACROS)
+
+
+def downgrade():
+    op.drop_index('ix_food_entries_user_date_meal', table_name='food_entries')
@@ -0,0 +1,55 @@
+"""food_usage per-user usage and global popularity on foods
+
+Revision ID: 4a7c9e2b5f18
+Revises: b2f4e7a9c3d1
+Create Date: 2026-10-15 19:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4a7c9e2b5f18'
+down_revision = 'b2f4e7a9c3d1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    columns = {column['name'] for column in inspector.get_columns('foods')}
+    if 'use_count' not in columns:
+        op.add_column('foods', sa.Column('use_count', sa.Integer(), server_default='0', nullable=False))
+    if 'usage_score' not in columns:
+        op.add_column('foods', sa.Column('usage_score', sa.Float(), server_default='0', nullable=False))
+
+    if not inspector.has_table('food_usage'):
+        op.create_table(
+            'food_usage',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('food_id', sa.Integer(), nullable=True),
+            sa.Column('custom_food_id', sa.Integer(), nullable=True),
+            sa.Column('use_count', sa.Integer(), nullable=False),
+            sa.Column('score', sa.Float(), nullable=False),
+            sa.Column('last_used_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['custom_food_id'], ['custom_foods.id'], ondelete='CASCADE'),
+            sa.ForeignKeyConstraint(['food_id'], ['foods.id'], ondelete='CASCADE'),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_food_usage_user_score', 'food_usage', ['user_id', 'score'])
+        op.create_index('ux_food_usage_user_food', 'food_usage', ['user_id', 'food_id'], unique=True,
+                        sqlite_where=sa.text('food_id IS NOT NULL'),
+                        postgresql_where=sa.text('food_id IS NOT NULL'))
+        op.create_index('ux_food_usage_user_custom_food', 'food_usage', ['user_id', 'custom_food_id'], unique=True,
+                        sqlite_where=sa.text('custom_food_id IS NOT NULL'),
+                        postgresql_where=sa.text('custom_food_id IS NOT NULL'))
+
+
+def downgrade():
+    op.drop_table('food_usage')
+    with op.batch_alter_table('foods') as batch:
+        batch.drop_column('usage_score')
+        batch.drop_column('use_count')
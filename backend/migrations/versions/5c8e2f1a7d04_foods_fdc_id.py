@@ -0,0 +1,30 @@
+"""foods.fdc_id: FoodData Central id of imported foods
+
+Revision ID: 5c8e2f1a7d04
+Revises: e1b7c4d02a93
+Create Date: 2026-10-15 11:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c8e2f1a7d04'
+down_revision = 'e1b7c4d02a93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'fdc_id' not in {column['name'] for column in inspector.get_columns('foods')}:
+        op.add_column('foods', sa.Column('fdc_id', sa.Integer(), nullable=True))
+    if 'ix_foods_fdc_id' not in {index['name'] for index in inspector.get_indexes('foods')}:
+        op.create_index('ix_foods_fdc_id', 'foods', ['fdc_id'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_foods_fdc_id', table_name='foods')
+    with op.batch_alter_table('foods') as batch:
+        batch.drop_column('fdc_id')
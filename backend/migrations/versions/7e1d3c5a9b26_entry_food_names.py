@@ -0,0 +1,39 @@
+"""food_entries.food_name / food_brand snapshots
+
+Revision ID: 7e1d3c5a9b26
+Revises: 4a7c9e2b5f18
+Create Date: 2026-10-16 07:45:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7e1d3c5a9b26'
+down_revision = '4a7c9e2b5f18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('food_entries')}
+    if 'food_name' not in columns:
+        op.add_column('food_entries', sa.Column('food_name', sa.String(length=100), nullable=True))
+    if 'food_brand' not in columns:
+        op.add_column('food_entries', sa.Column('food_brand', sa.String(length=50), nullable=True))
+
+    # Same as `flask backfill-entry-names`; a no-op once entries are labelled
+    for table, column in (('foods', 'food_id'), ('custom_foods', 'custom_food_id')):
+        op.execute(
+            f"UPDATE food_entries SET "
+            f"food_name = (SELECT name FROM {table} WHERE {table}.id = food_entries.{column}), "
+            f"food_brand = (SELECT brand FROM {table} WHERE {table}.id = food_entries.{column}) "
+            f"WHERE food_name IS NULL AND {column} IS NOT NULL"
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('food_entries') as batch:
+        batch.drop_column('food_brand')
+        batch.drop_column('food_name')
@@ -0,0 +1,47 @@
+"""daily_totals rollup of food_entries
+
+Revision ID: 8b2d47e1c5a6
+Revises: 3f1a9c2e7b40
+Create Date: 2026-10-17 10:04:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b2d47e1c5a6'
+down_revision = '3f1a9c2e7b40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table('daily_totals'):
+        op.create_table(
+            'daily_totals',
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('date', sa.Date(), nullable=False),
+            sa.Column('meal_type', sa.String(length=20), nullable=False),
+            sa.Column('entry_count', sa.Integer(), nullable=False),
+            sa.Column('calories', sa.Float(), nullable=False),
+            sa.Column('protein', sa.Float(), nullable=False),
+            sa.Column('carbs', sa.Float(), nullable=False),
+            sa.Column('fat', sa.Float(), nullable=False),
+            sa.Column('fiber', sa.Float(), nullable=False),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('user_id', 'date', 'meal_type')
+        )
+
+    # Same as `flask rebuild-daily-totals`
+    op.execute("DELETE FROM daily_totals")
+    op.execute(
+        "INSERT INTO daily_totals "
+        "(user_id, date, meal_type, entry_count, calories, protein, carbs, fat, fiber) "
+        "SELECT user_id, date, meal_type, count(*), sum(calories), sum(protein), sum(carbs), "
+        "sum(fat), sum(fiber) FROM food_entries GROUP BY user_id, date, meal_type"
+    )
+
+
+def downgrade():
+    op.drop_table('daily_totals')
@@ -0,0 +1,26 @@
+"""foods.source: where a catalog food came from
+
+Revision ID: 9d3a6b8c1e52
+Revises: 5c8e2f1a7d04
+Create Date: 2026-10-15 13:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d3a6b8c1e52'
+down_revision = '5c8e2f1a7d04'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'source' not in {column['name'] for column in sa.inspect(op.get_bind()).get_columns('foods')}:
+        op.add_column('foods', sa.Column('source', sa.String(length=20), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('foods') as batch:
+        batch.drop_column('source')
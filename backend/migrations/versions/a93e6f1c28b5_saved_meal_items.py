@@ -0,0 +1,127 @@
+"""saved_meal_items rows in place of the saved_meals.foods JSON blob
+
+Revision ID: a93e6f1c28b5
+Revises: d7e5b2a19f34
+Create Date: 2026-10-17 18:05:00.000000
+
+Each meal's JSON array becomes one row per food, in the same order.
+References to foods that no longer exist, or to another user's custom
+foods, are dropped and the food's name is kept. Meals that already have items are left alone, so the copy is
+safe to repeat; the blob column goes once everything has been copied.
+
+"""
+import json
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a93e6f1c28b5'
+down_revision = 'd7e5b2a19f34'
+branch_labels = None
+depends_on = None
+
+NUTRIENTS = ['calories', 'protein', 'carbs', 'fat', 'fiber']
+
+items = sa.table(
+    'saved_meal_items',
+    sa.column('meal_id', sa.Integer), sa.column('position', sa.Integer),
+    sa.column('food_id', sa.Integer), sa.column('custom_food_id', sa.Integer),
+    sa.column('name', sa.String), sa.column('quantity', sa.Float),
+    *(sa.column(n, sa.Float) for n in NUTRIENTS)
+)
+
+
+def _number(value):
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _reference(value, existing, user_id=None):
+    key = value if user_id is None else (value, user_id)
+    return value if isinstance(value, int) and key in existing else None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if not inspector.has_table('saved_meal_items'):
+        op.create_table(
+            'saved_meal_items',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('meal_id', sa.Integer(), nullable=False),
+            sa.Column('position', sa.Integer(), nullable=False),
+            sa.Column('food_id', sa.Integer(), nullable=True),
+            sa.Column('custom_food_id', sa.Integer(), nullable=True),
+            sa.Column('name', sa.String(length=100), nullable=True),
+            sa.Column('quantity', sa.Float(), nullable=False),
+            *(sa.Column(n, sa.Float(), nullable=False) for n in NUTRIENTS),
+            sa.ForeignKeyConstraint(['meal_id'], ['saved_meals.id'], ondelete='CASCADE'),
+            sa.ForeignKeyConstraint(['food_id'], ['foods.id'], ondelete='SET NULL'),
+            sa.ForeignKeyConstraint(['custom_food_id'], ['custom_foods.id'], ondelete='SET NULL'),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_saved_meal_items_meal_position', 'saved_meal_items', ['meal_id', 'position'])
+        op.create_index('ix_saved_meal_items_food_id', 'saved_meal_items', ['food_id'])
+        op.create_index('ix_saved_meal_items_custom_food_id', 'saved_meal_items', ['custom_food_id'])
+
+    if 'foods' not in {column['name'] for column in inspector.get_columns('saved_meals')}:
+        return
+
+    food_ids = set(bind.execute(sa.text("SELECT id FROM foods")).scalars())
+    custom_ids = {tuple(row) for row in bind.execute(sa.text("SELECT id, user_id FROM custom_foods"))}
+    meals = bind.execute(sa.text(
+        "SELECT id, user_id, foods FROM saved_meals "
+        "WHERE NOT EXISTS (SELECT 1 FROM saved_meal_items WHERE meal_id = saved_meals.id)"
+    )).all()
+
+    rows = []
+    for meal_id, user_id, blob in meals:
+        try:
+            foods = json.loads(blob or '[]')
+        except ValueError:
+            foods = []
+        for position, food in enumerate(food for food in foods if isinstance(food, dict)):
+            name = food.get('name')
+            rows.append({
+                'meal_id': meal_id,
+                'position': position,
+                'food_id': _reference(food.get('food_id'), food_ids),
+                'custom_food_id': _reference(food.get('custom_food_id'), custom_ids, user_id),
+                'name': name[:100] if isinstance(name, str) else None,
+                'quantity': _number(food.get('quantity')),
+                **{n: _number(food.get(n)) for n in NUTRIENTS}
+            })
+    if rows:
+        op.bulk_insert(items, rows)
+
+    with op.batch_alter_table('saved_meals') as batch:
+        batch.drop_column('foods')
+
+
+def downgrade():
+    bind = op.get_bind()
+    with op.batch_alter_table('saved_meals') as batch:
+        batch.add_column(sa.Column('foods', sa.Text(), nullable=True))
+
+    foods = {}
+    for row in bind.execute(sa.text(
+        "SELECT meal_id, food_id, custom_food_id, name, quantity, calories, protein, carbs, fat, fiber "
+        "FROM saved_meal_items ORDER BY meal_id, position, id"
+    )).mappings():
+        food = dict(row)
+        foods.setdefault(food.pop('meal_id'), []).append(food)
+
+    meal_ids = bind.execute(sa.text("SELECT id FROM saved_meals")).scalars().all()
+    if meal_ids:
+        bind.execute(
+            sa.text("UPDATE saved_meals SET foods = :foods WHERE id = :id"),
+            [{'id': meal_id, 'foods': json.dumps(foods.get(meal_id, []))} for meal_id in meal_ids]
+        )
+
+    with op.batch_alter_table('saved_meals') as batch:
+        batch.alter_column('foods', existing_type=sa.Text(), nullable=False)
+    op.drop_table('saved_meal_items')
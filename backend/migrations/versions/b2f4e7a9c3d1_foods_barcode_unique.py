@@ -0,0 +1,56 @@
+"""Unique GTIN-14 foods.barcode for barcode lookups
+
+Revision ID: b2f4e7a9c3d1
+Revises: 9d3a6b8c1e52
+Create Date: 2026-10-15 16:30:00.000000
+
+Lookups compare zero-padded GTIN-14 codes, so codes stored before are
+normalized the same way first. Codes that aren't valid EAN/UPC become NULL,
+and when several foods share one code only the oldest keeps it, so the
+unique index can be built.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.schemas import CustomValidators
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2f4e7a9c3d1'
+down_revision = '9d3a6b8c1e52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if 'barcode' not in {column['name'] for column in inspector.get_columns('foods')}:
+        op.add_column('foods', sa.Column('barcode', sa.String(length=20), nullable=True))
+
+    seen = set()
+    cleared, changed = [], []
+    for food_id, raw in bind.execute(sa.text(
+        "SELECT id, barcode FROM foods WHERE barcode IS NOT NULL ORDER BY id"
+    )):
+        barcode = CustomValidators.normalize_barcode(raw)
+        if barcode is None or barcode in seen:
+            cleared.append({'id': food_id})
+        else:
+            seen.add(barcode)
+            if barcode != raw:
+                changed.append({'id': food_id, 'barcode': barcode})
+
+    # Clear first so no normalized code briefly collides with one being freed
+    if cleared:
+        bind.execute(sa.text("UPDATE foods SET barcode = NULL WHERE id = :id"), cleared)
+    if changed:
+        bind.execute(sa.text("UPDATE foods SET barcode = :barcode WHERE id = :id"), changed)
+
+    if 'ix_foods_barcode' not in {index['name'] for index in inspector.get_indexes('foods')}:
+        op.create_index('ix_foods_barcode', 'foods', ['barcode'], unique=True)
+
+
+def downgrade():
+    # The normalized codes stay; they are still the same products
+    op.drop_index('ix_foods_barcode', table_name='foods')
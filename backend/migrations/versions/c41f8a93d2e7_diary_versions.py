@@ -0,0 +1,33 @@
+"""diary_versions counters for diary ETags
+
+Revision ID: c41f8a93d2e7
+Revises: 8b2d47e1c5a6
+Create Date: 2026-10-17 14:37:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41f8a93d2e7'
+down_revision = '8b2d47e1c5a6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Missing rows read as version 0, so existing days need no backfill
+    if not sa.inspect(op.get_bind()).has_table('diary_versions'):
+        op.create_table(
+            'diary_versions',
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('date', sa.Date(), nullable=False),
+            sa.Column('version', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('user_id', 'date')
+        )
+
+
+def downgrade():
+    op.drop_table('diary_versions')
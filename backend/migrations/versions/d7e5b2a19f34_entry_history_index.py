@@ -0,0 +1,26 @@
+"""(user_id, date, id) index for keyset-paginated entry history
+
+Revision ID: d7e5b2a19f34
+Revises: c41f8a93d2e7
+Create Date: 2026-10-17 16:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7e5b2a19f34'
+down_revision = 'c41f8a93d2e7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    indexes = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('food_entries')}
+    if 'ix_food_entries_user_date_id' not in indexes:
+        op.create_index('ix_food_entries_user_date_id', 'food_entries', ['user_id', 'date', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_food_entries_user_date_id', table_name='food_entries')
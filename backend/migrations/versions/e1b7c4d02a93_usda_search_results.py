@@ -0,0 +1,35 @@
+"""usda_search_results: persistent tier of the USDA search cache
+
+Revision ID: e1b7c4d02a93
+Revises:
+Create Date: 2026-10-15 08:20:00.000000
+
+Databases so far were built by `db.create_all()`, which creates missing
+tables but never alters existing ones, so this and the revisions after it
+check what is already there and run cleanly against either.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1b7c4d02a93'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table('usda_search_results'):
+        op.create_table(
+            'usda_search_results',
+            sa.Column('query_key', sa.String(length=100), nullable=False),
+            sa.Column('results', sa.Text(), nullable=False),
+            sa.Column('fetched_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('query_key')
+        )
+
+
+def downgrade():
+    op.drop_table('usda_search_results')
@@ -0,0 +1,52 @@
+"""store usage scores as log2 of the decayed-weight sums
+
+Revision ID: f2c8a4d61b97
+Revises: a93e6f1c28b5
+Create Date: 2026-10-17 21:40:00.000000
+
+The summed weights grow as 2^(age / half-life) and overflow a float after a
+few decades, so food_usage.score and foods.usage_score now hold their log2.
+Foods nobody has used keep a score of 0.
+
+"""
+import math
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c8a4d61b97'
+down_revision = 'a93e6f1c28b5'
+branch_labels = None
+depends_on = None
+
+
+def _rescale(table, column, convert):
+    connection = op.get_bind()
+    rows = connection.execute(sa.text(
+        f'SELECT id, {column} FROM {table} WHERE use_count > 0'
+    )).fetchall()
+    if rows:
+        connection.execute(
+            sa.text(f'UPDATE {table} SET {column} = :score WHERE id = :id'),
+            [{'id': row_id, 'score': convert(score)} for row_id, score in rows]
+        )
+
+
+def _log2(score):
+    # Every stored use weighs at least 2^0, so the sums are positive
+    return math.log2(score) if score > 0 else 0
+
+
+def _exp2(score):
+    return 2 ** score
+
+
+def upgrade():
+    _rescale('food_usage', 'score', _log2)
+    _rescale('foods', 'usage_score', _log2)
+
+
+def downgrade():
+    _rescale('food_usage', 'score', _exp2)
+    _rescale('foods', 'usage_score', _exp2)
@@ -1,5 +1,8 @@
 from app import create_app, db
 from app.models import User, Food, FoodEntry, CustomFood, SavedMeal
+from app.utils.fdc_import import DEFAULT_DATA_TYPES
+from app.utils.export import EXPORT_TABLES, FORMATS
+import click
 import os
 
 # Use production config if FLASK_ENV is production
@@ -37,6 +40,80 @@ def seed_db():
     db.session.commit()
     print("Database seeded!")
 
+@app.cli.command()
+@click.argument('path')
+@click.option('--data-type', 'data_types', multiple=True, default=DEFAULT_DATA_TYPES,
+              help='FDC data type to import (repeatable)')
+@click.option('--chunk-size', default=5000, help='Rows per batch/commit')
+def import_fdc(path, data_types, chunk_size):
+    """Import a USDA FoodData Central CSV or JSON download into foods"""
+    from app.utils.fdc_import import import_fdc as run_import
+
+    print(f"Importing {', '.join(data_types)} from {path}")
+    result = run_import(path, data_types=data_types, chunk_size=chunk_size)
+    print(f"Imported {result['inserted']} foods ({result['skipped']} skipped) "
+          f"in {result['seconds']}s, {result['rows_per_sec']} rows/sec")
+
+@app.cli.command()
+def backfill_entry_names():
+    """Snapshot food names onto diary entries written before they were stored"""
+    from app.utils.diary import backfill_entry_labels
+
+    updated = backfill_entry_labels()
+    print(f"Backfilled names on {updated} entries")
+
+@app.cli.command()
+@click.option('--verify', is_flag=True, help='Only report slots that disagree with the entries')
+def rebuild_daily_totals(verify):
+    """Rebuild (or verify) the daily_totals rollup from diary entries"""
+    from app.utils.diary import rebuild_daily_totals as rebuild, verify_daily_totals
+
+    if verify:
+        mismatches = verify_daily_totals()
+        for user_id, day, meal_type in mismatches:
+            print(f"  user {user_id} {day} {meal_type}")
+        print(f"{len(mismatches)} daily total(s) out of date")
+        if mismatches:
+            raise SystemExit(1)
+        return
+
+    print(f"Rebuilt {rebuild()} daily totals")
+
+@app.cli.command()
+@click.argument('user_id', type=int)
+@click.argument('path')
+@click.option('--table', type=click.Choice(EXPORT_TABLES), help='Export one table instead of a zip of all')
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), default='ndjson')
+@click.option('--start-date', type=click.DateTime(['%Y-%m-%d']))
+@click.option('--end-date', type=click.DateTime(['%Y-%m-%d']))
+@click.option('--after-id', type=int, help='Resume a table export after this id')
+def export_user(user_id, path, table, fmt, start_date, end_date, after_id):
+    """Export a user's data to PATH (a zip unless --table is given)"""
+    from app.api.community import UPLOAD_FOLDER
+    from app.utils.export import export_archive, export_table
+
+    start = start_date.date() if start_date else None
+    end = end_date.date() if end_date else None
+
+    if table:
+        # Appending lets --after-id pick up where an interrupted export stopped
+        with open(path, 'a' if after_id else 'w', encoding='utf-8', newline='') as out:
+            for chunk in export_table(user_id, table, fmt=fmt, start=start, end=end, after_id=after_id):
+                out.write(chunk)
+    else:
+        with open(path, 'wb') as out:
+            for chunk in export_archive(user_id, UPLOAD_FOLDER, fmt=fmt, start=start, end=end):
+                out.write(chunk)
+    print(f"Exported to {path}")
+
+@app.cli.command()
+def rebuild_search_index():
+    """Create the food search index if missing and repopulate it"""
+    from app.utils.search import rebuild_search_index as rebuild, search_backend
+
+    rebuild()
+    print(f"Search index rebuilt ({search_backend()})")
+
 @app.cli.command()
 def create_demo_user():
     """Create or update the demo user account"""
@@ -2,6 +2,7 @@ import pytest
 from datetime import date
 from app import create_app, db
 from app.models import User, Food, CustomFood, FoodEntry
+from app.utils.diary import refresh_daily_totals
 
 
 @pytest.fixture(scope='function')
@@ -111,5 +112,39 @@ def test_entry(app, test_user, test_food):
         fiber=0
     )
     db.session.add(entry)
+    refresh_daily_totals(test_user.id, [(entry.date, entry.meal_type)])
     db.session.commit()
-    return entry
\ No newline at end of file
+    return entry
+
+@pytest.fixture(scope='function')
+def fake_fdc(app):
+    """Point the app's USDA client at a local fake FoodData Central server."""
+    from benchmarks.fake_fdc import FakeFDCServer
+
+    with FakeFDCServer() as server:
+        client = app.extensions['usda_client']
+        client.api_key = 'test_key'
+        client.base_url = server.url
+        yield server
+
+
+@pytest.fixture(scope='function')
+def count_queries(app):
+    """Return a context manager collecting the SQL statements run inside it."""
+    from contextlib import contextmanager
+    from sqlalchemy import event
+
+    @contextmanager
+    def counter():
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+
+    return counter
@@ -0,0 +1,134 @@
+import numpy as np
+import pytest
+from datetime import date, timedelta
+from app import db
+from app.models import FoodEntry
+from app.utils.analytics import macro_ratios, rolling_mean, streaks, weekday_averages
+from app.utils.diary import NUTRIENTS, rebuild_daily_totals
+
+
+def log_days(user_id, calories_by_offset, end=None):
+    """Write one lunch entry per day offset back from end and rebuild the rollup."""
+    end = end or date.today()
+    for offset, calories in calories_by_offset.items():
+        db.session.add(FoodEntry(user_id=user_id, date=end - timedelta(days=offset), meal_type='lunch',
+                                 quantity=100, calories=calories, protein=50, carbs=100, fat=20, fiber=10))
+    db.session.commit()
+    rebuild_daily_totals()
+
+
+class TestAnalyticsMetrics:
+    """Tests for the vectorized metric helpers."""
+
+    def test_rolling_mean_skips_unlogged_days(self):
+        """Test that rolling averages only count days with entries."""
+        values = np.array([[100.0, 0.0, 300.0, 500.0]])
+        logged = np.array([True, False, True, True])
+
+        means = rolling_mean(values, logged, 2)
+
+        assert means[0, 0] == 100
+        assert means[0, 1] == 100
+        assert means[0, 2] == 300
+        assert means[0, 3] == 400
+
+    def test_rolling_mean_without_data(self):
+        """Test that windows with nothing logged are NaN."""
+        means = rolling_mean(np.zeros((1, 3)), np.zeros(3, dtype=bool), 7)
+
+        assert np.isnan(means).all()
+
+    def test_streaks(self):
+        """Test current and longest runs of met days."""
+        met = np.array([True, True, True, False, True, True])
+        logged = np.ones(6, dtype=bool)
+
+        assert streaks(met, logged) == {'current': 2, 'longest': 3, 'days_met': 5}
+
+    def test_streak_survives_unlogged_today(self):
+        """Test that today without entries doesn't break the current streak."""
+        met = np.array([False, True, True, False])
+        logged = np.array([True, True, True, False])
+
+        assert streaks(met, logged)['current'] == 2
+
+    def test_macro_ratios(self):
+        """Test calorie shares per macro and their trend."""
+        values = np.zeros((len(NUTRIENTS), 3))
+        values[NUTRIENTS.index('protein')] = [25, 50, 75]
+        values[NUTRIENTS.index('carbs')] = [75, 50, 25]
+        logged = np.ones(3, dtype=bool)
+
+        ratios = macro_ratios(values, logged)
+
+        assert ratios['protein']['daily'] == [25.0, 50.0, 75.0]
+        assert ratios['protein']['average'] == 50.0
+        assert ratios['protein']['trend'] == pytest.approx(175.0)
+        assert ratios['fat']['average'] == 0.0
+
+    def test_weekday_averages(self):
+        """Test per-weekday means over logged days."""
+        start = date(2024, 1, 1)  # a Monday
+        values = np.zeros((len(NUTRIENTS), 14))
+        values[0] = np.arange(14) * 100
+        logged = np.ones(14, dtype=bool)
+        logged[7] = False
+
+        weekdays = weekday_averages(values, logged, start)
+
+        assert weekdays['Monday'] == {'days': 1, 'calories': 0.0, 'protein': 0.0, 'carbs': 0.0,
+                                      'fat': 0.0, 'fiber': 0.0}
+        assert weekdays['Tuesday']['calories'] == 450.0
+        assert weekdays['Tuesday']['days'] == 2
+
+
+class TestAnalyticsEndpoint:
+    """Tests for GET /analytics."""
+
+    def test_analytics(self, client, auth_headers, test_user):
+        """Test that analytics cover the requested days."""
+        log_days(test_user.id, {0: 2000, 1: 2100, 2: 1500, 5: 1950})
+
+        response = client.get('/api/analytics?days=30', headers=auth_headers)
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['days'] == 30
+        assert data['days_tracked'] == 4
+        assert len(data['dates']) == 30
+        assert data['dates'][-1] == date.today().isoformat()
+        assert data['daily']['calories'][-1] == 2000
+        assert data['daily']['calories'][-4] is None
+        assert data['rolling']['7']['calories'][-1] == pytest.approx((2000 + 2100 + 1500 + 1950) / 4, abs=0.1)
+        assert data['streaks'] == {'current': 2, 'longest': 2, 'days_met': 3}
+        assert data['averages']['protein'] == 50
+
+    def test_cached_until_an_entry_is_written(self, app, client, auth_headers, test_user, test_food):
+        """Test that results are reused until an entry in range changes."""
+        cache = app.extensions['analytics_cache']
+        log_days(test_user.id, {1: 2000})
+
+        client.get('/api/analytics?days=7', headers=auth_headers)
+        client.get('/api/analytics?days=7', headers=auth_headers)
+        assert cache.stats()['hits'] == 1
+
+        client.post('/api/entries', headers=auth_headers, json={
+            'food_id': test_food.id, 'date': date.today().isoformat(), 'meal_type': 'dinner', 'quantity': 100
+        })
+        data = client.get('/api/analytics?days=7', headers=auth_headers).get_json()
+
+        assert cache.stats()['hits'] == 1
+        assert data['days_tracked'] == 2
+
+    def test_not_modified(self, client, auth_headers):
+        """Test that an unchanged range answers If-None-Match with 304."""
+        etag = client.get('/api/analytics', headers=auth_headers).headers['ETag']
+
+        response = client.get('/api/analytics', headers={**auth_headers, 'If-None-Match': etag})
+
+        assert response.status_code == 304
+
+    def test_invalid_arguments(self, client, auth_headers):
+        """Test that out of range days and bad dates are rejected."""
+        assert client.get('/api/analytics?days=1000', headers=auth_headers).status_code == 400
+        assert client.get('/api/analytics?end_date=soon', headers=auth_headers).status_code == 400
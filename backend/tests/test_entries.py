@@ -1,5 +1,5 @@
 import pytest
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 from app.models import FoodEntry
 from app import db
 
@@ -129,6 +129,65 @@ class TestCreateEntry:
         assert 'food_id' in data['errors']
 
 
+class TestBatchEntries:
+    """Tests for creating entries in a batch."""
+
+    def test_create_batch(self, client, auth_headers, test_food, test_custom_food, count_queries):
+        """Test that a batch is written with one insert and one commit."""
+        today = date.today().isoformat()
+        entries = [
+            {'food_id': test_food.id, 'date': today, 'meal_type': 'lunch', 'quantity': 150},
+            {'custom_food_id': test_custom_food.id, 'date': today, 'meal_type': 'lunch', 'quantity': 250},
+            {'food_id': test_food.id, 'date': today, 'meal_type': 'dinner', 'quantity': 100},
+        ]
+
+        with count_queries() as statements:
+            response = client.post('/api/entries/batch', headers=auth_headers, json={'entries': entries})
+
+        assert response.status_code == 201
+        data = response.get_json()
+        assert data['created'] == 3
+        assert [result['status'] for result in data['results']] == [201, 201, 201]
+        assert data['results'][0]['entry']['calories'] == pytest.approx(247.5)
+        assert data['results'][1]['entry']['name'] == 'My Protein Shake'
+        assert len([s for s in statements if s.lstrip().upper().startswith('INSERT INTO FOOD_ENTRIES')]) == 1
+        assert not [s for s in statements if 'FROM food_entries' in s and 'WHERE food_entries.id' in s]
+        assert FoodEntry.query.count() == 3
+
+    def test_partial_failure(self, client, auth_headers, test_food):
+        """Test that valid items are created and failures reported per item."""
+        today = date.today().isoformat()
+        entries = [
+            {'food_id': test_food.id, 'date': today, 'meal_type': 'lunch', 'quantity': 150},
+            {'food_id': 99999, 'date': today, 'meal_type': 'lunch', 'quantity': 150},
+            {'food_id': test_food.id, 'date': today, 'meal_type': 'brunch', 'quantity': 150},
+        ]
+
+        response = client.post('/api/entries/batch', headers=auth_headers, json={'entries': entries})
+
+        assert response.status_code == 207
+        data = response.get_json()
+        assert (data['created'], data['failed']) == (1, 2)
+        assert [result['status'] for result in data['results']] == [201, 404, 400]
+        assert 'meal_type' in data['results'][2]['errors']
+        assert FoodEntry.query.count() == 1
+
+    def test_all_failed(self, client, auth_headers):
+        """Test that a batch with no valid items is rejected."""
+        response = client.post('/api/entries/batch', headers=auth_headers, json={
+            'entries': [{'date': date.today().isoformat(), 'meal_type': 'lunch', 'quantity': 100}]
+        })
+
+        assert response.status_code == 400
+        assert response.get_json()['results'][0]['status'] == 400
+
+    def test_batch_must_be_list(self, client, auth_headers):
+        """Test that a missing or empty entries list is rejected."""
+        assert client.post('/api/entries/batch', headers=auth_headers, json={}).status_code == 400
+        assert client.post('/api/entries/batch', headers=auth_headers,
+                           json={'entries': []}).status_code == 400
+
+
 class TestGetEntries:
     """Tests for retrieving food entries."""
 
@@ -181,6 +240,40 @@ class TestGetEntries:
         assert len(data['dinner']) == 0
         assert len(data['snacks']) == 0
 
+    def test_listing_day_is_single_query(self, client, auth_headers, test_food,
+                                         test_custom_food, count_queries):
+        """Test that a day's entries are listed with one query and no lazy loads."""
+        today = date.today().isoformat()
+        for meal_type in ('breakfast', 'lunch', 'dinner'):
+            client.post('/api/entries', headers=auth_headers, json={
+                'food_id': test_food.id, 'date': today, 'meal_type': meal_type, 'quantity': 150
+            })
+        client.post('/api/entries', headers=auth_headers, json={
+            'custom_food_id': test_custom_food.id, 'date': today, 'meal_type': 'snacks', 'quantity': 250
+        })
+        db.session.expunge_all()
+
+        with count_queries() as statements:
+            response = client.get(f'/api/entries?date={today}', headers=auth_headers)
+
+        data = response.get_json()
+        # The ETag's version lookup, then the read itself
+        assert len(statements) == 2
+        assert 'diary_versions' in statements[0]
+        assert data['lunch'][0]['name'] == 'Chicken Breast'
+        assert data['lunch'][0]['brand'] == 'Generic'
+        assert data['snacks'][0]['name'] == 'My Protein Shake'
+
+    def test_backfill_entry_names(self, app, test_entry, test_food):
+        """Test that entries written without a name snapshot get one."""
+        from app.utils.diary import backfill_entry_labels
+
+        assert backfill_entry_labels() == 1
+
+        entry = db.session.get(FoodEntry, test_entry.id)
+        assert (entry.food_name, entry.food_brand) == ('Chicken Breast', 'Generic')
+        assert backfill_entry_labels() == 0
+
 
 class TestUpdateEntry:
     """Tests for updating food entries."""
@@ -381,4 +474,575 @@ class TestDailySummary:
 
         assert response.status_code == 200
         data = response.get_json()
-        assert data['nutrients']['calories']['consumed'] == 0
\ No newline at end of file
+        assert data['nutrients']['calories']['consumed'] == 0
+    def test_daily_summary_is_single_query(self, client, auth_headers, test_food, count_queries):
+        """Test that totals and goals come from one aggregate query."""
+        today = date.today().isoformat()
+        created = [
+            client.post('/api/entries', headers=auth_headers, json={
+                'food_id': test_food.id, 'date': today, 'meal_type': meal_type, 'quantity': quantity
+            }).get_json()
+            for meal_type, quantity in (('breakfast', 150), ('lunch', 200), ('dinner', 75))
+        ]
+        db.session.expunge_all()
+
+        with count_queries() as statements:
+            response = client.get(f'/api/summary/{today}', headers=auth_headers)
+
+        assert response.status_code == 200
+        calories = response.get_json()['nutrients']['calories']
+        # The ETag's version lookup, then the read itself
+        assert len(statements) == 2
+        assert 'diary_versions' in statements[0]
+        assert calories['consumed'] == pytest.approx(sum(entry['entry']['calories'] for entry in created), abs=0.1)
+        assert calories['goal'] == 2000
+
+
+class TestDashboard:
+    """Tests for the combined dashboard endpoint."""
+
+    def test_dashboard_matches_entries_and_summary(self, client, auth_headers, test_food,
+                                                   test_custom_food):
+        """Test that the dashboard returns what /entries and /summary return separately."""
+        today = date.today().isoformat()
+        client.post('/api/entries/batch', headers=auth_headers, json={'entries': [
+            {'food_id': test_food.id, 'date': today, 'meal_type': 'breakfast', 'quantity': 150},
+            {'custom_food_id': test_custom_food.id, 'date': today, 'meal_type': 'snacks', 'quantity': 250},
+        ]})
+
+        response = client.get(f'/api/dashboard/{today}', headers=auth_headers)
+
+        assert response.status_code == 200
+        data = response.get_json()
+        entries = client.get(f'/api/entries?date={today}', headers=auth_headers).get_json()
+        summary = client.get(f'/api/summary/{today}', headers=auth_headers).get_json()
+        assert data['date'] == today
+        assert data['meals'] == entries
+        assert data['nutrients'] == summary['nutrients']
+
+    def test_dashboard_is_single_query(self, client, auth_headers, test_food, count_queries):
+        """Test that goals and entries are read in one query."""
+        today = date.today().isoformat()
+        client.post('/api/entries', headers=auth_headers, json={
+            'food_id': test_food.id, 'date': today, 'meal_type': 'breakfast', 'quantity': 150
+        })
+        db.session.expunge_all()
+
+        with count_queries() as statements:
+            response = client.get(f'/api/dashboard/{today}', headers=auth_headers)
+
+        assert response.status_code == 200
+        # The ETag's version lookup, then the read itself
+        assert len(statements) == 2
+        assert 'diary_versions' in statements[0]
+        assert len(response.get_json()['meals']['breakfast']) == 1
+
+    def test_dashboard_empty_day(self, client, auth_headers):
+        """Test the dashboard for a day with no entries."""
+        response = client.get('/api/dashboard/2024-12-31', headers=auth_headers)
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['meals'] == {'breakfast': [], 'lunch': [], 'dinner': [], 'snacks': []}
+        assert data['nutrients']['calories'] == {'consumed': 0, 'goal': 2000, 'percentage': 0}
+
+    def test_dashboard_invalid_date(self, client, auth_headers):
+        """Test the dashboard with an invalid date."""
+        response = client.get('/api/dashboard/not-a-date', headers=auth_headers)
+
+        assert response.status_code == 400
+
+
+class TestRangeSummary:
+    """Tests for weekly and date range summaries."""
+
+    def _log(self, client, auth_headers, food, day, meal_type='lunch', quantity=100):
+        return client.post('/api/entries', headers=auth_headers, json={
+            'food_id': food.id, 'date': day.isoformat(), 'meal_type': meal_type, 'quantity': quantity
+        }).get_json()['entry']
+
+    def test_weekly_summary(self, client, auth_headers, test_food):
+        """Test that a week lists every day with totals for the days logged."""
+        start = date.today() - timedelta(days=6)
+        first = self._log(client, auth_headers, test_food, start, 'breakfast')
+        second = self._log(client, auth_headers, test_food, start, 'dinner', 200)
+        last = self._log(client, auth_headers, test_food, date.today())
+
+        response = client.get(f'/api/summary/week/{start.isoformat()}', headers=auth_headers)
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['start_date'] == start.isoformat()
+        assert data['end_date'] == date.today().isoformat()
+        assert [day['date'] for day in data['days']] == [
+            (start + timedelta(days=i)).isoformat() for i in range(7)
+        ]
+        assert data['days'][0]['entry_count'] == 2
+        assert data['days'][0]['nutrients']['calories']['consumed'] == pytest.approx(
+            first['calories'] + second['calories'], abs=0.1)
+        assert data['days'][0]['nutrients']['calories']['goal'] == 2000
+        assert all(day['nutrients'] is None for day in data['days'][1:6])
+        assert data['stats']['days_tracked'] == 2
+        assert data['stats']['compliance'] == pytest.approx(2 / 7 * 100, abs=0.1)
+        assert data['stats']['totals']['protein'] == pytest.approx(
+            first['protein'] + second['protein'] + last['protein'], abs=0.1)
+
+    def test_range_summary_is_single_query(self, client, auth_headers, test_food, count_queries):
+        """Test that a range is summarized with one grouped query."""
+        start = date.today() - timedelta(days=29)
+        for offset in range(0, 30, 3):
+            self._log(client, auth_headers, test_food, start + timedelta(days=offset))
+        db.session.expunge_all()
+
+        with count_queries() as statements:
+            response = client.get(
+                f'/api/summary/range?start_date={start.isoformat()}&end_date={date.today().isoformat()}',
+                headers=auth_headers
+            )
+
+        assert response.status_code == 200
+        data = response.get_json()
+        # The ETag's version lookup, then the read itself
+        assert len(statements) == 2
+        assert 'diary_versions' in statements[0]
+        assert len(data['days']) == 30
+        assert data['stats']['days_tracked'] == 10
+
+    def test_range_summary_empty(self, client, auth_headers):
+        """Test that a range with no entries still reports goals."""
+        response = client.get('/api/summary/range?start_date=2024-01-01&end_date=2024-01-31',
+                              headers=auth_headers)
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['goals']['calories'] == 2000
+        assert data['stats']['days_tracked'] == 0
+        assert data['stats']['averages']['calories'] == 0
+
+    def test_range_summary_too_long(self, client, auth_headers):
+        """Test that ranges over 90 days are rejected."""
+        response = client.get('/api/summary/range?start_date=2024-01-01&end_date=2024-06-01',
+                              headers=auth_headers)
+
+        assert response.status_code == 400
+
+    def test_range_summary_reversed(self, client, auth_headers):
+        """Test that a start after the end is rejected."""
+        response = client.get('/api/summary/range?start_date=2024-02-01&end_date=2024-01-01',
+                              headers=auth_headers)
+
+        assert response.status_code == 400
+
+    def test_weekly_summary_invalid_date(self, client, auth_headers):
+        """Test getting a week with an invalid start date."""
+        response = client.get('/api/summary/week/not-a-date', headers=auth_headers)
+
+        assert response.status_code == 400
+
+
+class TestDailyTotals:
+    """Tests for the daily_totals rollup."""
+
+    def totals(self, user_id):
+        from app.models import DailyTotal
+        db.session.expire_all()
+        return {
+            (row.date.isoformat(), row.meal_type): (row.entry_count, round(row.calories, 2))
+            for row in DailyTotal.query.filter_by(user_id=user_id)
+        }
+
+    def test_rollup_follows_every_write(self, client, auth_headers, test_user, test_food):
+        """Test that create, update, delete, clear and saved meals keep rollups in step."""
+        from app.models import SavedMeal
+        from app.utils.diary import verify_daily_totals
+        from app.utils.meals import build_items
+        today = date.today().isoformat()
+
+        def log(meal_type, quantity):
+            return client.post('/api/entries', headers=auth_headers, json={
+                'food_id': test_food.id, 'date': today, 'meal_type': meal_type, 'quantity': quantity
+            }).get_json()['entry']
+
+        first = log('lunch', 100)
+        second = log('lunch', 50)
+        log('dinner', 200)
+        assert self.totals(test_user.id)[(today, 'lunch')] == (2, round(first['calories'] + second['calories'], 2))
+
+        client.put(f"/api/entries/{second['id']}", headers=auth_headers, json={'quantity': 300})
+        client.delete(f"/api/entries/{first['id']}", headers=auth_headers)
+        assert self.totals(test_user.id)[(today, 'lunch')] == (1, 495.0)
+
+        client.delete(f'/api/entries/clear?date={today}&meal_type=dinner', headers=auth_headers)
+        assert (today, 'dinner') not in self.totals(test_user.id)
+
+        meal = SavedMeal(user_id=test_user.id, name='Snack', total_calories=300, total_protein=10,
+                         total_carbs=50, total_fat=5, total_fiber=8,
+                         items=build_items(test_user.id, [{'food_id': test_food.id, 'quantity': 100,
+                                                          'calories': 165, 'protein': 31, 'carbs': 0, 'fat': 4}] * 2))
+        db.session.add(meal)
+        db.session.commit()
+        client.post(f'/api/meals/{meal.id}/add', headers=auth_headers,
+                    json={'date': today, 'meal_type': 'snacks'})
+
+        assert self.totals(test_user.id)[(today, 'snacks')] == (2, 330.0)
+        assert verify_daily_totals() == []
+
+    def test_interleaved_refreshes_of_one_slot(self, app, test_user, test_food, count_queries):
+        """Test that a slot's day is locked before its rollup is rebuilt, and refreshes can overlap."""
+        from app.utils.diary import refresh_daily_totals
+        today = date.today()
+
+        def log(quantity):
+            db.session.add(FoodEntry(user_id=test_user.id, food_id=test_food.id, date=today,
+                                     meal_type='lunch', quantity=quantity, calories=quantity,
+                                     protein=0, carbs=0, fat=0, fiber=0))
+
+        # A second writer's refresh of the same slot lands before the first commits
+        log(100)
+        with count_queries() as statements:
+            refresh_daily_totals(test_user.id, [(today, 'lunch')])
+        log(50)
+        refresh_daily_totals(test_user.id, [(today, 'lunch')])
+        db.session.commit()
+
+        writes = [s.split()[:3] for s in statements if 'diary_versions' in s or 'daily_totals' in s]
+        assert writes[0] == ['INSERT', 'INTO', 'diary_versions']
+        assert ['DELETE', 'FROM', 'daily_totals'] in writes[1:]
+        assert self.totals(test_user.id) == {(today.isoformat(), 'lunch'): (2, 150.0)}
+
+    def test_summary_reads_rollup(self, client, auth_headers, test_user, test_entry):
+        """Test that summaries are served from the rollup rather than the entries."""
+        from app.models import DailyTotal
+        row = DailyTotal.query.filter_by(user_id=test_user.id).one()
+        row.calories = 1000
+        db.session.commit()
+
+        response = client.get(f'/api/summary/{date.today().isoformat()}', headers=auth_headers)
+
+        assert response.get_json()['nutrients']['calories']['consumed'] == 1000
+
+    def test_verify_and_rebuild(self, app, test_user, test_entry):
+        """Test that drifted rollups are reported and rebuilt from the entries."""
+        from app.models import DailyTotal
+        from app.utils.diary import rebuild_daily_totals, verify_daily_totals
+        today = date.today()
+        DailyTotal.query.delete()
+        db.session.add(DailyTotal(user_id=test_user.id, date=date(2024, 1, 1), meal_type='lunch',
+                                  entry_count=1, calories=100, protein=0, carbs=0, fat=0, fiber=0))
+        db.session.commit()
+
+        assert verify_daily_totals() == [
+            (test_user.id, date(2024, 1, 1), 'lunch'),
+            (test_user.id, today, 'breakfast'),
+        ]
+
+        assert rebuild_daily_totals() == 1
+        assert self.totals(test_user.id) == {(today.isoformat(), 'breakfast'): (1, 330.0)}
+        assert verify_daily_totals() == []
+
+
+    def test_rebuild_bumps_diary_versions(self, client, auth_headers, test_user, test_entry):
+        """Test that a rebuild invalidates ETags for the days it rewrote."""
+        from app.models import DailyTotal, DiaryVersion
+        from app.utils.diary import rebuild_daily_totals
+        url = f'/api/summary/{date.today().isoformat()}'
+        etag = client.get(url, headers=auth_headers).headers['ETag']
+        DailyTotal.query.filter_by(user_id=test_user.id).update({'calories': 1000})
+        db.session.add(DailyTotal(user_id=test_user.id, date=date(2024, 1, 1), meal_type='lunch',
+                                  entry_count=1, calories=100, protein=0, carbs=0, fat=0, fiber=0))
+        db.session.commit()
+
+        rebuild_daily_totals()
+
+        versions = {row.date: row.version for row in DiaryVersion.query.filter_by(user_id=test_user.id)}
+        assert versions == {date.today(): 2, date(2024, 1, 1): 1}
+        response = client.get(url, headers={**auth_headers, 'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.get_json()['nutrients']['calories']['consumed'] == 330
+
+class TestConditionalGet:
+    """Tests for ETags on diary reads."""
+
+    def log(self, client, auth_headers, food, day):
+        return client.post('/api/entries', headers=auth_headers, json={
+            'food_id': food.id, 'date': day.isoformat(), 'meal_type': 'lunch', 'quantity': 100
+        }).get_json()['entry']
+
+    def test_unchanged_day_is_not_modified(self, client, auth_headers, test_food, count_queries):
+        """Test that If-None-Match gets a 304 from the version lookup alone."""
+        today = date.today().isoformat()
+        self.log(client, auth_headers, test_food, date.today())
+
+        for url in (f'/api/entries?date={today}', f'/api/summary/{today}', f'/api/dashboard/{today}'):
+            response = client.get(url, headers=auth_headers)
+            assert response.status_code == 200
+            assert response.headers['Cache-Control'] == 'private, no-cache'
+            etag = response.headers['ETag']
+
+            with count_queries() as statements:
+                response = client.get(url, headers={**auth_headers, 'If-None-Match': etag})
+
+            assert response.status_code == 304
+            assert response.data == b''
+            assert response.headers['ETag'] == etag
+            assert len(statements) == 1
+
+    def test_writes_change_the_etag(self, client, auth_headers, test_food):
+        """Test that writing an entry invalidates that day's ETag only."""
+        today, yesterday = date.today(), date.today() - timedelta(days=1)
+        entry = self.log(client, auth_headers, test_food, today)
+        url = f'/api/summary/{today.isoformat()}'
+        etag = client.get(url, headers=auth_headers).headers['ETag']
+
+        self.log(client, auth_headers, test_food, yesterday)
+        assert client.get(url, headers={**auth_headers, 'If-None-Match': etag}).status_code == 304
+
+        client.put(f"/api/entries/{entry['id']}", headers=auth_headers, json={'quantity': 300})
+        response = client.get(url, headers={**auth_headers, 'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+
+    def test_goal_change_changes_the_etag(self, client, auth_headers):
+        """Test that summaries are revalidated after goals change."""
+        url = '/api/summary/2024-12-31'
+        etag = client.get(url, headers=auth_headers).headers['ETag']
+
+        client.put('/api/users/goals', headers=auth_headers, json={'daily_calories': 2500})
+        response = client.get(url, headers={**auth_headers, 'If-None-Match': etag})
+
+        assert response.status_code == 200
+        assert response.get_json()['nutrients']['calories']['goal'] == 2500
+
+    def test_range_etag_covers_every_day(self, client, auth_headers, test_food):
+        """Test that a write to any day in a week invalidates the week."""
+        start = date.today() - timedelta(days=6)
+        url = f'/api/summary/week/{start.isoformat()}'
+        etag = client.get(url, headers=auth_headers).headers['ETag']
+        assert client.get(url, headers={**auth_headers, 'If-None-Match': etag}).status_code == 304
+
+        self.log(client, auth_headers, test_food, start + timedelta(days=3))
+
+        assert client.get(url, headers={**auth_headers, 'If-None-Match': etag}).status_code == 200
+
+
+class TestCopyEntries:
+    """Tests for copying meals and days to other dates."""
+
+    def log(self, client, auth_headers, food, day, meal_type, quantity=100):
+        return client.post('/api/entries', headers=auth_headers, json={
+            'food_id': food.id, 'date': day.isoformat(), 'meal_type': meal_type, 'quantity': quantity
+        }).get_json()['entry']
+
+    def test_copy_meal_is_one_insert(self, client, auth_headers, test_user, test_food, count_queries):
+        """Test that a meal is copied to several days with a single INSERT ... SELECT."""
+        from app.utils.diary import verify_daily_totals
+        yesterday, today = date.today() - timedelta(days=1), date.today()
+        tomorrow = today + timedelta(days=1)
+        self.log(client, auth_headers, test_food, yesterday, 'breakfast', 100)
+        self.log(client, auth_headers, test_food, yesterday, 'breakfast', 50)
+        self.log(client, auth_headers, test_food, yesterday, 'lunch', 200)
+
+        with count_queries() as statements:
+            response = client.post('/api/entries/copy', headers=auth_headers, json={
+                'source_date': yesterday.isoformat(), 'meal_type': 'breakfast',
+                'target_dates': [today.isoformat(), tomorrow.isoformat()]
+            })
+
+        assert response.status_code == 201
+        data = response.get_json()
+        assert data['count'] == 4
+        assert data['dates'] == [today.isoformat(), tomorrow.isoformat()]
+        assert len([s for s in statements if s.startswith('INSERT INTO food_entries')]) == 1
+
+        for day in (today, tomorrow):
+            meals = client.get(f'/api/entries?date={day.isoformat()}', headers=auth_headers).get_json()
+            assert sorted(entry['quantity'] for entry in meals['breakfast']) == [50, 100]
+            assert meals['breakfast'][0]['name'] == test_food.name
+            assert meals['lunch'] == []
+        assert verify_daily_totals() == []
+
+    def test_copy_into_another_meal(self, client, auth_headers, test_food):
+        """Test that target_meal_type moves the copies into another meal."""
+        today = date.today()
+        self.log(client, auth_headers, test_food, today, 'lunch')
+
+        response = client.post('/api/entries/copy', headers=auth_headers, json={
+            'source_date': today.isoformat(), 'meal_type': 'lunch', 'target_meal_type': 'dinner',
+            'target_dates': [today.isoformat()]
+        })
+
+        assert response.status_code == 201
+        meals = client.get(f'/api/entries?date={today.isoformat()}', headers=auth_headers).get_json()
+        assert len(meals['lunch']) == 1
+        assert len(meals['dinner']) == 1
+
+    def test_copy_range_keeps_offsets(self, client, auth_headers, test_food):
+        """Test that copying a date range shifts every day by the same amount."""
+        start = date.today() - timedelta(days=10)
+        self.log(client, auth_headers, test_food, start, 'lunch')
+        self.log(client, auth_headers, test_food, start + timedelta(days=2), 'dinner')
+        target = date.today() - timedelta(days=3)
+
+        response = client.post('/api/entries/copy', headers=auth_headers, json={
+            'source_date': start.isoformat(), 'source_end_date': (start + timedelta(days=2)).isoformat(),
+            'target_dates': [target.isoformat()]
+        })
+
+        assert response.status_code == 201
+        assert response.get_json()['dates'] == [target.isoformat(), (target + timedelta(days=2)).isoformat()]
+        summary = client.get(f'/api/summary/range?start_date={target.isoformat()}'
+                             f'&end_date={(target + timedelta(days=2)).isoformat()}',
+                             headers=auth_headers).get_json()
+        assert [day['entry_count'] for day in summary['days']] == [1, 0, 1]
+
+    def test_copy_changes_the_etag(self, client, auth_headers, test_food):
+        """Test that copied days are revalidated."""
+        yesterday, today = date.today() - timedelta(days=1), date.today()
+        self.log(client, auth_headers, test_food, yesterday, 'lunch')
+        url = f'/api/summary/{today.isoformat()}'
+        etag = client.get(url, headers=auth_headers).headers['ETag']
+
+        client.post('/api/entries/copy', headers=auth_headers, json={
+            'source_date': yesterday.isoformat(), 'target_dates': [today.isoformat()]
+        })
+        response = client.get(url, headers={**auth_headers, 'If-None-Match': etag})
+
+        assert response.status_code == 200
+        assert response.get_json()['nutrients']['calories']['consumed'] == 165
+
+    def test_copy_nothing(self, client, auth_headers):
+        """Test that copying an empty day returns 404."""
+        response = client.post('/api/entries/copy', headers=auth_headers, json={
+            'source_date': (date.today() - timedelta(days=1)).isoformat(),
+            'target_dates': [date.today().isoformat()]
+        })
+
+        assert response.status_code == 404
+
+    def test_copy_only_own_entries(self, client, auth_headers, test_food):
+        """Test that another user's entries are never copied."""
+        from app.models import User
+        other = User(email='other@example.com', name='other')
+        other.set_password('Password123!')
+        db.session.add(other)
+        db.session.commit()
+        yesterday = date.today() - timedelta(days=1)
+        db.session.add(FoodEntry(user_id=other.id, food_id=test_food.id, date=yesterday, meal_type='lunch',
+                                 quantity=100, calories=165, protein=31, carbs=0, fat=4, fiber=0))
+        db.session.commit()
+
+        response = client.post('/api/entries/copy', headers=auth_headers, json={
+            'source_date': yesterday.isoformat(), 'target_dates': [date.today().isoformat()]
+        })
+
+        assert response.status_code == 404
+
+    def test_copy_validation(self, client, auth_headers):
+        """Test that bad sources and targets are rejected."""
+        today = date.today()
+        cases = [
+            {'target_dates': [today.isoformat()]},
+            {'source_date': today.isoformat(), 'target_dates': []},
+            {'source_date': today.isoformat(), 'target_dates': [today.isoformat()]},
+            {'source_date': today.isoformat(), 'target_dates': [(today - timedelta(days=40)).isoformat()]},
+            {'source_date': today.isoformat(), 'source_end_date': (today + timedelta(days=3)).isoformat(),
+             'target_dates': [(today + timedelta(days=5)).isoformat()]},
+            {'source_date': today.isoformat(), 'target_meal_type': 'lunch',
+             'target_dates': [(today - timedelta(days=1)).isoformat()]},
+            {'source_date': today.isoformat(), 'meal_type': 'brunch',
+             'target_dates': [(today - timedelta(days=1)).isoformat()]},
+        ]
+
+        for payload in cases:
+            response = client.post('/api/entries/copy', headers=auth_headers, json=payload)
+            assert response.status_code == 400, payload
+
+
+class TestEntryHistory:
+    """Tests for keyset-paginated entry history."""
+
+    @pytest.fixture
+    def history(self, app, test_user, test_food):
+        """Two entries a day for the last 30 days, alternating lunch and dinner."""
+        today = date.today()
+        entries = [
+            FoodEntry(user_id=test_user.id, food_id=test_food.id, food_name=test_food.name,
+                      date=today - timedelta(days=i // 2), meal_type=('lunch', 'dinner')[i % 2],
+                      quantity=100, calories=165, protein=31, carbs=0, fat=4, fiber=0)
+            for i in range(60)
+        ]
+        db.session.add_all(entries)
+        db.session.commit()
+        return sorted(((entry.date, entry.id) for entry in entries), reverse=True)
+
+    def walk(self, client, auth_headers, query=''):
+        ids, cursor, pages = [], None, 0
+        while True:
+            url = f'/api/entries/history?per_page=7{query}' + (f'&cursor={cursor}' if cursor else '')
+            response = client.get(url, headers=auth_headers)
+            assert response.status_code == 200
+            data = response.get_json()
+            ids += [entry['id'] for entry in data['entries']]
+            pages += 1
+            cursor = data['next_cursor']
+            if not data['has_more']:
+                assert cursor is None
+                return ids, pages
+
+    def test_pages_cover_history_newest_first(self, client, auth_headers, history):
+        """Test that following cursors visits every entry once, newest first."""
+        ids, pages = self.walk(client, auth_headers)
+
+        assert ids == [entry_id for _, entry_id in history]
+        assert pages == 9
+
+    def test_deep_page_uses_keyset(self, client, auth_headers, history, count_queries):
+        """Test that a deep page seeks past the cursor instead of using OFFSET."""
+        from app.utils.diary import encode_cursor
+        last = FoodEntry.query.get(history[49][1])
+        cursor = encode_cursor(last)
+
+        with count_queries() as statements:
+            response = client.get(f'/api/entries/history?per_page=20&cursor={cursor}', headers=auth_headers)
+
+        data = response.get_json()
+        assert [entry['id'] for entry in data['entries']] == [entry_id for _, entry_id in history[50:]]
+        assert data['has_more'] is False
+        assert len(statements) == 1
+        # SQLite renders a zero OFFSET for every LIMIT; the seek is the row comparison
+        assert '(food_entries.date, food_entries.id) < (?, ?)' in statements[0]
+
+    def test_filters(self, client, auth_headers, test_user, test_food, history):
+        """Test that meal type, food and date filters narrow the pages."""
+        ids, _ = self.walk(client, auth_headers, '&meal_type=dinner')
+        assert len(ids) == 30
+        assert {FoodEntry.query.get(entry_id).meal_type for entry_id in ids} == {'dinner'}
+
+        start = (date.today() - timedelta(days=4)).isoformat()
+        ids, _ = self.walk(client, auth_headers, f'&start_date={start}&food_id={test_food.id}')
+        assert ids == [entry_id for _, entry_id in history[:10]]
+
+        ids, _ = self.walk(client, auth_headers, '&custom_food_id=999')
+        assert ids == []
+
+    def test_only_own_entries(self, client, auth_headers, test_food):
+        """Test that another user's entries never appear."""
+        from app.models import User
+        other = User(email='other@example.com', name='other')
+        other.set_password('Password123!')
+        db.session.add(other)
+        db.session.commit()
+        db.session.add(FoodEntry(user_id=other.id, food_id=test_food.id, date=date.today(), meal_type='lunch',
+                                 quantity=100, calories=165, protein=31, carbs=0, fat=4, fiber=0))
+        db.session.commit()
+
+        data = client.get('/api/entries/history', headers=auth_headers).get_json()
+
+        assert data == {'entries': [], 'next_cursor': None, 'has_more': False}
+
+    def test_invalid_parameters(self, client, auth_headers):
+        """Test that bad cursors and limits outside PaginationSchema are rejected."""
+        for query in ('cursor=not-a-cursor', 'per_page=0', 'per_page=101', 'meal_type=brunch',
+                      'food_id=1&custom_food_id=2', 'start_date=2024-02-01&end_date=2024-01-01', 'page=2'):
+            response = client.get(f'/api/entries/history?{query}', headers=auth_headers)
+            assert response.status_code == 400, query
@@ -0,0 +1,124 @@
+import csv
+import io
+import json
+import zipfile
+import pytest
+from datetime import date, timedelta
+from app import db
+from app.models import CommunityRecipe, FoodEntry, SavedMeal, SavedMealItem
+
+
+@pytest.fixture
+def history(app, test_user, test_food, test_custom_food):
+    """A month of entries plus a saved meal."""
+    today = date.today()
+    for offset in range(30):
+        db.session.add(FoodEntry(
+            user_id=test_user.id, food_id=test_food.id, food_name='Chicken Breast',
+            date=today - timedelta(days=offset), meal_type='lunch', quantity=100,
+            calories=165, protein=31, carbs=0, fat=4, fiber=0
+        ))
+    db.session.add(SavedMeal(user_id=test_user.id, name='Lunch',
+                             items=[SavedMealItem(food_id=test_food.id, name='Chicken Breast', quantity=100,
+                                                  calories=165, protein=31, carbs=0, fat=4, fiber=0)],
+                             total_calories=165, total_protein=31, total_carbs=0, total_fat=4, total_fiber=0))
+    db.session.commit()
+    return today
+
+
+class TestExport:
+    """Tests for streaming data export."""
+
+    def test_export_entries_ndjson(self, client, auth_headers, history):
+        """Test that entries stream as one JSON object per line in id order."""
+        response = client.get('/api/export/entries', headers=auth_headers)
+
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        rows = [json.loads(line) for line in response.data.decode().splitlines()]
+        assert len(rows) == 30
+        assert [row['id'] for row in rows] == sorted(row['id'] for row in rows)
+        assert rows[0]['food_name'] == 'Chicken Breast'
+        assert rows[0]['date'] == history.isoformat()
+
+    def test_export_csv_with_date_range(self, client, auth_headers, history):
+        """Test that a CSV export is limited to the requested dates."""
+        start = (history - timedelta(days=6)).isoformat()
+        response = client.get(f'/api/export/entries?format=csv&start_date={start}&end_date={history.isoformat()}',
+                              headers=auth_headers)
+
+        assert response.status_code == 200
+        rows = list(csv.DictReader(io.StringIO(response.data.decode())))
+        assert len(rows) == 7
+        assert all(start <= row['date'] <= history.isoformat() for row in rows)
+
+    def test_resume_after_id(self, client, auth_headers, history):
+        """Test that after_id picks up where an export stopped."""
+        rows = [json.loads(line) for line in
+                client.get('/api/export/entries', headers=auth_headers).data.decode().splitlines()]
+
+        response = client.get(f"/api/export/entries?after_id={rows[9]['id']}", headers=auth_headers)
+
+        resumed = [json.loads(line) for line in response.data.decode().splitlines()]
+        assert [row['id'] for row in resumed] == [row['id'] for row in rows[10:]]
+
+    def test_streams_in_batches(self, app, test_user, history):
+        """Test that rows are read in bounded batches."""
+        from app.utils.export import iter_batches
+
+        batches = list(iter_batches(test_user.id, 'entries', batch_size=8))
+
+        assert [len(batch) for batch in batches] == [8, 8, 8, 6]
+
+    def test_export_archive(self, client, auth_headers, test_user, history, tmp_path, monkeypatch):
+        """Test that the zip holds every table and the user's recipe images."""
+        from app.api import export
+        monkeypatch.setattr(export, 'UPLOAD_FOLDER', str(tmp_path))
+        (tmp_path / 'photo.jpg').write_bytes(b'jpeg-bytes')
+        db.session.add(CommunityRecipe(user_id=test_user.id, title='Bowl', instructions='Mix', image_filename='photo.jpg',
+                                       foods='[]', total_calories=1, total_protein=1, total_carbs=1,
+                                       total_fat=1, total_fiber=1))
+        db.session.commit()
+
+        response = client.get('/api/export?format=csv', headers=auth_headers)
+
+        assert response.status_code == 200
+        archive = zipfile.ZipFile(io.BytesIO(response.data))
+        assert sorted(archive.namelist()) == [
+            'custom_foods.csv', 'entries.csv', 'images/photo.jpg', 'meal_items.csv', 'meals.csv', 'recipes.csv'
+        ]
+        assert len(archive.read('entries.csv').decode().splitlines()) == 31
+        assert archive.read('images/photo.jpg') == b'jpeg-bytes'
+        items = list(csv.DictReader(io.StringIO(archive.read('meal_items.csv').decode())))
+        assert [(item['name'], item['calories']) for item in items] == [('Chicken Breast', '165.0')]
+
+    def test_export_only_own_rows(self, client, auth_headers, history):
+        """Test that another user's data is never exported."""
+        from app.models import User
+        other = User(email='other@example.com', name='other')
+        other.set_password('Password123!')
+        db.session.add(other)
+        db.session.commit()
+        db.session.add(FoodEntry(user_id=other.id, date=history, meal_type='lunch', quantity=1,
+                                 calories=1, protein=1, carbs=1, fat=1, fiber=1))
+        db.session.commit()
+
+        db.session.add(SavedMeal(user_id=other.id, name='Theirs', items=[SavedMealItem(name='Toast', quantity=1)],
+                                 total_calories=0, total_protein=0, total_carbs=0, total_fat=0, total_fiber=0))
+        db.session.commit()
+
+        response = client.get('/api/export/entries', headers=auth_headers)
+
+        assert len(response.data.decode().splitlines()) == 30
+        items = client.get('/api/export/meal_items', headers=auth_headers).data.decode().splitlines()
+        assert [json.loads(line)['name'] for line in items] == ['Chicken Breast']
+
+    def test_export_invalid_arguments(self, client, auth_headers):
+        """Test that unknown tables, formats and dates are rejected."""
+        assert client.get('/api/export/passwords', headers=auth_headers).status_code == 404
+        assert client.get('/api/export/entries?format=xml', headers=auth_headers).status_code == 400
+        assert client.get('/api/export/entries?start_date=yesterday', headers=auth_headers).status_code == 400
+
+    def test_export_without_auth(self, client):
+        """Test that exports require authentication."""
+        assert client.get('/api/export').status_code == 401
@@ -75,12 +75,64 @@ class TestFoodSearch:
         assert len(data1['results']) > 0
         assert len(data2['results']) > 0
 
-    @patch('app.api.foods.requests.post')
-    def test_search_includes_usda_results(self, mock_post, client, auth_headers, app):
+    def test_search_matches_word_prefixes_ranked(self, client, auth_headers, test_food):
+        """Test that indexed search matches word prefixes and ranks name hits first."""
+        db.session.add_all([
+            Food(name='Rice Cake', brand='Chicken Co', calories=380,
+                 protein=8, carbs=80, fat=3, fiber=4),
+            Food(name='Fried Chicken Thigh', calories=250,
+                 protein=24, carbs=8, fat=14, fiber=0),
+        ])
+        db.session.commit()
+
+        response = client.get('/api/foods/search?q=chick',
+                             headers=auth_headers)
+
+        names = [food['name'] for food in response.get_json()['results']]
+        assert 'Chicken Breast' in names
+        assert 'Fried Chicken Thigh' in names
+        assert names.index('Rice Cake') > names.index('Chicken Breast')
+
+    def test_search_index_tracks_new_custom_foods(self, client, auth_headers):
+        """Test that a newly created custom food is searchable immediately."""
+        client.post('/api/foods/custom',
+                   headers=auth_headers,
+                   json={
+                       'name': 'Overnight Oats',
+                       'serving_size': 200,
+                       'calories': 300,
+                       'protein': 12,
+                       'carbs': 45,
+                       'fat': 8,
+                       'fiber': 6
+                   })
+
+        response = client.get('/api/foods/search?q=overnight',
+                             headers=auth_headers)
+
+        data = response.get_json()
+        assert any(food['name'] == 'Overnight Oats' and food['type'] == 'custom'
+                   for food in data['results'])
+
+    def test_search_index_covers_existing_rows(self, app, client, auth_headers, test_food):
+        """Test that an index created on a populated database finds the rows already there."""
+        from app.utils.search import create_search_index, drop_search_index, search_backend
+        with db.engine.begin() as connection:
+            drop_search_index(connection)
+            create_search_index(connection)
+        assert search_backend() == 'fts5'
+
+        response = client.get('/api/foods/search?q=chicken', headers=auth_headers)
+
+        assert any(food['name'] == 'Chicken Breast' for food in response.get_json()['results'])
+
+    @patch('app.utils.usda.requests.Session.request')
+    def test_search_includes_usda_results(self, mock_request, client, auth_headers, app):
         """Test that search includes USDA API results when available."""
         # Mock USDA API response
         mock_response = MagicMock()
         mock_response.status_code = 200
+        mock_response.headers = {}
         mock_response.json.return_value = {
             'foods': [{
                 'fdcId': 123456,
@@ -95,13 +147,12 @@ class TestFoodSearch:
                 }
             }]
         }
-        mock_post.return_value = mock_response
+        mock_request.return_value = mock_response
 
-        # Set USDA API key in environment
-        # Patch the usda_key variable that was set at module import
-        with patch('app.api.foods.usda_key', 'test_key'):
-            response = client.get('/api/foods/search?q=chicken',
-                                 headers=auth_headers)
+        # Configure the shared USDA client with an API key
+        app.extensions['usda_client'].api_key = 'test_key'
+        response = client.get('/api/foods/search?q=chicken',
+                             headers=auth_headers)
 
         assert response.status_code == 200
         data = response.get_json()
@@ -109,14 +160,14 @@ class TestFoodSearch:
         usda_results = [f for f in data['results'] if f.get('type') == 'usda']
         assert len(usda_results) > 0
 
-    @patch('app.api.foods.requests.post')
-    def test_search_handles_usda_api_error(self, mock_post, client, auth_headers):
+    @patch('app.utils.usda.requests.Session.request')
+    def test_search_handles_usda_api_error(self, mock_request, client, auth_headers, app):
         """Test that search handles USDA API errors gracefully."""
-        mock_post.side_effect = Exception('API Error')
+        mock_request.side_effect = Exception('API Error')
 
-        with patch.dict('os.environ', {'USDA_API_KEY': 'test_key'}):
-            response = client.get('/api/foods/search?q=chicken',
-                                 headers=auth_headers)
+        app.extensions['usda_client'].api_key = 'test_key'
+        response = client.get('/api/foods/search?q=chicken',
+                             headers=auth_headers)
 
         # Should still return successfully with database results
         assert response.status_code == 200
@@ -258,16 +309,35 @@ class TestCustomFoods:
         assert len(data['foods']) == 1
         assert data['foods'][0]['name'] == 'User 2 Food'
 
+    def test_custom_foods_paged_and_searched(self, client, auth_headers, test_user, test_custom_food):
+        """Test that custom foods are paged, searched by name or brand and sorted."""
+        db.session.add_all([
+            CustomFood(user_id=test_user.id, name=f'Bar {i}', brand='Acme', serving_size=50,
+                       calories=100 + i, protein=5, carbs=20, fat=3, fiber=1)
+            for i in range(3)
+        ])
+        db.session.commit()
+
+        response = client.get('/api/foods/custom?search=acme&sort_by=calories&sort_order=desc&per_page=2',
+                              headers=auth_headers)
+
+        data = response.get_json()
+        assert [food['name'] for food in data['foods']] == ['Bar 2', 'Bar 1']
+        assert (data['total'], data['pages'], data['current_page']) == (3, 2, 1)
+        assert client.get('/api/foods/custom?search=homemade', headers=auth_headers).get_json()['total'] == 1
+        assert client.get('/api/foods/custom?per_page=500', headers=auth_headers).status_code == 400
+
 
 class TestUSDAFoodSaving:
     """Tests for saving USDA foods to database."""
 
-    @patch('app.api.foods.requests.get')
-    def test_save_usda_food(self, mock_get, client, auth_headers):
+    @patch('app.utils.usda.requests.Session.request')
+    def test_save_usda_food(self, mock_request, client, auth_headers, app):
         """Test saving a USDA food to the database."""
         # Mock USDA API response
         mock_response = MagicMock()
         mock_response.status_code = 200
+        mock_response.headers = {}
         mock_response.json.return_value = {
             'fdcId': 123456,
             'description': 'Grilled Chicken Breast',
@@ -280,23 +350,47 @@ class TestUSDAFoodSaving:
             ],
             'labelNutrients': {}
         }
-        mock_get.return_value = mock_response
+        mock_request.return_value = mock_response
 
-        with patch.dict('os.environ', {'USDA_API_KEY': 'test_key'}):
-            response = client.post('/api/foods/usda/usda_123456',
-                                  headers=auth_headers)
+        app.extensions['usda_client'].api_key = 'test_key'
+        response = client.post('/api/foods/usda/usda_123456',
+                              headers=auth_headers)
 
         assert response.status_code == 201
         data = response.get_json()
         assert 'food' in data
         assert data['food']['name'] == 'Grilled Chicken Breast'
 
-    @patch('app.api.foods.requests.get')
-    def test_save_usda_food_already_exists(self, mock_get, client, auth_headers):
+    @patch('app.utils.usda.requests.Session.request')
+    def test_save_usda_food_without_description(self, mock_request, client, auth_headers, app):
+        """Test that a USDA food with a blank description is refused, not stored."""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.headers = {}
+        mock_response.json.return_value = {
+            'fdcId': 123456,
+            'description': '   ',
+            'foodNutrients': [{'nutrient': {'name': 'Energy'}, 'amount': 165}],
+            'labelNutrients': {}
+        }
+        mock_request.return_value = mock_response
+
+        app.extensions['usda_client'].api_key = 'test_key'
+        response = client.post('/api/foods/usda/usda_123456',
+                              headers=auth_headers)
+
+        assert response.status_code == 502
+        assert 'description' in response.get_json()['message']
+        assert Food.query.filter_by(fdc_id=123456).first() is None
+
+    @patch('app.utils.usda.requests.Session.request')
+    def test_save_usda_food_already_exists(self, mock_request, client, auth_headers):
         """Test saving a USDA food that already exists returns existing food."""
         # Create a food with USDA identifier
         food = Food(
             name='Existing USDA Food',
+            source='usda',
+            fdc_id=123456,
             calories=100,
             protein=10,
             carbs=10,
@@ -306,43 +400,81 @@ class TestUSDAFoodSaving:
         db.session.add(food)
         db.session.commit()
 
-        response = client.post(f'/api/foods/usda/usda_{food.id}',
+        response = client.post('/api/foods/usda/usda_123456',
                               headers=auth_headers)
 
         # Should return existing food without calling API
-        assert mock_get.call_count == 0
+        assert response.status_code == 200
+        assert response.get_json()['food']['id'] == food.id
+        assert mock_request.call_count == 0
+
+    def test_repeated_save_fetches_once(self, client, auth_headers, app, fake_fdc):
+        """Test that saving the same USDA food twice reuses the stored row."""
+        first = client.post('/api/foods/usda/usda_173944', headers=auth_headers)
+        second = client.post('/api/foods/usda/usda_173944', headers=auth_headers)
+
+        assert first.status_code == 201
+        assert second.status_code == 200
+        assert second.get_json()['food']['id'] == first.get_json()['food']['id']
+        assert fake_fdc.requests == 1
+        assert Food.query.filter_by(fdc_id=173944).count() == 1
+
+    def test_concurrent_saves_collapse_to_one_row(self, client, auth_headers, app, fake_fdc):
+        """Test that a save racing another save of the same item keeps one row."""
+        usda = app.extensions['usda_client']
+        fetch = usda.food
+
+        def fetch_after_other_save(fdc_id):
+            # The other request stores the food while this one is fetching it
+            db.session.add(Food(name='Bananas, Raw', source='usda', fdc_id=fdc_id,
+                                calories=89, protein=1, carbs=23, fat=0))
+            db.session.commit()
+            return fetch(fdc_id)
+
+        with patch.object(usda, 'food', side_effect=fetch_after_other_save):
+            response = client.post('/api/foods/usda/usda_173944', headers=auth_headers)
 
-    def test_save_usda_food_no_api_key(self, client, auth_headers):
+        assert response.status_code == 200
+        assert Food.query.filter_by(fdc_id=173944).count() == 1
+
+    def test_save_usda_food_invalid_id(self, client, auth_headers):
+        """Test that non-numeric USDA ids are rejected."""
+        response = client.post('/api/foods/usda/usda_abc', headers=auth_headers)
+
+        assert response.status_code == 400
+
+    def test_save_usda_food_no_api_key(self, client, auth_headers, app):
         """Test saving USDA food without API key configured."""
-        with patch.dict('os.environ', {}, clear=True):
-            response = client.post('/api/foods/usda/usda_123456',
-                                  headers=auth_headers)
+        app.extensions['usda_client'].api_key = None
+        response = client.post('/api/foods/usda/usda_123456',
+                              headers=auth_headers)
 
         assert response.status_code == 500
         data = response.get_json()
         assert 'not configured' in data['message'].lower()
 
-    @patch('app.api.foods.requests.get')
-    def test_save_usda_food_api_error(self, mock_get, client, auth_headers):
+    @patch('app.utils.usda.requests.Session.request')
+    def test_save_usda_food_api_error(self, mock_request, client, auth_headers, app):
         """Test handling of USDA API errors."""
         mock_response = MagicMock()
         mock_response.status_code = 404
-        mock_get.return_value = mock_response
+        mock_response.headers = {}
+        mock_request.return_value = mock_response
 
-        with patch.dict('os.environ', {'USDA_API_KEY': 'test_key'}):
-            response = client.post('/api/foods/usda/usda_999999',
-                                  headers=auth_headers)
+        app.extensions['usda_client'].api_key = 'test_key'
+        response = client.post('/api/foods/usda/usda_999999',
+                              headers=auth_headers)
 
         assert response.status_code == 500
 
-    @patch('app.api.foods.requests.get')
-    def test_save_usda_food_timeout(self, mock_get, client, auth_headers):
+    @patch('app.utils.usda.requests.Session.request')
+    def test_save_usda_food_timeout(self, mock_request, client, auth_headers, app):
         """Test handling of USDA API timeout."""
-        mock_get.side_effect = Exception('Timeout')
+        mock_request.side_effect = Exception('Timeout')
 
-        with patch.dict('os.environ', {'USDA_API_KEY': 'test_key'}):
-            response = client.post('/api/foods/usda/usda_123456',
-                                  headers=auth_headers)
+        app.extensions['usda_client'].api_key = 'test_key'
+        response = client.post('/api/foods/usda/usda_123456',
+                              headers=auth_headers)
 
         assert response.status_code == 500
 
@@ -388,4 +520,792 @@ class TestFoodDataIntegrity:
         assert test_food.protein >= 0
         assert test_food.carbs >= 0
         assert test_food.fat >= 0
-        assert test_food.fiber >= 0
\ No newline at end of file
+        assert test_food.fiber >= 0
+
+class TestFoodIndex:
+    """Tests for the in-memory typeahead index."""
+
+    def test_short_prefix_served_from_index(self, client, auth_headers, test_food, test_custom_food):
+        """Test that 2-3 character queries match word starts of foods and custom foods."""
+        response = client.get('/api/foods/search?q=br', headers=auth_headers)
+
+        data = response.get_json()
+        assert any(food['name'] == 'Chicken Breast' for food in data['results'])
+
+        response = client.get('/api/foods/search?q=sha', headers=auth_headers)
+
+        data = response.get_json()
+        assert any(food['name'] == 'My Protein Shake' and food['type'] == 'custom'
+                   for food in data['results'])
+
+    def test_index_updated_incrementally(self, app, client, auth_headers, test_food):
+        """Test that foods created after the build are found without a rebuild."""
+        client.get('/api/foods/search?q=ch', headers=auth_headers)
+        built_at = app.extensions['food_index'].built_at
+
+        client.post('/api/foods/custom',
+                   headers=auth_headers,
+                   json={
+                       'name': 'Chia Pudding',
+                       'serving_size': 150,
+                       'calories': 220,
+                       'protein': 6,
+                       'carbs': 20,
+                       'fat': 12,
+                       'fiber': 9
+                   })
+        response = client.get('/api/foods/search?q=chi', headers=auth_headers)
+
+        names = [food['name'] for food in response.get_json()['results']]
+        assert 'Chia Pudding' in names
+        assert app.extensions['food_index'].built_at == built_at
+
+    def test_catalog_catches_up_with_other_writers(self, app, client, auth_headers, test_food):
+        """Test that foods written outside this process reach short searches after the catalog check."""
+        index = app.extensions['food_index']
+        client.get('/api/foods/search?q=ch', headers=auth_headers)
+        built_at = index.built_at
+        index.catalog_ttl = 0
+
+        def names():
+            response = client.get('/api/foods/search?q=gra', headers=auth_headers)
+            return [food['name'] for food in response.get_json()['results']]
+
+        # As if another worker or `flask import-fdc` had written it
+        grapes = Food(name='Grapes', calories=69, protein=0.7, carbs=18, fat=0.2, fiber=0.9)
+        db.session.add(grapes)
+        db.session.commit()
+        assert 'Grapes' in names()
+        assert index.built_at == built_at
+
+        db.session.delete(grapes)
+        db.session.commit()
+        assert 'Grapes' not in names()
+        assert index.built_at != built_at
+
+    def test_user_partitions_bounded(self, app, test_user):
+        """Test that only the most recently searched users keep their custom foods loaded."""
+        index = app.extensions['food_index']
+        index.max_users = 2
+
+        for user_id in (test_user.id, 101, 102, test_user.id, 103):
+            index.lookup('ch', user_id)
+
+        assert list(index.custom) == [test_user.id, 103]
+
+    def test_prefixes_longer_than_keys(self, app, test_user, test_food):
+        """Test that prefixes longer than the stored keys are matched against the whole name."""
+        index = app.extensions['food_index']
+        db.session.add(Food(name='Chickpeas', calories=364, protein=19, carbs=61, fat=6, fiber=17))
+        db.session.commit()
+
+        foods, _ = index.lookup('chicken b', test_user.id)
+
+        assert index.key_length == 3
+        assert [food['name'] for food in foods] == ['Chicken Breast']
+
+    def test_warm_builds_in_background(self, app):
+        """Test that warming builds the catalog on a background thread."""
+        import threading
+        index = app.extensions['food_index']
+
+        index.warm(app)
+        for thread in threading.enumerate():
+            if thread.name == 'food-index-warm':
+                thread.join(timeout=10)
+
+        assert index.ready
+
+    def test_index_stats(self, client, auth_headers, test_food):
+        """Test that build time and memory size are exposed."""
+        client.get('/api/foods/search?q=ch', headers=auth_headers)
+
+        response = client.get('/api/foods/search/stats', headers=auth_headers)
+
+        assert response.status_code == 200
+        stats = response.get_json()['food_index']
+        assert stats['ready'] is True
+        assert stats['foods'] == 1
+        assert stats['build_seconds'] is not None
+        assert stats['memory_bytes'] > 0
+
+    def test_index_stats_disabled(self, app, client, auth_headers):
+        """Test that search stats are hidden unless enabled in the config."""
+        app.config['SEARCH_STATS_ENABLED'] = False
+
+        response = client.get('/api/foods/search/stats', headers=auth_headers)
+
+        assert response.status_code == 404
+
+
+class TestUSDASearchCache:
+    """Tests for the USDA search result cache."""
+
+    def test_repeated_queries_hit_cache(self, client, auth_headers, app, fake_fdc):
+        """Test that repeated and differently-cased queries reuse one USDA call."""
+        first = client.get('/api/foods/search?q=banana', headers=auth_headers)
+        second = client.get('/api/foods/search?q=Banana%20', headers=auth_headers)
+
+        assert fake_fdc.requests == 1
+        assert first.get_json()['results'] == second.get_json()['results']
+        stats = app.extensions['usda_cache'].stats()
+        assert stats['misses'] == 1
+        assert stats['hits'] == 1
+
+    def test_cache_survives_restart(self, client, auth_headers, app, fake_fdc):
+        """Test that results are served from the persistent table after the LRU is lost."""
+        from app.utils.usda_cache import UsdaSearchCache
+
+        client.get('/api/foods/search?q=banana', headers=auth_headers)
+        app.extensions['usda_cache'] = UsdaSearchCache()
+        response = client.get('/api/foods/search?q=banana', headers=auth_headers)
+
+        assert fake_fdc.requests == 1
+        assert response.get_json()['results'][0]['id'] == 'usda_173944'
+        assert app.extensions['usda_cache'].stats()['persistent_hits'] == 1
+
+    def test_failed_calls_not_cached(self, client, auth_headers, app, fake_fdc):
+        """Test that upstream errors are retried on the next search."""
+        fake_fdc.failure_rate = 1.0
+
+        client.get('/api/foods/search?q=banana', headers=auth_headers)
+        client.get('/api/foods/search?q=banana', headers=auth_headers)
+
+        assert app.extensions['usda_cache'].stats()['misses'] == 2
+
+    def test_expired_entries_refetched(self, app):
+        """Test that entries older than the TTL are treated as misses."""
+        from app.utils.usda_cache import UsdaSearchCache
+        cache = UsdaSearchCache(ttl=0)
+        cache.put('banana', [{'id': 'usda_1'}])
+
+        assert cache.get('banana') is None
+
+    def test_concurrent_misses_coalesced(self, app):
+        """Test that identical in-flight queries share one upstream call."""
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+        from app.utils.usda_cache import UsdaSearchCache
+        cache = UsdaSearchCache()
+        release = threading.Event()
+        calls = []
+
+        def fetch(query):
+            calls.append(query)
+            release.wait(5)
+            return [{'id': 'usda_1'}]
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            first = cache.fetch_async('banana', fetch, executor)
+            second = cache.fetch_async('Banana', fetch, executor)
+            release.set()
+
+            assert second is first
+            assert first.result(5) == [{'id': 'usda_1'}]
+
+        assert len(calls) == 1
+        assert cache.stats()['coalesced'] == 1
+
+
+class TestSearchLatencyBudget:
+    """Tests for concurrent local/USDA search with a latency budget."""
+
+    def test_slow_usda_returns_local_results_as_pending(self, client, auth_headers, app,
+                                                        test_food, fake_fdc):
+        """Test that a slow USDA call is cut off at the budget and cached for later."""
+        import time
+        app.config['SEARCH_LATENCY_BUDGET'] = 0.05
+        fake_fdc.latency = 0.3
+
+        started = time.monotonic()
+        response = client.get('/api/foods/search?q=chicken', headers=auth_headers)
+        elapsed = time.monotonic() - started
+
+        data = response.get_json()
+        assert elapsed < 0.3
+        assert data['usda'] == 'pending'
+        assert [food['name'] for food in data['results']] == ['Chicken Breast']
+
+        time.sleep(0.4)
+        response = client.get('/api/foods/search?q=chicken', headers=auth_headers)
+
+        data = response.get_json()
+        assert data['usda'] == 'complete'
+        assert any(food['id'] == 'usda_171077' for food in data['results'])
+        assert fake_fdc.requests == 1
+
+    def test_usda_omitted_when_local_results_suffice(self, client, auth_headers, fake_fdc):
+        """Test that no upstream call is made when the index fills the page."""
+        db.session.add_all([
+            Food(name=f'Apple Variety {i}', calories=52, protein=0, carbs=14, fat=0, fiber=2)
+            for i in range(10)
+        ])
+        db.session.commit()
+
+        response = client.get('/api/foods/search?q=app', headers=auth_headers)
+
+        assert response.get_json()['usda'] == 'omitted'
+        assert fake_fdc.requests == 0
+
+    def test_usda_dropped_when_database_fills_page(self, app, client, auth_headers, fake_fdc):
+        """Test that long queries start USDA alongside the database but drop it on a full page."""
+        db.session.add_all([
+            Food(name=f'Juice Blend {i}', brand='Orchard Farms', calories=45, protein=0, carbs=11, fat=0, fiber=0)
+            for i in range(10)
+        ])
+        db.session.commit()
+
+        # Only brands match, which the in-memory name index can't see
+        response = client.get('/api/foods/search?q=orchard', headers=auth_headers)
+        data = response.get_json()
+
+        assert len(data['results']) == 10
+        assert all(not str(result['id']).startswith('usda_') for result in data['results'])
+        assert data['usda'] == 'omitted'
+        assert fake_fdc.requests == 1
+        assert not app.extensions['food_index'].ready
+
+    def test_usda_overlaps_database_lookup(self, client, auth_headers, app, test_food, fake_fdc,
+                                           monkeypatch):
+        """Test that database lookup time doesn't delay the USDA call."""
+        import time
+        import app.api.foods as foods_api
+        app.config['SEARCH_LATENCY_BUDGET'] = 0.45
+        fake_fdc.latency = 0.3
+        find_foods = foods_api.find_foods
+
+        def slow_find_foods(*args, **kwargs):
+            time.sleep(0.3)
+            return find_foods(*args, **kwargs)
+
+        monkeypatch.setattr(foods_api, 'find_foods', slow_find_foods)
+
+        response = client.get('/api/foods/search?q=chicken', headers=auth_headers)
+
+        assert response.get_json()['usda'] == 'complete'
+
+    def test_streaming_flushes_local_then_usda(self, client, auth_headers, test_food, fake_fdc):
+        """Test NDJSON mode sends local hits first and USDA hits second."""
+        import json
+        fake_fdc.latency = 0.05
+
+        response = client.get('/api/foods/search?q=chicken&stream=1', headers=auth_headers)
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+        assert response.mimetype == 'application/x-ndjson'
+        assert lines[0]['source'] == 'local'
+        assert lines[0]['results'][0]['name'] == 'Chicken Breast'
+        assert lines[1]['source'] == 'usda'
+        assert lines[1]['status'] == 'complete'
+        assert lines[1]['results'][0]['id'] == 'usda_171077'
+
+
+class TestUSDAClient:
+    """Tests for the pooled USDA client and its circuit breaker."""
+
+    def test_connections_are_reused(self, app, fake_fdc):
+        """Test that consecutive calls share one keep-alive connection."""
+        usda = app.extensions['usda_client']
+
+        usda.search('banana')
+        usda.food(173944)
+
+        assert fake_fdc.requests == 2
+        assert len(fake_fdc.connections) == 1
+
+    def test_circuit_opens_and_search_stays_local(self, client, auth_headers, app, test_food, fake_fdc):
+        """Test that repeated upstream failures short-circuit to local-only results."""
+        from app.utils.usda import UsdaClient
+        app.extensions['usda_client'] = UsdaClient(
+            api_key='test_key', base_url=fake_fdc.url, retries=0, failure_threshold=2
+        )
+        fake_fdc.failure_rate = 1.0
+
+        for _ in range(2):
+            response = client.get('/api/foods/search?q=chicken', headers=auth_headers)
+            assert response.get_json()['usda'] == 'failed'
+
+        response = client.get('/api/foods/search?q=chicken', headers=auth_headers)
+
+        data = response.get_json()
+        assert data['usda'] == 'unavailable'
+        assert data['results'][0]['name'] == 'Chicken Breast'
+        assert fake_fdc.requests == 2
+        assert app.extensions['usda_client'].stats()['circuit'] == 'open'
+
+    def test_circuit_closes_after_successful_trial(self, app, fake_fdc):
+        """Test that a half-open circuit closes again when upstream recovers."""
+        from app.utils.usda import UsdaClient, UsdaUnavailableError
+        usda = UsdaClient(api_key='test_key', base_url=fake_fdc.url, retries=0,
+                          failure_threshold=1, reset_timeout=0.05)
+        fake_fdc.failure_rate = 1.0
+
+        with pytest.raises(Exception):
+            usda.search('banana')
+        with pytest.raises(UsdaUnavailableError):
+            usda.search('banana')
+
+        import time
+        time.sleep(0.06)
+        fake_fdc.failure_rate = 0.0
+
+        assert usda.search('banana')[0]['fdcId'] == 173944
+        assert usda.breaker.state == 'closed'
+
+    def test_trial_released_on_unexpected_error(self, app, fake_fdc):
+        """Test that an exception during the half-open trial can't leave the circuit stuck."""
+        import time
+        from app.utils.usda import UsdaClient
+        usda = UsdaClient(api_key='test_key', base_url=fake_fdc.url, retries=0,
+                          failure_threshold=1, reset_timeout=0.05)
+        fake_fdc.failure_rate = 1.0
+        with pytest.raises(Exception):
+            usda.search('banana')
+        time.sleep(0.06)
+        fake_fdc.failure_rate = 0.0
+
+        with patch.object(usda.session, 'request', side_effect=RuntimeError('boom')):
+            with pytest.raises(RuntimeError):
+                usda.search('banana')
+
+        assert usda.available
+        assert usda.search('banana')[0]['fdcId'] == 173944
+        assert usda.breaker.state == 'closed'
+
+    def test_unavailable_while_trial_in_flight(self, app, fake_fdc):
+        """Test that other searches skip USDA while the half-open trial is running."""
+        import threading
+        import time
+        from app.utils.usda import UsdaClient
+        usda = UsdaClient(api_key='test_key', base_url=fake_fdc.url, retries=0,
+                          failure_threshold=1, reset_timeout=0.05)
+        fake_fdc.failure_rate = 1.0
+        with pytest.raises(Exception):
+            usda.search('banana')
+        time.sleep(0.06)
+        fake_fdc.failure_rate = 0.0
+        fake_fdc.latency = 0.2
+
+        trial = threading.Thread(target=usda.search, args=('banana',))
+        trial.start()
+        time.sleep(0.05)
+        assert not usda.available
+        trial.join()
+
+        assert usda.available
+
+    def test_client_error_does_not_close_circuit(self, app, fake_fdc):
+        """Test that a 4xx during the trial is not counted as upstream recovering."""
+        import time
+        from app.utils.usda import UsdaClient, UsdaError
+        usda = UsdaClient(api_key='test_key', base_url=fake_fdc.url, retries=0,
+                          failure_threshold=1, reset_timeout=0.05)
+        fake_fdc.failure_rate = 1.0
+        with pytest.raises(Exception):
+            usda.search('banana')
+        time.sleep(0.06)
+        fake_fdc.failure_rate = 0.0
+
+        refused = MagicMock(status_code=400, headers={})
+        with patch.object(usda.session, 'request', return_value=refused):
+            with pytest.raises(UsdaError):
+                usda.search('banana')
+
+        assert usda.breaker.state == 'half_open'
+        assert usda.available
+
+    def test_retries_share_one_deadline(self, app, fake_fdc):
+        """Test that 503 retries stop once the call's timeout has been spent."""
+        import time
+        from app.utils.usda import UsdaClient, UsdaError
+        usda = UsdaClient(api_key='test_key', base_url=fake_fdc.url, timeout=0.25, retries=5)
+        fake_fdc.failure_rate = 1.0
+        fake_fdc.latency = 0.15
+
+        started = time.monotonic()
+        with pytest.raises(UsdaError):
+            usda.search('banana')
+
+        assert time.monotonic() - started < 0.4
+        assert fake_fdc.requests == 1
+
+    def test_exhausted_key_is_short_circuited(self, app, fake_fdc):
+        """Test that the client stops calling once the key's hourly quota is used up."""
+        from app.utils.usda import UsdaUnavailableError
+        fake_fdc.hourly_limit = 1
+        usda = app.extensions['usda_client']
+
+        usda.search('banana')
+
+        assert not usda.available
+        with pytest.raises(UsdaUnavailableError):
+            usda.search('banana')
+        assert fake_fdc.requests == 1
+
+
+def write_fdc_csv(directory, foods, nutrients, branded=()):
+    """Write a minimal FDC CSV download into directory."""
+    import csv
+
+    def write(name, header, rows):
+        with open(directory / name, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(rows)
+
+    write('food.csv', ['fdc_id', 'data_type', 'description', 'food_category_id', 'publication_date'], foods)
+    write('food_nutrient.csv', ['id', 'fdc_id', 'nutrient_id', 'amount', 'data_points'],
+          [(i, *row, '') for i, row in enumerate(nutrients, 1)])
+    if branded:
+        write('branded_food.csv', ['fdc_id', 'brand_owner', 'brand_name', 'gtin_upc'], branded)
+
+
+class TestFDCImport:
+    """Tests for the offline FoodData Central importer."""
+
+    def test_import_csv_maps_nutrients_by_id(self, app, tmp_path):
+        """Test that CSV foods are imported with nutrients mapped by FDC id."""
+        from app.utils.fdc_import import import_fdc
+
+        write_fdc_csv(tmp_path, [
+            (173944, 'sr_legacy_food', 'Bananas, raw', '9', '2019-04-01'),
+            (2262074, 'foundation_food', 'Oats, whole grain, rolled', '20', '2022-04-28'),
+            (1105000, 'branded_food', 'GREEK YOGURT', '1', '2020-11-13'),
+            (1999999, 'sub_sample_food', 'Banana sample', '9', '2019-04-01'),
+        ], [
+            (173944, 1008, 89), (173944, 1003, 1.09), (173944, 1005, 22.84),
+            (173944, 1004, 0.33), (173944, 1079, 2.6),
+            # Foundation foods often only report Atwater energy and carbohydrate by summation
+            (2262074, 2047, 382), (2262074, 1003, 13.5), (2262074, 1050, 68.7), (2262074, 1004, 5.89),
+            (1105000, 1008, 59), (1105000, 1003, 10.2), (1105000, 1093, 36),
+            (1999999, 1008, 90),
+        ], branded=[(1105000, 'Chobani, Inc.', 'CHOBANI', '00818290011510')])
+
+        result = import_fdc(str(tmp_path), chunk_size=2, report=None)
+
+        assert result['read'] == 3
+        assert result['inserted'] == 3
+        banana = Food.query.filter_by(fdc_id=173944).first()
+        assert (banana.name, banana.calories, banana.protein, banana.carbs) == ('Bananas, raw', 89, 1, 23)
+        oats = Food.query.filter_by(fdc_id=2262074).first()
+        assert (oats.calories, oats.carbs) == (382, 69)
+        yogurt = Food.query.filter_by(fdc_id=1105000).first()
+        assert (yogurt.brand, yogurt.barcode, yogurt.sodium) == ('CHOBANI', '00818290011510', 36)
+        assert Food.query.filter_by(fdc_id=1999999).first() is None
+
+    def test_rerun_is_idempotent(self, app, tmp_path):
+        """Test that running the import again skips foods already stored."""
+        from app.utils.fdc_import import import_fdc
+
+        write_fdc_csv(tmp_path, [
+            (173944, 'sr_legacy_food', 'Bananas, raw', '9', '2019-04-01'),
+            (170379, 'sr_legacy_food', 'Broccoli, raw', '11', '2019-04-01'),
+        ], [(173944, 1008, 89), (170379, 1008, 34)])
+
+        import_fdc(str(tmp_path), report=None)
+        result = import_fdc(str(tmp_path), report=None)
+
+        assert result['inserted'] == 0
+        assert result['skipped'] == 2
+        assert Food.query.filter(Food.fdc_id.isnot(None)).count() == 2
+
+    def test_import_streams_json_download(self, app, tmp_path):
+        """Test that JSON downloads are decoded element by element."""
+        import json
+        from benchmarks.fake_fdc import make_food
+        from app.utils.fdc_import import import_fdc, iter_json_array
+
+        foods = [
+            make_food(173944, 'Bananas, raw', 'SR Legacy', [89, 1.1, 0.3, 22.8, 2.6]),
+            make_food(170379, 'Broccoli, raw', 'SR Legacy', [34, 2.8, 0.4, 6.6, 2.6]),
+            make_food(2345678, 'Greek yogurt', 'Branded', [59, 10.2, 0.4, 3.6, 0], gtin_upc='0123'),
+        ]
+        path = tmp_path / 'FoodData_Central_sr_legacy_food_json.json'
+        path.write_text(json.dumps({'SRLegacyFoods': foods}))
+
+        with open(path) as stream:
+            assert list(iter_json_array(stream, read_size=64)) == foods
+
+        result = import_fdc(str(path), data_types=['sr_legacy_food'], report=None)
+
+        assert result['inserted'] == 2
+        broccoli = Food.query.filter_by(fdc_id=170379).first()
+        assert (broccoli.calories, broccoli.carbs, broccoli.fiber) == (34, 7, 3)
+
+
+class TestNutrientNormalizer:
+    """Tests for the USDA nutrient normalizer."""
+
+    def test_search_and_detail_payloads_agree(self):
+        """Test that search (nutrientId/value) and detail (nutrient/amount) shapes map alike."""
+        from benchmarks.fake_fdc import make_food, search_item
+        from app.utils.nutrients import normalize_usda_foods
+
+        detail = make_food(173944, 'Bananas, raw', 'SR Legacy', [89, 1.1, 0.3, 22.8, 2.6])
+        search, full = normalize_usda_foods([search_item(detail), detail])
+
+        assert search == full
+        assert (full['calories'], full['protein'], full['fat'], full['carbs'], full['fiber']) == \
+            (89, 1.1, 0.3, 22.8, 2.6)
+
+    def test_preferred_nutrient_ids_win(self):
+        """Test that kcal energy beats Atwater energy and kJ energy is ignored."""
+        from app.utils.nutrients import normalize_usda_food
+
+        food = normalize_usda_food({'fdcId': 1, 'description': 'Oats', 'foodNutrients': [
+            {'nutrient': {'name': 'Energy', 'unitName': 'kJ'}, 'amount': 1600},
+            {'nutrientId': 2047, 'value': 382},
+            {'nutrientId': 1008, 'value': 379},
+            {'number': '205.2', 'name': 'Carbohydrate, by summation', 'amount': 68.7},
+        ]})
+
+        assert food['calories'] == 379
+        assert food['carbs'] == 68.7
+
+    def test_label_nutrients_only_fill_gaps(self):
+        """Test that per-serving label values are scaled to 100 g and never override foodNutrients."""
+        from app.utils.nutrients import normalize_usda_food
+
+        food = normalize_usda_food({
+            'fdcId': 2,
+            'description': 'Greek Yogurt',
+            'servingSize': 150,
+            'servingSizeUnit': 'g',
+            'foodNutrients': [{'nutrientId': 1003, 'value': 10.0}],
+            'labelNutrients': {'calories': {'value': 90}, 'protein': {'value': 16}},
+        })
+
+        assert food['protein'] == 10.0
+        assert food['calories'] == 60.0
+
+
+class TestBarcodeLookup:
+    """Tests for the barcode lookup endpoint."""
+
+    def test_barcode_checksums(self):
+        """Test EAN-8, UPC-A, EAN-13 and GTIN-14 check digits."""
+        from app.schemas import CustomValidators
+
+        for code in ('96385074', '818290011510', '4006381333931', '00818290011510', '4006-3813-3393-1'):
+            assert CustomValidators.validate_barcode(code)
+        for code in ('96385075', '818290011511', '4006381333932', '12345', 'abcdefghijkl'):
+            assert not CustomValidators.validate_barcode(code)
+
+        assert CustomValidators.normalize_barcode('818290011510') == '00818290011510'
+        assert CustomValidators.normalize_barcode('818290011511') is None
+
+    def test_lookup_local_food_by_any_gtin_form(self, client, auth_headers):
+        """Test that UPC-A and zero-padded EAN-13 scans find the same stored food."""
+        food = Food(name='Greek Yogurt', barcode='00818290011510', calories=59,
+                    protein=10, carbs=4, fat=0, fiber=0)
+        db.session.add(food)
+        db.session.commit()
+
+        for code in ('818290011510', '0818290011510'):
+            response = client.get(f'/api/foods/barcode/{code}', headers=auth_headers)
+            assert response.status_code == 200
+            assert response.get_json()['food']['id'] == food.id
+            assert response.get_json()['source'] == 'local'
+
+    def test_invalid_barcode_rejected(self, client, auth_headers):
+        """Test that a barcode failing its checksum is rejected."""
+        response = client.get('/api/foods/barcode/818290011511', headers=auth_headers)
+
+        assert response.status_code == 400
+
+    def test_usda_fallback_is_stored(self, client, auth_headers, fake_fdc):
+        """Test that an unknown barcode is found in USDA branded foods and then served locally."""
+        first = client.get('/api/foods/barcode/818290011510', headers=auth_headers)
+        second = client.get('/api/foods/barcode/818290011510', headers=auth_headers)
+
+        assert first.status_code == 200
+        assert first.get_json()['source'] == 'usda'
+        assert first.get_json()['food']['calories'] == 59
+        assert second.get_json()['source'] == 'local'
+        assert fake_fdc.requests == 1
+        assert Food.query.filter_by(barcode='00818290011510', fdc_id=2345678).count() == 1
+
+    def test_unknown_barcode_miss_is_cached(self, client, auth_headers, fake_fdc):
+        """Test that repeated scans of an unknown product only ask USDA once."""
+        for _ in range(2):
+            response = client.get('/api/foods/barcode/4006381333931', headers=auth_headers)
+            assert response.status_code == 404
+
+        assert fake_fdc.requests == 1
+
+    def test_search_cannot_poison_barcode_cache(self, client, auth_headers, fake_fdc):
+        """Test that a text search shaped like a barcode key doesn't answer later scans."""
+        client.get('/api/foods/search?q=barcode 00818290011510', headers=auth_headers)
+        client.get('/api/foods/search?q=barcode%0900818290011510', headers=auth_headers)
+
+        response = client.get('/api/foods/barcode/818290011510', headers=auth_headers)
+
+        assert response.status_code == 200
+        assert response.get_json()['source'] == 'usda'
+
+
+class TestUsageRanking:
+    """Tests for usage-ranked search and the recent foods endpoint."""
+
+    def log(self, client, auth_headers, **food_ref):
+        from datetime import date
+        response = client.post('/api/entries', headers=auth_headers, json={
+            'date': date.today().isoformat(),
+            'meal_type': 'lunch',
+            'quantity': 100,
+            **food_ref
+        })
+        assert response.status_code == 201
+
+    def make_foods(self, *names):
+        foods = [Food(name=name, calories=150, protein=20, carbs=0, fat=5, fiber=0) for name in names]
+        db.session.add_all(foods)
+        db.session.commit()
+        return foods
+
+    def test_logged_food_ranks_first(self, client, auth_headers):
+        """Test that a food the user logs moves to the top of search results."""
+        breast, thigh = self.make_foods('Chicken Breast', 'Chicken Thigh')
+
+        before = client.get('/api/foods/search?q=chicken', headers=auth_headers).get_json()
+        self.log(client, auth_headers, food_id=thigh.id)
+        after = client.get('/api/foods/search?q=chicken', headers=auth_headers).get_json()
+
+        assert before['results'][0]['id'] == breast.id
+        assert after['results'][0]['id'] == thigh.id
+
+    def test_counters_updated_incrementally(self, client, auth_headers, test_user):
+        """Test that entries and saved meals bump per-user and global counters."""
+        from app.models import FoodUsage, SavedMeal
+        from app.utils.meals import build_items
+        from datetime import date
+        oats, = self.make_foods('Oats')
+
+        self.log(client, auth_headers, food_id=oats.id)
+        meal = SavedMeal(user_id=test_user.id, name='Breakfast', total_calories=300, total_protein=10,
+                         total_carbs=50, total_fat=5, total_fiber=8,
+                         items=build_items(test_user.id, [{'food_id': oats.id, 'quantity': 100,
+                                                          'calories': 150, 'protein': 5, 'carbs': 25, 'fat': 2}] * 2))
+        db.session.add(meal)
+        db.session.commit()
+        client.post(f'/api/meals/{meal.id}/add', headers=auth_headers,
+                    json={'date': date.today().isoformat(), 'meal_type': 'breakfast'})
+
+        usage = FoodUsage.query.filter_by(user_id=test_user.id, food_id=oats.id).one()
+        db.session.refresh(oats)
+        assert usage.use_count == 3
+        assert oats.use_count == 3
+        assert oats.usage_score == pytest.approx(usage.score)
+
+    def test_recent_uses_outweigh_old_ones(self, app, test_user):
+        """Test that two uses a month ago rank below one use today."""
+        from datetime import datetime, timedelta
+        from app.utils.usage import record_usage, recent_foods
+        old, new = self.make_foods('Porridge', 'Granola')
+        now = datetime.utcnow()
+
+        record_usage(test_user.id, [(old.id, None)] * 2, when=now - timedelta(days=30))
+        record_usage(test_user.id, [(new.id, None)], when=now)
+        db.session.commit()
+
+        assert [food['name'] for food in recent_foods(test_user.id)] == ['Granola', 'Porridge']
+
+    def test_scores_do_not_overflow_decades_out(self, app, test_user):
+        """Test that uses far from the epoch still add up and rank by recency."""
+        import math
+        from datetime import datetime, timedelta
+        from app.models import FoodUsage
+        from app.utils.usage import record_usage, recent_foods, log_weight
+        old, new = self.make_foods('Porridge', 'Granola')
+        later = datetime(2124, 1, 1)
+
+        record_usage(test_user.id, [(old.id, None)] * 2, when=later - timedelta(days=30))
+        record_usage(test_user.id, [(new.id, None)], when=later)
+        record_usage(test_user.id, [(new.id, None)], when=later)
+        db.session.commit()
+
+        usage = FoodUsage.query.filter_by(user_id=test_user.id, food_id=new.id).one()
+        db.session.refresh(new)
+        assert usage.score == pytest.approx(log_weight(later) + 1)
+        assert new.usage_score == pytest.approx(usage.score)
+        assert math.isfinite(usage.score)
+        assert [food['name'] for food in recent_foods(test_user.id)] == ['Granola', 'Porridge']
+
+    def test_recent_foods_endpoint(self, client, auth_headers, test_user):
+        """Test that recent foods include catalog and custom foods the user logged."""
+        rice, = self.make_foods('Brown Rice')
+        custom = CustomFood(user_id=test_user.id, name='Mom\'s Lasagna', serving_size=250,
+                            calories=400, protein=20, carbs=40, fat=15, fiber=3)
+        db.session.add(custom)
+        db.session.commit()
+
+        self.log(client, auth_headers, food_id=rice.id)
+        self.log(client, auth_headers, custom_food_id=custom.id)
+        self.log(client, auth_headers, custom_food_id=custom.id)
+        response = client.get('/api/foods/recent', headers=auth_headers)
+
+        results = response.get_json()['results']
+        assert response.status_code == 200
+        assert [(r['name'], r['use_count']) for r in results] == [('Mom\'s Lasagna', 2), ('Brown Rice', 1)]
+        assert results[0]['type'] == 'custom'
+
+
+class TestFuzzySearch:
+    """Tests for typo-tolerant food matching."""
+
+    @pytest.fixture
+    def foods(self):
+        foods = [
+            Food(name=name, calories=100, protein=5, carbs=10, fat=2, fiber=1)
+            for name in ('Broccoli', 'Broccoli, raw, chopped', 'Greek Yogurt', 'Chicken Breast', 'Brown Rice')
+        ]
+        db.session.add_all(foods)
+        db.session.commit()
+        return foods
+
+    @pytest.mark.parametrize('query, expected', [
+        ('brocoli', 'Broccoli'),
+        ('yoghurt', 'Greek Yogurt'),
+        ('chiken', 'Chicken Breast'),
+        ('chiken brest', 'Chicken Breast'),
+    ])
+    def test_misspellings_resolve_locally(self, client, auth_headers, foods, fake_fdc, query, expected):
+        """Test that misspelled queries find the intended food and drop the USDA answer."""
+        response = client.get(f'/api/foods/search?q={query}', headers=auth_headers)
+
+        data = response.get_json()
+        assert data['results'][0]['name'] == expected
+        assert data['usda'] == 'omitted'
+        assert all(not str(result['id']).startswith('usda_') for result in data['results'])
+
+    def test_custom_foods_matched_fuzzily(self, client, auth_headers, test_user):
+        """Test that the user's own custom foods are typo tolerant too."""
+        db.session.add(CustomFood(user_id=test_user.id, name='Protein Pancakes', serving_size=100,
+                                  calories=250, protein=20, carbs=30, fat=5, fiber=2))
+        db.session.commit()
+
+        response = client.get('/api/foods/search?q=pancakez', headers=auth_headers)
+
+        results = response.get_json()['results']
+        assert results[0]['name'] == 'Protein Pancakes'
+        assert results[0]['type'] == 'custom'
+
+    def test_unrelated_query_still_asks_usda(self, client, auth_headers, foods, fake_fdc):
+        """Test that queries with no similar local food fall through to USDA."""
+        response = client.get('/api/foods/search?q=banana', headers=auth_headers)
+
+        assert response.get_json()['usda'] == 'complete'
+        assert fake_fdc.requests == 1
+
+    def test_trigram_similarity_is_word_level(self):
+        """Test that long names do not dilute the similarity of a matching word."""
+        from app.utils.food_index import TrigramIndex
+
+        index = TrigramIndex()
+        index.add('broccoli', 1)
+        index.add('beef broth low sodium ready to serve', 2)
+        index.add('broccoli raw chopped frozen unprepared', 3)
+
+        scores = index.lookup('brocoli')
+        assert scores[1] == scores[3] > 0.5
+        assert 2 not in scores
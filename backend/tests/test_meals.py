@@ -0,0 +1,264 @@
+import pytest
+from app import db
+from app.models import SavedMeal, SavedMealItem
+
+
+@pytest.fixture
+def meal(client, auth_headers, test_food, test_custom_food):
+    """A saved meal of a catalog food and a custom food, created through the API."""
+    response = client.post('/api/meals', headers=auth_headers, json={
+        'name': 'Lunch Bowl',
+        'foods': [
+            {'food_id': test_food.id, 'name': 'Chicken Breast', 'quantity': 100,
+             'calories': 165, 'protein': 31, 'carbs': 0, 'fat': 4, 'fiber': 0},
+            {'custom_food_id': test_custom_food.id, 'name': 'My Protein Shake', 'quantity': 300,
+             'calories': 250, 'protein': 30, 'carbs': 20, 'fat': 5, 'fiber': 3},
+        ]
+    })
+    assert response.status_code == 201
+    return response.get_json()['meal']
+
+
+class TestSavedMealItems:
+    """Tests for saved meals stored as item rows."""
+
+    def test_create_stores_items(self, client, auth_headers, meal, test_food):
+        """Test that a meal's foods become ordered item rows with totals summed from them."""
+        assert [food['name'] for food in meal['foods']] == ['Chicken Breast', 'My Protein Shake']
+        assert meal['total_calories'] == 415
+        assert SavedMealItem.query.filter_by(meal_id=meal['id']).count() == 2
+
+        meals = client.get('/api/meals?items=true', headers=auth_headers).get_json()['meals']
+        assert meals[0]['foods'] == meal['foods']
+
+    def test_missing_food_reference_is_dropped(self, client, auth_headers):
+        """Test that foods that don't exist keep their name but lose the reference."""
+        response = client.post('/api/meals', headers=auth_headers, json={
+            'name': 'Takeaway',
+            'foods': [{'food_id': 9999, 'name': 'Noodles', 'quantity': 200, 'calories': 400}]
+        })
+
+        food = response.get_json()['meal']['foods'][0]
+        assert food['food_id'] is None
+        assert food['name'] == 'Noodles'
+
+    def test_other_users_custom_food_is_dropped(self, client, auth_headers):
+        """Test that a meal can't reference another user's custom food."""
+        from app.models import CustomFood, User
+        other = User(email='other@example.com', name='other')
+        other.set_password('Password123!')
+        db.session.add(other)
+        db.session.commit()
+        theirs = CustomFood(user_id=other.id, name='Secret Recipe', serving_size=100, calories=500,
+                            protein=0, carbs=0, fat=0, fiber=0)
+        db.session.add(theirs)
+        db.session.commit()
+
+        response = client.post('/api/meals', headers=auth_headers, json={
+            'name': 'Borrowed',
+            'foods': [{'custom_food_id': theirs.id, 'name': 'Borrowed', 'quantity': 100, 'calories': 10}]
+        })
+        meal = response.get_json()['meal']
+        added = client.post(f"/api/meals/{meal['id']}/items", headers=auth_headers,
+                            json={'custom_food_id': theirs.id, 'quantity': 50}).get_json()['item']
+
+        assert meal['foods'][0]['custom_food_id'] is None
+        assert added['custom_food_id'] is None
+
+    def test_update_item_scales_nutrients(self, client, auth_headers, meal):
+        """Test that changing an item's quantity updates that row and the meal totals."""
+        item = meal['foods'][0]
+
+        response = client.put(f"/api/meals/{meal['id']}/items/{item['id']}", headers=auth_headers,
+                              json={'quantity': 200})
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['item']['id'] == item['id']
+        assert data['item']['calories'] == 330
+        assert data['meal']['total_calories'] == 580
+        assert 'foods' not in data['meal']
+
+    def test_add_and_remove_items(self, client, auth_headers, meal, test_food):
+        """Test that items can be appended and removed, but not the last one."""
+        response = client.post(f"/api/meals/{meal['id']}/items", headers=auth_headers, json={
+            'food_id': test_food.id, 'name': 'Chicken Breast', 'quantity': 50, 'calories': 82
+        })
+        assert response.status_code == 201
+        added = response.get_json()['item']
+
+        meals = client.get('/api/meals?items=true', headers=auth_headers).get_json()['meals']
+        assert [food['id'] for food in meals[0]['foods']][-1] == added['id']
+        assert meals[0]['total_calories'] == 497
+
+        for item in meal['foods']:
+            response = client.delete(f"/api/meals/{meal['id']}/items/{item['id']}", headers=auth_headers)
+            assert response.status_code == 200
+        response = client.delete(f"/api/meals/{meal['id']}/items/{added['id']}", headers=auth_headers)
+        assert response.status_code == 400
+
+    def test_item_validation(self, client, auth_headers, meal):
+        """Test that items need a food and a positive quantity."""
+        url = f"/api/meals/{meal['id']}/items"
+        assert client.post(url, headers=auth_headers, json={'name': 'Air', 'quantity': 1}).status_code == 400
+        assert client.post(url, headers=auth_headers, json={'food_id': 1, 'quantity': 0}).status_code == 400
+
+        item_url = f"{url}/{meal['foods'][0]['id']}"
+        assert client.put(item_url, headers=auth_headers, json={'quantity': -5}).status_code == 400
+        assert client.put(f'{url}/9999', headers=auth_headers, json={'quantity': 5}).status_code == 404
+
+    def test_meals_containing_food(self, client, auth_headers, meal, test_food, test_custom_food):
+        """Test that meals can be filtered by a food they contain."""
+        client.post('/api/meals', headers=auth_headers, json={
+            'name': 'Shake Only',
+            'foods': [{'custom_food_id': test_custom_food.id, 'name': 'My Protein Shake', 'quantity': 300,
+                       'calories': 250, 'protein': 30, 'carbs': 20, 'fat': 5}]
+        })
+
+        with_chicken = client.get(f'/api/meals?food_id={test_food.id}', headers=auth_headers).get_json()
+        with_shake = client.get(f'/api/meals?custom_food_id={test_custom_food.id}',
+                                headers=auth_headers).get_json()
+
+        assert [m['name'] for m in with_chicken['meals']] == ['Lunch Bowl']
+        assert sorted(m['name'] for m in with_shake['meals']) == ['Lunch Bowl', 'Shake Only']
+
+    def test_other_users_meal_items(self, client, auth_headers, meal):
+        """Test that another user's meal items can't be edited."""
+        from app.models import User
+        other = User(email='other@example.com', name='other')
+        other.set_password('Password123!')
+        db.session.add(other)
+        db.session.commit()
+        theirs = SavedMeal(user_id=other.id, name='Theirs', items=[SavedMealItem(name='Toast', quantity=1)],
+                           total_calories=0, total_protein=0, total_carbs=0, total_fat=0, total_fiber=0)
+        db.session.add(theirs)
+        db.session.commit()
+
+        response = client.put(f'/api/meals/{theirs.id}/items/{theirs.items[0].id}', headers=auth_headers,
+                              json={'quantity': 5})
+
+        assert response.status_code == 404
+
+    def test_deleting_meal_deletes_items(self, client, auth_headers, meal):
+        """Test that items go with their meal."""
+        client.delete(f"/api/meals/{meal['id']}", headers=auth_headers)
+
+        assert SavedMealItem.query.count() == 0
+
+
+class TestSavedMealListing:
+    """Tests for the paged saved meal listing and the meal detail."""
+
+    def _create(self, client, auth_headers, name, calories, description=None):
+        return client.post('/api/meals', headers=auth_headers, json={
+            'name': name, 'description': description,
+            'foods': [{'food_id': 1, 'name': name, 'quantity': 100, 'calories': calories},
+                      {'food_id': 1, 'name': 'Side', 'quantity': 50, 'calories': 0}]
+        }).get_json()['meal']
+
+    def test_listing_leaves_out_items(self, client, auth_headers, meal, count_queries):
+        """Test that the listing gives item counts without reading any item rows."""
+        db.session.expunge_all()
+
+        with count_queries() as statements:
+            response = client.get('/api/meals', headers=auth_headers)
+
+        data = response.get_json()
+        assert response.status_code == 200
+        assert data['meals'][0]['item_count'] == 2
+        assert 'foods' not in data['meals'][0]
+        assert data['total'] == 1
+        assert not [s for s in statements if 'saved_meal_items.name' in s]
+
+    def test_pagination_search_and_sort(self, client, auth_headers):
+        """Test that meals are paged, searched by name or description and sorted."""
+        for i in range(5):
+            self._create(client, auth_headers, f'Meal {i}', 100 * (5 - i))
+        self._create(client, auth_headers, 'Oats', 300, description='breakfast bowl')
+
+        page = client.get('/api/meals?per_page=2&page=3&sort_by=name&sort_order=asc',
+                          headers=auth_headers).get_json()
+        assert [m['name'] for m in page['meals']] == ['Meal 4', 'Oats']
+        assert (page['total'], page['pages'], page['current_page']) == (6, 3, 3)
+
+        found = client.get('/api/meals?search=BREAKFAST', headers=auth_headers).get_json()
+        assert [m['name'] for m in found['meals']] == ['Oats']
+
+        by_calories = client.get('/api/meals?sort_by=calories&sort_order=asc&per_page=3',
+                                 headers=auth_headers).get_json()
+        assert [m['total_calories'] for m in by_calories['meals']] == [100, 200, 300]
+
+    def test_listing_validation(self, client, auth_headers):
+        """Test that bad paging and sorting arguments are rejected."""
+        for query in ['per_page=101', 'page=0', 'sort_by=fat', 'sort_order=up']:
+            assert client.get(f'/api/meals?{query}', headers=auth_headers).status_code == 400
+
+    def test_meal_detail(self, client, auth_headers, meal):
+        """Test that one meal can be fetched with its foods."""
+        response = client.get(f"/api/meals/{meal['id']}", headers=auth_headers)
+
+        assert response.status_code == 200
+        assert response.get_json()['meal']['foods'] == meal['foods']
+        assert client.get('/api/meals/9999', headers=auth_headers).status_code == 404
+
+
+class TestAddMealToDay:
+    """Tests for logging a saved meal to a day."""
+
+    def test_one_insert_and_response_from_memory(self, client, auth_headers, test_food, count_queries):
+        """Test that a 10-item meal is written with one INSERT and its entries need no reload."""
+        from datetime import date
+        from app.models import FoodEntry
+        foods = [{'food_id': test_food.id, 'name': 'Chicken Breast', 'quantity': 10 * (i + 1),
+                  'calories': 16 * (i + 1), 'protein': 3 * (i + 1), 'carbs': 0, 'fat': i % 2}
+                 for i in range(9)]
+        foods.append(dict(foods[0]))
+        meal = client.post('/api/meals', headers=auth_headers,
+                           json={'name': 'Big Plate', 'foods': foods}).get_json()['meal']
+        db.session.expunge_all()
+        today = date.today().isoformat()
+
+        with count_queries() as statements:
+            response = client.post(f"/api/meals/{meal['id']}/add", headers=auth_headers,
+                                   json={'date': today, 'meal_type': 'dinner'})
+
+        assert response.status_code == 201
+        entries = response.get_json()['entries']
+        assert [entry['quantity'] for entry in entries] == [food['quantity'] for food in foods]
+        assert len([s for s in statements if s.startswith('INSERT INTO food_entries')]) == 1
+        assert not [s for s in statements if 'FROM food_entries' in s and s.startswith('SELECT')]
+
+        stored = {entry.id: entry.to_dict() for entry in FoodEntry.query.all()}
+        assert len(stored) == 10
+        assert {entry['id']: entry for entry in entries} == stored
+
+    def test_add_empty_meal(self, client, auth_headers, test_user):
+        """Test that a meal without items adds nothing and still succeeds."""
+        from app.models import FoodEntry
+        meal = SavedMeal(user_id=test_user.id, name='Empty', total_calories=0, total_protein=0,
+                         total_carbs=0, total_fat=0, total_fiber=0)
+        db.session.add(meal)
+        db.session.commit()
+
+        response = client.post(f'/api/meals/{meal.id}/add', headers=auth_headers,
+                               json={'date': '2024-01-01', 'meal_type': 'lunch'})
+
+        assert response.status_code == 201
+        assert response.get_json()['entries'] == []
+        assert FoodEntry.query.count() == 0
+
+    def test_add_meal_validation(self, client, auth_headers):
+        """Test that unknown meals, dates and meal types are rejected."""
+        response = client.post('/api/meals', headers=auth_headers, json={
+            'name': 'Toast', 'foods': [{'food_id': 1, 'name': 'Toast', 'quantity': 30}]
+        })
+        meal_id = response.get_json()['meal']['id']
+        url = f'/api/meals/{meal_id}/add'
+
+        assert client.post('/api/meals/9999/add', headers=auth_headers,
+                           json={'date': '2024-01-01', 'meal_type': 'lunch'}).status_code == 404
+        assert client.post(url, headers=auth_headers, json={'date': '2024-01-01'}).status_code == 400
+        assert client.post(url, headers=auth_headers,
+                           json={'date': '2024-01-01', 'meal_type': 'brunch'}).status_code == 400
+        assert client.post(url, headers=auth_headers,
+                           json={'date': '01/01/2024', 'meal_type': 'lunch'}).status_code == 400
@@ -12,37 +12,26 @@ const Dashboard = () => {
   const [dailyData, setDailyData] = useState(null);
   
   const { 
-    data: summaryData, 
-    loading: summaryLoading, 
-    execute: fetchSummary 
-  } = useApi(entryService.getDailySummary);
-  
-  const { 
-    data: entriesData, 
-    loading: entriesLoading, 
-    execute: fetchEntries 
-  } = useApi(entryService.getEntriesByDate);
+    data: dashboardData, 
+    loading, 
+    execute: fetchDashboard 
+  } = useApi(entryService.getDashboard);
 
   const loadDailyData = useCallback(async () => {
     const dateStr = format(selectedDate, 'yyyy-MM-dd');
 
-    const [summaryResult, entriesResult] = await Promise.all([
-      fetchSummary(dateStr),
-      fetchEntries(dateStr)
-    ]);
+    // Entries and totals come back together in one request
+    const result = await fetchDashboard(dateStr);
 
-    if (summaryResult.success && entriesResult.success) {
+    if (result.success) {
       setDailyData({
-        summary: summaryResult.data,
-        entries: entriesResult.data
+        summary: { nutrients: result.data.nutrients },
+        entries: result.data.meals
       });
     } else {
-      console.error('Failed to load daily data:', {
-        summaryError: summaryResult.error,
-        entriesError: entriesResult.error
-      });
+      console.error('Failed to load daily data:', result.error);
     }
-  }, [selectedDate, fetchSummary, fetchEntries]);
+  }, [selectedDate, fetchDashboard]);
 
     useEffect(() => {
       loadDailyData();
@@ -60,11 +49,11 @@ const Dashboard = () => {
     loadDailyData(); 
   };
 
-  if (summaryLoading || entriesLoading) {
+  if (loading) {
     return <div className="loading">Loading...</div>;
   }
 
-  const hasError = summaryData === null && entriesData === null && !summaryLoading && !entriesLoading;
+  const hasError = dashboardData === null && !loading;
 
   return (
     <div className="dashboard">
@@ -15,21 +15,40 @@ const AddFoodModal = ({ isOpen, onClose, mealType, date, onFoodAdded }) => {
   const [activeTab, setActiveTab] = useState('search'); // search, custom, saved
   const [customFoods, setCustomFoods] = useState([]);
   const [customSearchQuery, setCustomSearchQuery] = useState('');
+  const [customPage, setCustomPage] = useState(1);
+  const [customPages, setCustomPages] = useState(1);
   const [savedMeals, setSavedMeals] = useState([]);
+  const [savedSearchQuery, setSavedSearchQuery] = useState('');
+  const [savedPage, setSavedPage] = useState(1);
+  const [savedPages, setSavedPages] = useState(1);
   const [selectedSavedMeal, setSelectedSavedMeal] = useState(null); 
   const [mealPortion, setMealPortion] = useState(100);
   
   const { execute: searchFoods, loading: searching } = useApi(foodService.searchFoods);
   const { execute: addEntry, loading: adding } = useApi(entryService.createEntry);
+  const { execute: addEntries } = useApi(entryService.createEntries);
   const { execute: fetchCustomFoods, loading: loadingCustom } = useApi(foodService.getCustomFoods);
   const { execute: fetchSavedMeals, loading: loadingSavedMeals } = useApi(mealService.getSavedMeals);
+  const { execute: fetchSavedMeal } = useApi(mealService.getSavedMeal);
 
+  // Custom foods and saved meals are searched on the server, a page at a time
   useEffect(() => {
-    if (isOpen) {
-      loadCustomFoods(); 
-      loadSavedMeals();
-    }
-  }, [isOpen]); 
+    if (!isOpen) return;
+    const delayDebounce = setTimeout(() => {
+      loadCustomFoods(1);
+    }, 300);
+
+    return () => clearTimeout(delayDebounce);
+  }, [isOpen, customSearchQuery]);
+
+  useEffect(() => {
+    if (!isOpen) return;
+    const delayDebounce = setTimeout(() => {
+      loadSavedMeals(1);
+    }, 300);
+
+    return () => clearTimeout(delayDebounce);
+  }, [isOpen, savedSearchQuery]);
 
   useEffect(() => {
     if (searchQuery.length >= 2) {
@@ -50,17 +69,37 @@ const AddFoodModal = ({ isOpen, onClose, mealType, date, onFoodAdded }) => {
     }
   };
 
-  const loadCustomFoods = async () => { 
-  const result = await fetchCustomFoods();
+  const loadCustomFoods = async (nextPage = customPage) => { 
+  const result = await fetchCustomFoods({
+    search: customSearchQuery || undefined,
+    sort_by: 'name',
+    sort_order: 'asc',
+    page: nextPage
+  });
   if (result.success) {
     setCustomFoods(result.data.foods || []);
+    setCustomPage(result.data.current_page);
+    setCustomPages(result.data.pages);
   }
 };
 
-  const loadSavedMeals = async () => { 
-    const result = await fetchSavedMeals();
+  const loadSavedMeals = async (nextPage = savedPage) => { 
+    const result = await fetchSavedMeals({
+      search: savedSearchQuery || undefined,
+      page: nextPage
+    });
     if (result.success) {
       setSavedMeals(result.data.meals || []);
+      setSavedPage(result.data.current_page);
+      setSavedPages(result.data.pages);
+    }
+  };
+
+  // The listing only has totals; the foods come with the meal itself
+  const handleSelectSavedMeal = async (meal) => {
+    const result = await fetchSavedMeal(meal.id);
+    if (result.success) {
+      setSelectedSavedMeal(result.data.meal);
     }
   };
 
@@ -69,20 +108,21 @@ const handleAddSavedMeal = async () => {
 
   const scaleFactor = mealPortion / 100;
 
-  const promises = selectedSavedMeal.foods.map(food => {
-    return addEntry({
-      food_id: food.food_id,
-      custom_food_id: food.custom_food_id,
-      meal_type: mealType,
-      quantity: food.quantity * scaleFactor,
-      date: date
-    });
-  });
+  const entries = selectedSavedMeal.foods.map(food => ({
+    food_id: food.food_id,
+    custom_food_id: food.custom_food_id,
+    meal_type: mealType,
+    quantity: food.quantity * scaleFactor,
+    date: date
+  }));
 
-  const results = await Promise.all(promises);
-  
-  if (results.every(r => r.success)) {
-    onFoodAdded();
+  // One request and one commit for the whole meal
+  const result = await addEntries(entries);
+  if (!result.success) return;
+
+  // On a partial failure (207) keep the modal open but show what was logged
+  onFoodAdded();
+  if (result.data.failed === 0) {
     setSelectedSavedMeal(null);
     setMealPortion(100);
     handleClose();
@@ -134,6 +174,7 @@ const handleAddSavedMeal = async () => {
     setSelectedFood(null);
     setQuantity(100);
     setCustomSearchQuery('');
+    setSavedSearchQuery('');
     onClose();
   };
 
@@ -204,11 +245,7 @@ const handleAddSavedMeal = async () => {
             {loadingCustom && <div className="loading">Loading...</div>}
 
             <div className="search-results">
-              {customFoods
-                .filter(food => 
-                  food.name.toLowerCase().includes(customSearchQuery.toLowerCase())
-                )
-                .map(food => (
+              {customFoods.map(food => (
                   <div
                     key={food.id}
                     className={`search-result-item ${selectedFood?.id === food.id ? 'selected' : ''}`}
@@ -225,26 +262,60 @@ const handleAddSavedMeal = async () => {
                     </div>
                   </div>
                 ))}
-              {customFoods.filter(food => 
-                food.name.toLowerCase().includes(customSearchQuery.toLowerCase())
-              ).length === 0 && (
+              {!loadingCustom && customFoods.length === 0 && (
                 <div className="empty-state">
                   {customSearchQuery ? 'No custom foods match your search' : 'No custom foods yet. Create one in My Foods!'}
                 </div>
               )}
             </div>
+
+            {customPages > 1 && (
+              <div className="pagination">
+                <button
+                  className="btn btn-secondary btn-sm"
+                  onClick={() => loadCustomFoods(customPage - 1)}
+                  disabled={customPage === 1 || loadingCustom}
+                >
+                  Previous
+                </button>
+                <span className="page-info">
+                  Page {customPage} of {customPages}
+                </span>
+                <button
+                  className="btn btn-secondary btn-sm"
+                  onClick={() => loadCustomFoods(customPage + 1)}
+                  disabled={customPage === customPages || loadingCustom}
+                >
+                  Next
+                </button>
+              </div>
+            )}
           </div>
         )}
 
         {activeTab === 'saved' && (
           <div className="saved-meals-tab">
+            {!selectedSavedMeal && (
+              <input
+                type="text"
+                placeholder="Search your saved meals..."
+                value={savedSearchQuery}
+                onChange={(e) => setSavedSearchQuery(e.target.value)}
+                className="search-input"
+              />
+            )}
             {loadingSavedMeals && <div className="loading">Loading...</div>}
             {!selectedSavedMeal ? (
              savedMeals.length === 0 ? (
-              <div className="empty-state">
-                <p>No saved meals yet. Save a meal from the Dashboard!</p>
-              </div>
+              !loadingSavedMeals && (
+                <div className="empty-state">
+                  <p>
+                    {savedSearchQuery ? 'No saved meals match your search' : 'No saved meals yet. Save a meal from the Dashboard!'}
+                  </p>
+                </div>
+              )
             ) : (
+              <>
               <div className="saved-meals-list">
                 {savedMeals.map(meal => (
                   <div key={meal.id} className="saved-meal-item">
@@ -263,25 +334,43 @@ const handleAddSavedMeal = async () => {
                     </div>
 
                     <div className="meal-foods-preview">
-                      {meal.foods.slice(0, 3).map((food, idx) => (
-                        <span key={idx} className="food-tag">
-                          {food.name}
-                        </span>
-                      ))}
-                      {meal.foods.length > 3 && (
-                        <span className="food-tag">+{meal.foods.length - 3} more</span>
-                      )}
+                      <span className="food-tag">
+                        {meal.item_count} {meal.item_count === 1 ? 'food' : 'foods'}
+                      </span>
                     </div>
 
                     <button
                       className="btn btn-primary btn-sm"
-                      onClick={() => setSelectedSavedMeal(meal)}
+                      onClick={() => handleSelectSavedMeal(meal)}
                     >
                       Select
                     </button>
                   </div>
                 ))}
               </div>
+
+              {savedPages > 1 && (
+                <div className="pagination">
+                  <button
+                    className="btn btn-secondary btn-sm"
+                    onClick={() => loadSavedMeals(savedPage - 1)}
+                    disabled={savedPage === 1 || loadingSavedMeals}
+                  >
+                    Previous
+                  </button>
+                  <span className="page-info">
+                    Page {savedPage} of {savedPages}
+                  </span>
+                  <button
+                    className="btn btn-secondary btn-sm"
+                    onClick={() => loadSavedMeals(savedPage + 1)}
+                    disabled={savedPage === savedPages || loadingSavedMeals}
+                  >
+                    Next
+                  </button>
+                </div>
+              )}
+              </>
             )
           ) : (
               <div className="meal-portion-selector">
@@ -8,6 +8,8 @@ import './Pages.css';
 const MyFoods = () => {
   const [foods, setFoods] = useState([]);
   const [isModalOpen, setIsModalOpen] = useState(false);
+  const [page, setPage] = useState(1);
+  const [pages, setPages] = useState(1);
   const [formData, setFormData] = useState({
     name: '',
     brand: '',
@@ -27,10 +29,17 @@ const MyFoods = () => {
     loadFoods();
   }, []);
 
-  const loadFoods = async () => {
-    const result = await fetchFoods();
+  const loadFoods = async (nextPage = page) => {
+    const result = await fetchFoods({ page: nextPage, sort_by: 'name', sort_order: 'asc' });
     if (result.success) {
+      // Deleting the only row on the last page leaves that page empty
+      if (nextPage > 1 && nextPage > result.data.pages) {
+        loadFoods(nextPage - 1);
+        return;
+      }
       setFoods(result.data.foods || []);
+      setPage(result.data.current_page);
+      setPages(result.data.pages);
     }
   };
 
@@ -75,7 +84,7 @@ const MyFoods = () => {
     });
   };
 
-  if (loadingFoods) {
+  if (loadingFoods && foods.length === 0) {
     return <div className="loading">Loading your foods...</div>;
   }
 
@@ -139,6 +148,28 @@ const MyFoods = () => {
         </div>
       )}
 
+      {pages > 1 && (
+          <div className="pagination">
+            <button
+              className="btn btn-secondary"
+              onClick={() => loadFoods(page - 1)}
+              disabled={page === 1 || loadingFoods}
+            >
+              Previous
+            </button>
+            <span className="page-info">
+              Page {page} of {pages}
+            </span>
+            <button
+              className="btn btn-secondary"
+              onClick={() => loadFoods(page + 1)}
+              disabled={page === pages || loadingFoods}
+            >
+              Next
+            </button>
+          </div>
+      )}
+
       <Modal
         isOpen={isModalOpen}
         onClose={() => {
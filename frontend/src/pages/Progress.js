@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { format, subDays, startOfWeek, endOfWeek } from 'date-fns';
+import { format, addDays, subDays, startOfWeek } from 'date-fns';
 import entryService from '../services/entries';
 import useApi from '../hooks/useApi';
 import { useAuth } from '../contexts/AuthContext';
@@ -9,47 +9,43 @@ const Progress = () => {
   const { user } = useAuth();
   const [weeklyData, setWeeklyData] = useState([]);
   const [selectedWeek, setSelectedWeek] = useState(new Date());
+  const [weeklyStats, setWeeklyStats] = useState(null);
+  const [analytics, setAnalytics] = useState(null);
   const [loading, setLoading] = useState(true);
 
-  const { execute: fetchSummary } = useApi(entryService.getDailySummary);
+  const { execute: fetchWeeklySummary } = useApi(entryService.getWeeklySummary);
+  const { execute: fetchAnalytics } = useApi(entryService.getAnalytics);
 
   useEffect(() => {
     loadWeeklyData();
   }, [selectedWeek]);
 
+  useEffect(() => {
+    fetchAnalytics(30).then(result => {
+      if (result.success) setAnalytics(result.data);
+    });
+  }, []);
+
   const loadWeeklyData = async () => {
     setLoading(true);
     const weekStart = startOfWeek(selectedWeek, { weekStartsOn: 0 }); // Sunday
-    const weekEnd = endOfWeek(selectedWeek, { weekStartsOn: 0 });
 
-    const promises = [];
-    const dates = [];
+    // One request returns every day of the week, untracked days included
+    const result = await fetchWeeklySummary(format(weekStart, 'yyyy-MM-dd'));
 
-    // Fetch data for each day of the week
+    const weekData = [];
     for (let i = 0; i < 7; i++) {
-      const currentDate = subDays(weekEnd, 6 - i);
-      dates.push(currentDate);
-      promises.push(fetchSummary(format(currentDate, 'yyyy-MM-dd')));
+      const currentDate = addDays(weekStart, i);
+      const day = result.success && result.data ? result.data.days[i] : null;
+      weekData.push({
+        date: currentDate,
+        dateStr: format(currentDate, 'EEE, MMM d'),
+        nutrients: day ? day.nutrients : null
+      });
     }
 
-    const results = await Promise.all(promises);
-
-    const weekData = results.map((result, index) => {
-      if (result.success && result.data) {
-        return {
-          date: dates[index],
-          dateStr: format(dates[index], 'EEE, MMM d'),
-          nutrients: result.data.nutrients
-        };
-      }
-      return {
-        date: dates[index],
-        dateStr: format(dates[index], 'EEE, MMM d'),
-        nutrients: null
-      };
-    });
-
     setWeeklyData(weekData);
+    setWeeklyStats(result.success && result.data ? result.data.stats : null);
     setLoading(false);
   };
 
@@ -66,25 +62,15 @@ const Progress = () => {
   };
 
   const calculateWeeklyAverage = (nutrient) => {
-    const validDays = weeklyData.filter(day => day.nutrients);
-    if (validDays.length === 0) return 0;
-
-    const total = validDays.reduce((sum, day) => {
-      return sum + (day.nutrients[nutrient]?.consumed || 0);
-    }, 0);
-
-    return (total / validDays.length).toFixed(1);
+    return (weeklyStats?.averages[nutrient] || 0).toFixed(1);
   };
 
   const calculateWeeklyTotal = (nutrient) => {
-    return weeklyData.reduce((sum, day) => {
-      return sum + (day.nutrients?.[nutrient]?.consumed || 0);
-    }, 0).toFixed(1);
+    return (weeklyStats?.totals[nutrient] || 0).toFixed(1);
   };
 
   const getCompliancePercentage = () => {
-    const daysWithData = weeklyData.filter(day => day.nutrients).length;
-    return ((daysWithData / 7) * 100).toFixed(0);
+    return (weeklyStats?.compliance || 0).toFixed(0);
   };
 
   if (loading) {
@@ -128,6 +114,12 @@ const Progress = () => {
           <div className="stat-label">Goal: {user?.daily_protein || 50}g</div>
         </div>
 
+        <div className="summary-card">
+          <h3>Goal Streak</h3>
+          <div className="stat-value">{analytics?.streaks.current || 0}</div>
+          <div className="stat-label">Best: {analytics?.streaks.longest || 0} days</div>
+        </div>
+
         <div className="summary-card">
           <h3>Weekly Total Calories</h3>
           <div className="stat-value">{calculateWeeklyTotal('calories')}</div>
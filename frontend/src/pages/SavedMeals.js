@@ -12,20 +12,30 @@ const SavedMeals = () => {
   const [selectedMealType, setSelectedMealType] = useState('breakfast');
   const [editingMealId, setEditingMealId] = useState(null);
   const [sharingMeal, setSharingMeal] = useState(null);
+  const [page, setPage] = useState(1);
+  const [pages, setPages] = useState(1);
 
   const { execute: fetchMeals, loading: loadingMeals } = useApi(mealService.getSavedMeals);
   const { execute: deleteMeal } = useApi(mealService.deleteSavedMeal);
   const { execute: addMealToDay, loading: adding } = useApi(mealService.addSavedMealToDay);
-  const { execute: updateMeal } = useApi(mealService.updateSavedMeal);
+  const { execute: updateMealItem } = useApi(mealService.updateSavedMealItem);
+  const { execute: deleteMealItem } = useApi(mealService.deleteSavedMealItem);
 
   useEffect(() => {
     loadMeals();
   }, []);
 
-  const loadMeals = async () => {
-    const result = await fetchMeals();
+  const loadMeals = async (nextPage = page) => {
+    const result = await fetchMeals({ items: true, page: nextPage });
     if (result.success) {
+      // Deleting the only row on the last page leaves that page empty
+      if (nextPage > 1 && nextPage > result.data.pages) {
+        loadMeals(nextPage - 1);
+        return;
+      }
       setMeals(result.data.meals || []);
+      setPage(result.data.current_page);
+      setPages(result.data.pages);
     }
   };
 
@@ -48,25 +58,21 @@ const SavedMeals = () => {
   };
     
   const handleUpdateFood = async (mealId, updatedFood) => {
-    const meal = meals.find(m => m.id === mealId);
-    if (!meal) return;
-
-    const updatedFoods = meal.foods.map(f => 
-      (f.food_id && f.food_id === updatedFood.food_id) ||
-      (f.custom_food_id && f.custom_food_id === updatedFood.custom_food_id) ||
-      (f.name === updatedFood.name)
-        ? updatedFood
-        : f
-    );
-
-    const result = await updateMeal(mealId, {
-      name: meal.name,
-      description: meal.description,
-      foods: updatedFoods
+    const result = await updateMealItem(mealId, updatedFood.id, {
+      quantity: updatedFood.quantity,
+      calories: updatedFood.calories,
+      protein: updatedFood.protein,
+      carbs: updatedFood.carbs,
+      fat: updatedFood.fat,
+      fiber: updatedFood.fiber
     });
 
     if (result.success) {
-      setMeals(meals.map(m => m.id === mealId ? result.data.meal : m));
+      const { item, meal: totals } = result.data;
+      setMeals(meals.map(m => m.id === mealId
+        ? { ...m, ...totals, foods: m.foods.map(f => f.id === item.id ? item : f) }
+        : m
+      ));
     }
   };
 
@@ -79,20 +85,13 @@ const SavedMeals = () => {
       return;
     }
 
-    const updatedFoods = meal.foods.filter(f => 
-      !((f.food_id && f.food_id === foodToRemove.food_id) ||
-        (f.custom_food_id && f.custom_food_id === foodToRemove.custom_food_id) ||
-        (f.name === foodToRemove.name))
-    );
-
-    const result = await updateMeal(mealId, {
-      name: meal.name,
-      description: meal.description,
-      foods: updatedFoods
-    });
+    const result = await deleteMealItem(mealId, foodToRemove.id);
 
     if (result.success) {
-      setMeals(meals.map(m => m.id === mealId ? result.data.meal : m));
+      setMeals(meals.map(m => m.id === mealId
+        ? { ...m, ...result.data.meal, foods: m.foods.filter(f => f.id !== foodToRemove.id) }
+        : m
+      ));
     }
   };
 
@@ -100,7 +99,7 @@ const SavedMeals = () => {
     setEditingMealId(editingMealId === mealId ? null : mealId);
   };
 
-  if (loadingMeals) {
+  if (loadingMeals && meals.length === 0) {
     return <div className="loading">Loading saved meals...</div>;
   }
 
@@ -154,9 +153,9 @@ const SavedMeals = () => {
                 <h4>Foods in this meal:</h4>
                 {editingMealId === meal.id ? (
                     <div className="food-items-list">
-                        {meal.foods && meal.foods.map((food, idx) => (
+                        {meal.foods && meal.foods.map((food) => (
                         <SavedMealFoodItem
-                            key={idx}
+                            key={food.id}
                             food={food}
                             onUpdate={(updatedFood) => handleUpdateFood(meal.id, updatedFood)}
                             onRemove={(foodToRemove) => handleRemoveFood(meal.id, foodToRemove)}
@@ -221,6 +220,28 @@ const SavedMeals = () => {
             )}
         </div>
       )}
+
+      {pages > 1 && (
+          <div className="pagination">
+            <button
+              className="btn btn-secondary"
+              onClick={() => loadMeals(page - 1)}
+              disabled={page === 1 || loadingMeals}
+            >
+              Previous
+            </button>
+            <span className="page-info">
+              Page {page} of {pages}
+            </span>
+            <button
+              className="btn btn-secondary"
+              onClick={() => loadMeals(page + 1)}
+              disabled={page === pages || loadingMeals}
+            >
+              Next
+            </button>
+          </div>
+      )}
     </div>
   );
 };
@@ -5,10 +5,22 @@ class EntryService {
     return api.post('/entries', entryData);
   }
 
+  async createEntries(entries) {
+    return api.post('/entries/batch', { entries });
+  }
+
+  async copyEntries(copyData) {
+    return api.post('/entries/copy', copyData);
+  }
+
   async getEntriesByDate(date) {
     return api.get('/entries', { date });
   }
 
+  async getEntryHistory(params = {}) {
+    return api.get('/entries/history', params);
+  }
+
   async updateEntry(entryId, data) {
     return api.put(`/entries/${entryId}`, data);
   }
@@ -25,9 +37,17 @@ class EntryService {
     return api.get(`/summary/${date}`);
   }
 
+  async getDashboard(date) {
+    return api.get(`/dashboard/${date}`);
+  }
+
   async getWeeklySummary(startDate) {
     return api.get(`/summary/week/${startDate}`);
   }
+
+  async getAnalytics(days = 90) {
+    return api.get('/analytics', { days });
+  }
 }
 
 export default new EntryService();
\ No newline at end of file
@@ -5,8 +5,12 @@ class FoodService {
     return api.get('/foods/search', { q: query });
   }
 
-  async getCustomFoods() {
-    return api.get('/foods/custom');
+  async lookupBarcode(code) {
+    return api.get(`/foods/barcode/${encodeURIComponent(code)}`);
+  }
+
+  async getCustomFoods(params = {}) {
+    return api.get('/foods/custom', params);
   }
 
   async createCustomFood(foodData) {
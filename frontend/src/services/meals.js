@@ -1,8 +1,12 @@
 import api from './api';
 
 class MealService {
-  async getSavedMeals() {
-    return api.get('/meals');
+  async getSavedMeals(params = {}) {
+    return api.get('/meals', params);
+  }
+
+  async getSavedMeal(mealId) {
+    return api.get(`/meals/${mealId}`);
   }
 
   async createSavedMeal(mealData) {
@@ -20,6 +24,18 @@ class MealService {
   async updateSavedMeal(mealId, mealData) {
   return api.put(`/meals/${mealId}`, mealData);
 }
+
+  async addSavedMealItem(mealId, itemData) {
+    return api.post(`/meals/${mealId}/items`, itemData);
+  }
+
+  async updateSavedMealItem(mealId, itemId, itemData) {
+    return api.put(`/meals/${mealId}/items/${itemId}`, itemData);
+  }
+
+  async deleteSavedMealItem(mealId, itemId) {
+    return api.delete(`/meals/${mealId}/items/${itemId}`);
+  }
 }
 
 export default new MealService();
\ No newline at end of file
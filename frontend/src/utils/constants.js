@@ -51,16 +51,22 @@ export const API_ENDPOINTS = {
   FOODS: {
     SEARCH: '/foods/search',
     CUSTOM: '/foods/custom',
+    BARCODE: (code) => `/foods/barcode/${code}`,
     BY_ID: (id) => `/foods/${id}`
   },
   ENTRIES: {
     BASE: '/entries',
+    BATCH: '/entries/batch',
+    COPY: '/entries/copy',
+    HISTORY: '/entries/history',
     BY_ID: (id) => `/entries/${id}`,
     BY_DATE: '/entries'
   },
   SUMMARY: {
     DAILY: (date) => `/summary/${date}`,
-    WEEKLY: (date) => `/summary/week/${date}`
+    WEEKLY: (date) => `/summary/week/${date}`,
+    DASHBOARD: (date) => `/dashboard/${date}`,
+    ANALYTICS: '/analytics'
   },
   MEALS: {
     BASE: '/meals',